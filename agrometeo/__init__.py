@@ -4,5 +4,10 @@ __author__ = """Martí Bosch"""
 __email__ = "marti.bosch@protonmail.com"
 __version__ = "0.2.0"
 
+from .aggregation import *
+from .cache import *
 from .core import *
+from .instrumentation import *
+from .interpolation import *
 from .plotting import *
+from .storage import *
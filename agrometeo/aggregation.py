@@ -0,0 +1,174 @@
+"""Temporal aggregation."""
+import pandas as pd
+
+from . import settings
+
+__all__ = ["resample_ts_df", "get_degree_days"]
+
+# pandas offsets equivalent to the temporal scales of the agrometeo API, where each
+# period is labeled by its start
+SCALE_OFFSETS = {
+    "hour": pd.offsets.Hour(),
+    "day": pd.offsets.Day(),
+    "month": pd.offsets.MonthBegin(),
+    "year": pd.offsets.YearBegin(),
+}
+# statistics equivalent to the measurements of the agrometeo API
+MEASUREMENT_STATS = {"min": "min", "avg": "mean", "max": "max"}
+DEGREE_DAYS_METHODS = ["average", "integral"]
+
+
+def _get_freq(freq):
+    return SCALE_OFFSETS.get(freq, freq)
+
+
+def resample_ts_df(ts_df, freq, *, stat=None, min_count=None, resample_kws=None):
+    """
+    Aggregate a time series data frame into time windows.
+
+    The aggregation is computed locally for all the stations (columns) at once, so that
+    data at a fine scale (e.g., the 10-minute measurements, possibly from the time
+    series cache) can be aggregated into any time window and statistic without
+    further API requests.
+
+    Parameters
+    ----------
+    ts_df : pd.DataFrame
+        Data frame with a time series of measurements (rows) at each station
+        (columns), as returned by `AgrometeoDataset.get_ts_df` (in wide format).
+    freq : {"hour", "day", "month", "year"}, str or pandas.DateOffset
+        Length of the time windows, which can be either one of the temporal scales of
+        the agrometeo API or any pandas frequency, e.g., "3h".
+    stat : str, callable or list-like, optional
+        Statistic computed for each time window, which can be any aggregation
+        accepted by `pandas.core.resample.Resampler.agg`, e.g., "sum", or a
+        measurement of the agrometeo API, i.e., "min", "avg" or "max". A list-like of
+        statistics can also be provided, in which case the returned data frame has an
+        additional (last) column level named after `settings.STATISTIC_NAME`. If None,
+        "avg" is used.
+    min_count : int, optional
+        Minimum number of (non-missing) measurements in a time window for its
+        statistic to be computed, otherwise it is set as missing. If None, any
+        non-empty window is computed.
+    resample_kws : dict, optional
+        Keyword arguments passed to `pandas.DataFrame.resample`, e.g., `closed` or
+        `label`.
+
+    Returns
+    -------
+    agg_ts_df : pd.DataFrame
+        Data frame with a time series of aggregated measurements (rows) at each station
+        (columns).
+    """
+    if stat is None:
+        stat = "avg"
+    if resample_kws is None:
+        resample_kws = {}
+
+    resampler = ts_df.resample(_get_freq(freq), **resample_kws)
+    if pd.api.types.is_list_like(stat):
+        stat_names = [
+            _stat if isinstance(_stat, str) else _stat.__name__ for _stat in stat
+        ]
+        agg_ts_df = pd.concat(
+            [resampler.agg(MEASUREMENT_STATS.get(_stat, _stat)) for _stat in stat],
+            axis=1,
+            keys=stat_names,
+            names=[settings.STATISTIC_NAME],
+        )
+        # move the statistic level last (so that the first levels are the same as in
+        # `ts_df`) and group the statistics of each column of `ts_df`
+        agg_ts_df = agg_ts_df.reorder_levels(
+            list(range(1, agg_ts_df.columns.nlevels)) + [0], axis=1
+        )[
+            [
+                (*(column if isinstance(column, tuple) else (column,)), stat_name)
+                for column in ts_df.columns
+                for stat_name in stat_names
+            ]
+        ]
+    else:
+        agg_ts_df = resampler.agg(MEASUREMENT_STATS.get(stat, stat))
+    if min_count is not None:
+        count_df = resampler.count()
+        if pd.api.types.is_list_like(stat):
+            # broadcast the counts to all the statistics
+            count_df = count_df.reindex(
+                columns=agg_ts_df.columns.droplevel(-1)
+            ).set_axis(agg_ts_df.columns, axis=1)
+        agg_ts_df = agg_ts_df.where(count_df >= min_count)
+
+    return agg_ts_df
+
+
+def get_degree_days(
+    ts_df,
+    base_temperature,
+    *,
+    upper_temperature=None,
+    method=None,
+    cumulative=False,
+    min_count=None,
+):
+    """
+    Compute the (growing) degree days from a temperature time series.
+
+    Parameters
+    ----------
+    ts_df : pd.DataFrame
+        Data frame with a time series of temperature measurements (rows) at each
+        station (columns), at any sub-daily scale, e.g., 10 minutes or hourly.
+    base_temperature : numeric
+        Base temperature, below which there is no development.
+    upper_temperature : numeric, optional
+        Upper temperature threshold, above which temperatures are capped (horizontal
+        cutoff). If None, temperatures are not capped.
+    method : {"average", "integral"}, optional
+        Method to compute the degree days. With "average", the degree days of each day
+        are the difference between the average of its (capped) minimum and maximum
+        temperatures and the base temperature. With "integral", they are the average
+        of the differences between each (capped) measurement and the base temperature,
+        i.e., the degree hours divided by 24. In both cases, negative differences are
+        set to zero. If None, "average" is used.
+    cumulative : bool, default False
+        Whether the degree days are accumulated over the time series.
+    min_count : int, optional
+        Minimum number of (non-missing) measurements in a day for its degree days to
+        be computed, otherwise they are set as missing. If None, any non-empty day is
+        computed.
+
+    Returns
+    -------
+    degree_days_df : pd.DataFrame
+        Data frame with a daily time series of degree days (rows) at each station
+        (columns).
+    """
+    if method is None:
+        method = "average"
+    if method not in DEGREE_DAYS_METHODS:
+        raise ValueError(
+            f"method {method} is not valid. Must be one of {DEGREE_DAYS_METHODS}"
+        )
+
+    if upper_temperature is not None:
+        ts_df = ts_df.clip(upper=upper_temperature)
+    if method == "average":
+        min_max_df = resample_ts_df(
+            ts_df, "day", stat=["min", "max"], min_count=min_count
+        )
+        degree_days_df = (
+            min_max_df.xs("min", axis=1, level=-1)
+            + min_max_df.xs("max", axis=1, level=-1)
+        ) / 2 - base_temperature
+    else:
+        degree_days_df = resample_ts_df(
+            (ts_df - base_temperature).clip(lower=0),
+            "day",
+            stat="mean",
+            min_count=min_count,
+        )
+    degree_days_df = degree_days_df.clip(lower=0)
+    if cumulative:
+        degree_days_df = degree_days_df.cumsum()
+
+    return degree_days_df
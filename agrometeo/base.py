@@ -1,33 +1,51 @@
 """Base abstract classes for meteo station datasets."""
 import abc
+import json
 import logging
+import os
+from os import path
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
-from fiona.errors import DriverError
 
 try:
     import osmnx as ox
 except ImportError:
     ox = None
 
-from . import settings
+from . import cache, instrumentation, settings
 
 __all__ = ["MeteoStationDataset"]
 
 
-def _process_region_arg(region=None, geocode_to_gdf_kws=None):
+def _is_url(region):
+    # URLs and GDAL virtual file systems, which are passed to `geopandas.read_file`
+    return "://" in region or region.startswith("/vsi")
+
+
+def _process_region_arg(region=None, geocode_to_gdf_kws=None, region_cache=None):
     if region is not None:
         if isinstance(region, gpd.GeoSeries):
             # if we have a GeoSeries, convert it to a GeoDataFrame so that we can use
             # the same code
             region = gpd.GeoDataFrame(geometry=region)
         elif not isinstance(region, gpd.GeoDataFrame):
-            # at this point, we assume that this is either file-like or a Nominatim
-            # query
-            try:
-                region = gpd.read_file(region)
-            except DriverError:
+            if region_cache is None:
+                region_cache = cache.get_region_cache()
+            # ACHTUNG: dispatch on the type of the argument rather than trying to read
+            # any string as a file first (and geocoding it if that fails)
+            if isinstance(region, (str, os.PathLike)) and path.exists(region):
+                # local file, cached by path and modification time so that it is read
+                # again if it is modified
+                filepath = path.abspath(region)
+                file_stat = os.stat(filepath)
+                region = region_cache.get_region(
+                    ("file", filepath, file_stat.st_mtime_ns, file_stat.st_size),
+                    lambda: gpd.read_file(filepath),
+                )
+            elif isinstance(region, str) and not _is_url(region):
+                # Nominatim query
                 if ox is None:
                     logging.warning(
                         """
@@ -39,19 +57,68 @@ it using conda or pip. See https://github.com/geopandas/geopandas.
 
                 if geocode_to_gdf_kws is None:
                     geocode_to_gdf_kws = {}
-                region = ox.geocode_to_gdf(region, **geocode_to_gdf_kws).iloc[:1]
+                query = region
+                region = region_cache.get_region(
+                    (
+                        "query",
+                        query,
+                        json.dumps(geocode_to_gdf_kws, sort_keys=True, default=str),
+                    ),
+                    lambda: ox.geocode_to_gdf(query, **geocode_to_gdf_kws).iloc[:1],
+                )
+            else:
+                # URL or file-like object
+                region = gpd.read_file(region)
 
     return region
 
 
-def _long_ts_df(ts_df, station_id_name, time_name, value_name):
+def _long_ts_df(
+    ts_df, station_id_name, time_name, value_name, *, categories=None, dropna=False
+):
     """Transform time series data frame from wide (default) to long format."""
-    return pd.melt(
-        ts_df.reset_index(),
-        id_vars=time_name,
-        var_name=station_id_name,
-        value_name=value_name,
+    # ACHTUNG: rather than melting a copy of the wide data frame with its index reset,
+    # build the columns directly from its underlying arrays, with the column labels as
+    # categoricals (the first level is named `station_id_name` and further levels, if
+    # any, keep their names). The `categories` of each column level can be provided so
+    # that long data frames of different time windows can be concatenated as
+    # categoricals.
+    num_times, num_columns = ts_df.shape
+    # keep the data type of the values (all the columns share it), including nullable
+    # float types, whose values are first extracted as a numpy array
+    if num_columns > 0:
+        value_dtype = ts_df.dtypes.iloc[0]
+    else:
+        value_dtype = np.dtype("float64")
+    numpy_dtype = getattr(value_dtype, "numpy_dtype", value_dtype)
+    values = ts_df.to_numpy(dtype=numpy_dtype, na_value=np.nan).ravel()
+    if dropna:
+        mask = ~np.isnan(values)
+        values = values[mask]
+    else:
+        mask = slice(None)
+
+    long_ts_df = pd.DataFrame(
+        {time_name: np.repeat(ts_df.index.to_numpy(), num_columns)[mask]}
     )
+    for level in range(ts_df.columns.nlevels):
+        level_values = ts_df.columns.get_level_values(level)
+        if categories is None:
+            level_categories = level_values.unique()
+        else:
+            level_categories = categories[level]
+        level_name = station_id_name if level == 0 else level_values.name
+        level_codes = pd.Index(level_categories).get_indexer(level_values)
+        long_ts_df[level_name] = pd.Categorical.from_codes(
+            np.tile(level_codes, num_times)[mask], categories=level_categories
+        )
+    if isinstance(value_dtype, pd.api.extensions.ExtensionDtype):
+        # ACHTUNG: build the nullable (masked) array directly from the values and their
+        # missing mask, which is much faster than casting the numpy array
+        values = value_dtype.construct_array_type()(values, np.isnan(values))
+    long_ts_df[value_name] = values
+
+    return long_ts_df
 
 
 class MeteoStationDataset(metaclass=abc.ABCMeta):
@@ -65,6 +132,7 @@ class MeteoStationDataset(metaclass=abc.ABCMeta):
         stations_id_name=None,
         time_name=None,
         geocode_to_gdf_kws=None,
+        region_cache=None,
     ):
         """
         Initialize an meteo station dataset.
@@ -81,10 +149,18 @@ class MeteoStationDataset(metaclass=abc.ABCMeta):
             * A geometric object, e.g., shapely geometry
             * A filename or URL, a file-like object opened in binary ('rb') mode, or a
               Path object that will be passed to `geopandas.read_file`.
+        region_cache : `agrometeo.cache.RegionCache`, optional
+            Cache of the geocoded regions and region files. If None, the process-wide
+            cache returned by `agrometeo.cache.get_region_cache` is used.
         """
-        self.region = _process_region_arg(
-            region=region, geocode_to_gdf_kws=geocode_to_gdf_kws
-        ).to_crs(self.CRS)
+        # ACHTUNG: this includes geocoding the region (when it is a Nominatim query)
+        with instrumentation.span("region") as attributes:
+            self.region = _process_region_arg(
+                region=region,
+                geocode_to_gdf_kws=geocode_to_gdf_kws,
+                region_cache=region_cache,
+            ).to_crs(self.CRS)
+            attributes["num_rows"] = len(self.region)
         if stations_id_name is None:
             stations_id_name = settings.STATIONS_ID_NAME
         self.stations_id_name = stations_id_name
@@ -104,18 +180,95 @@ class MeteoStationDataset(metaclass=abc.ABCMeta):
         pass
 
     @abc.abstractmethod
-    def get_ts_df(self, *args, **kwargs):
+    def get_ts_df(self, *args, long_format=False, **kwargs):
         """
         Get time series data frame.
 
+        Parameters
+        ----------
+        long_format : bool, default False
+            Whether the data frame should be returned in long (tidy) format, i.e., with
+            a row for each measurement and columns for the time, station identifier and
+            measured value.
+
         Returns
         -------
         ts_df : pd.DataFrame
             Data frame with a time series of meaurements (rows) at each station
-            (columns).
+            (columns), or, if `long_format` is True, data frame with a row for each
+            measurement and columns named after `time_name`, `stations_id_name` and
+            `settings.VALUE_NAME`, where the station identifiers are categorical.
         """
         pass
 
+    def iter_ts_df(self, *args, **kwargs):
+        """
+        Iterate over the time series data frame by time windows.
+
+        By default, the whole data frame returned by `get_ts_df` is yielded at once.
+        Datasets that can fetch the requested period by time windows should override
+        this method so that memory usage is bounded by the window length.
+
+        Parameters
+        ----------
+        *args, **kwargs
+            Arguments passed to `get_ts_df`.
+
+        Yields
+        ------
+        ts_df : pd.DataFrame
+            Data frame with a time series of meaurements (rows) at each station
+            (columns).
+        """
+        yield self.get_ts_df(*args, **kwargs)
+
+    def export_ts(self, store, variable, start_date, end_date, **iter_ts_df_kws):
+        """
+        Export time series data to a storage backend.
+
+        The requested period is fetched by time windows, each of which is written to
+        the store as soon as it is available, so that memory usage is bounded by the
+        window length rather than the whole requested period.
+
+        Parameters
+        ----------
+        store : ParquetTSStore, ZarrTSStore or object with a `write` method
+            Storage backend, i.e., an object with a `write(ts_df)` method that takes a
+            data frame with a column for each (station, variable, measurement) triplet.
+        variable : str, int or list-like of str or int
+            Target variable(s), passed to `iter_ts_df`.
+        start_date, end_date : str or datetime
+            String in the "YYYY-MM-DD" format or datetime instance, respectively
+            representing the start and end of the requested data period.
+        **iter_ts_df_kws
+            Keyword arguments passed to `iter_ts_df`, e.g., `scale`, `measurement` or
+            `chunk_freq`. Note that `long_format` is not allowed.
+        """
+        if iter_ts_df_kws.get("long_format"):
+            raise ValueError("The data is exported from wide data frames.")
+        # ACHTUNG: a list-like variable so that the data frames always have the
+        # variable and measurement column levels
+        if not pd.api.types.is_list_like(variable):
+            variable = [variable]
+        for ts_df in self.iter_ts_df(variable, start_date, end_date, **iter_ts_df_kws):
+            store.write(ts_df)
+
+    def export_stations(self, dst, **to_parquet_kws):
+        """
+        Export the stations geo-data frame as GeoParquet.
+
+        Parameters
+        ----------
+        dst : str or pathlib.Path object
+            Path to the destination file, which is overwritten if it exists.
+        **to_parquet_kws
+            Keyword arguments passed to `geopandas.GeoDataFrame.to_parquet`.
+        """
+        cache._atomic_write(
+            dst,
+            lambda filepath: self.stations_gdf.to_parquet(filepath, **to_parquet_kws),
+        )
+
     @abc.abstractmethod
     def get_ts_gdf(self, *args, **kwargs):
         """
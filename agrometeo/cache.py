@@ -0,0 +1,750 @@
+"""Caching."""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from os import path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import requests
+
+from . import instrumentation, settings
+
+__all__ = [
+    "TSCache",
+    "CatalogueCache",
+    "RegionCache",
+    "BasemapCache",
+    "get_catalogue_cache",
+    "get_region_cache",
+    "get_basemap_cache",
+]
+
+CACHE_FILE_EXT = ".parquet"
+CACHE_DT_FMT = "%Y-%m-%d"
+CATALOGUE_FILE_EXT = ".json"
+# ACHTUNG: the regions are stored as GeoParquet, with an extension that differs from
+# `CACHE_FILE_EXT` so that the files are not mistaken for time series data
+REGION_FILE_EXT = ".geoparquet"
+BASEMAP_FILE_EXT = ".npz"
+BASEMAP_INDEX_FILE_EXT = ".json"
+NOT_MODIFIED_STATUS_CODE = 304
+# fraction of `TSCache.max_size` to which the cache is evicted when it is exceeded, so
+# that the cache files are not scanned again on each subsequent write
+TS_CACHE_EVICT_RATIO = 0.9
+
+# process-wide catalogue cache, see `get_catalogue_cache`
+_catalogue_cache = None
+_catalogue_cache_lock = threading.Lock()
+# process-wide region cache, see `get_region_cache`
+_region_cache = None
+_region_cache_lock = threading.Lock()
+# process-wide basemap cache, see `get_basemap_cache`
+_basemap_cache = None
+_basemap_cache_lock = threading.Lock()
+
+
+def _atomic_write(filepath, write_func):
+    # write to a temporary file first so that concurrent readers never see a
+    # partially-written file
+    os.makedirs(path.dirname(filepath), exist_ok=True)
+    fd, tmp_filepath = tempfile.mkstemp(suffix=".tmp", dir=path.dirname(filepath))
+    os.close(fd)
+    write_func(tmp_filepath)
+    os.replace(tmp_filepath, filepath)
+
+
+def _get_conditional_headers(entry):
+    # headers so that the catalogue is only sent if it has changed since `entry`
+    headers = {}
+    if entry is not None:
+        if entry["etag"] is not None:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"] is not None:
+            headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+class TSCache:
+    """Persistent on-disk cache of time series data."""
+
+    def __init__(self, cache_dir, *, max_size=None, recent_timedelta=None):
+        """
+        Initialize a time series cache.
+
+        The data is stored as a Parquet file for each combination of variable code,
+        measurement, scale and day, with a column for each station id. Accordingly,
+        the cache can tell which stations and days are missing for a given request, so
+        that only those need to be fetched from the API.
+
+        Parameters
+        ----------
+        cache_dir : str or pathlib.Path object
+            Path to the directory where the cached data is stored. It will be created
+            if it does not exist.
+        max_size : numeric, optional
+            Maximum size of the cache (in bytes). Whenever it is exceeded, the least
+            recently used files are evicted until the cache fits in
+            `TS_CACHE_EVICT_RATIO` times `max_size`. The cache files are only scanned
+            on the first write and on eviction, and the size of the cache is otherwise
+            kept up to date with the written bytes (files written by other processes
+            are thus only accounted for on the next scan). If None, the value from
+            `settings.TS_CACHE_MAX_SIZE` is used, where a value of None means that the
+            cache size is unlimited.
+        recent_timedelta : str or timedelta, optional
+            Days that end less than `recent_timedelta` ago are considered "recent" and
+            thus always re-fetched (and overwritten in the cache), since their data can
+            still change. If None, the value from `settings.TS_CACHE_RECENT_TIMEDELTA`
+            is used.
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if max_size is None:
+            max_size = settings.TS_CACHE_MAX_SIZE
+        self.max_size = max_size
+        if recent_timedelta is None:
+            recent_timedelta = settings.TS_CACHE_RECENT_TIMEDELTA
+        self.recent_timedelta = pd.Timedelta(recent_timedelta)
+        # running size of the cache (in bytes), which is None until the cache files
+        # are scanned, see `put_ts_df` and `evict`
+        self._size = None
+        self._size_lock = threading.Lock()
+
+    def _get_filepath(self, variable_code, measurement, scale, day):
+        return path.join(
+            self.cache_dir,
+            f"{variable_code}_{measurement}_{scale}",
+            f"{day.strftime(CACHE_DT_FMT)}{CACHE_FILE_EXT}",
+        )
+
+    def _get_filepaths(self):
+        for dir_path, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if filename.endswith(CACHE_FILE_EXT):
+                    yield path.join(dir_path, filename)
+
+    def is_recent(self, day):
+        """
+        Check whether a day is recent, i.e., whether its data can still change.
+
+        Parameters
+        ----------
+        day : str or datetime
+            String or datetime instance representing the day.
+
+        Returns
+        -------
+        is_recent : bool
+            Whether the day ends less than `recent_timedelta` ago.
+        """
+        return (
+            pd.Timestamp(day).normalize() + pd.Timedelta(days=1)
+            > pd.Timestamp.now() - self.recent_timedelta
+        )
+
+    @property
+    def size(self):
+        """Size of the cache (in bytes)."""
+        return sum(path.getsize(filepath) for filepath in self._get_filepaths())
+
+    def get_ts_df(self, variable_code, measurement, scale, days, stations_ids):
+        """
+        Get the cached time series data frame.
+
+        Parameters
+        ----------
+        variable_code : int
+            Agrometeo variable code.
+        measurement, scale : str
+            Measurement and scale of the data, as passed to the agrometeo API.
+        days : list-like of datetime
+            Days of the requested data period.
+        stations_ids : list-like of str
+            Agrometeo ids of the requested stations.
+
+        Returns
+        -------
+        ts_df : pd.DataFrame
+            Data frame with the cached time series of measurements (rows) at each
+            station (columns).
+        missing_days : list of pd.Timestamp
+            Days for which the data of at least one station is not in the cache (or is
+            recent).
+        missing_stations_ids : list of str
+            Station ids for which the data of at least one day is not in the cache.
+        """
+        stations_ids = pd.Index(stations_ids)
+        day_ts_dfs = []
+        missing_days = []
+        missing_stations_ids = pd.Index([], dtype=stations_ids.dtype)
+        for day in days:
+            day = pd.Timestamp(day)
+            filepath = self._get_filepath(variable_code, measurement, scale, day)
+            if self.is_recent(day) or not path.exists(filepath):
+                missing_days.append(day)
+                missing_stations_ids = stations_ids
+                continue
+            day_ts_df = pd.read_parquet(filepath)
+            # update the access time so that it is considered in the eviction
+            os.utime(filepath)
+            day_stations_ids = stations_ids.intersection(day_ts_df.columns)
+            if len(day_stations_ids) < len(stations_ids):
+                missing_days.append(day)
+                missing_stations_ids = missing_stations_ids.union(
+                    stations_ids.difference(day_stations_ids)
+                )
+            day_ts_dfs.append(day_ts_df[day_stations_ids])
+
+        if day_ts_dfs:
+            ts_df = pd.concat(day_ts_dfs)
+        else:
+            ts_df = pd.DataFrame(
+                index=pd.DatetimeIndex([]), columns=pd.Index([], dtype=object)
+            )
+
+        instrumentation.count(
+            "ts_cache.hit",
+            len(days) - len(missing_days),
+            variable_code=variable_code,
+            measurement=measurement,
+            scale=scale,
+        )
+        instrumentation.count(
+            "ts_cache.miss",
+            len(missing_days),
+            variable_code=variable_code,
+            measurement=measurement,
+            scale=scale,
+        )
+        return ts_df, missing_days, list(missing_stations_ids)
+
+    def put_ts_df(self, ts_df, variable_code, measurement, scale, days, stations_ids):
+        """
+        Put a time series data frame into the cache.
+
+        Parameters
+        ----------
+        ts_df : pd.DataFrame
+            Data frame with a time series of measurements (rows) at each station
+            (columns), where the columns are agrometeo station ids.
+        variable_code : int
+            Agrometeo variable code.
+        measurement, scale : str
+            Measurement and scale of the data, as passed to the agrometeo API.
+        days : list-like of datetime
+            Days fully covered by `ts_df`. Days without any row in `ts_df` are also
+            stored (as empty), so that they are not requested again.
+        stations_ids : list-like of str
+            Agrometeo ids of the stations covered by `ts_df`. Stations without any
+            column in `ts_df` are also stored (with missing values).
+
+        Notes
+        -----
+        The file of each day that is already cached (e.g., with other stations) is
+        read and rewritten with the columns of `ts_df`, so all the stations of a day
+        should be put at once rather than in several batches. Accordingly,
+        `AgrometeoDataset` merges the station batches of each request before putting
+        them into the cache.
+        """
+        ts_df = ts_df.reindex(columns=stations_ids)
+        row_days = ts_df.index.normalize()
+        written_size = 0
+        for day in days:
+            day = pd.Timestamp(day)
+            filepath = self._get_filepath(variable_code, measurement, scale, day)
+            day_ts_df = ts_df[row_days == day]
+            if path.exists(filepath):
+                written_size -= path.getsize(filepath)
+                # keep the data of other stations that may have been cached
+                cached_ts_df = pd.read_parquet(filepath)
+                day_ts_df = pd.concat(
+                    [
+                        cached_ts_df.drop(
+                            columns=cached_ts_df.columns.intersection(day_ts_df.columns)
+                        ),
+                        day_ts_df,
+                    ],
+                    axis=1,
+                )
+            _atomic_write(filepath, day_ts_df.to_parquet)
+            written_size += path.getsize(filepath)
+
+        if self.max_size is not None:
+            with self._size_lock:
+                if self._size is not None:
+                    self._size += written_size
+                size = self._size
+            if size is None or size > self.max_size:
+                self._evict(self.max_size, self.max_size * TS_CACHE_EVICT_RATIO)
+
+    def evict(self, max_size=None):
+        """
+        Evict the least recently used files until the cache fits in `max_size`.
+
+        Parameters
+        ----------
+        max_size : numeric, optional
+            Maximum size of the cache (in bytes). If None, the `max_size` attribute of
+            the cache is used.
+        """
+        if max_size is None:
+            max_size = self.max_size
+        if max_size is None:
+            return
+        self._evict(max_size, max_size)
+
+    def _evict(self, max_size, target_size):
+        # scan the cache files and, if their size exceeds `max_size`, evict the least
+        # recently used ones until it fits in `target_size`
+        file_stats = sorted(
+            ((os.stat(filepath), filepath) for filepath in self._get_filepaths()),
+            key=lambda file_stat: file_stat[0].st_mtime,
+        )
+        size = sum(file_stat.st_size for file_stat, _ in file_stats)
+        if size <= max_size:
+            target_size = size
+        for file_stat, filepath in file_stats:
+            if size <= target_size:
+                break
+            os.remove(filepath)
+            size -= file_stat.st_size
+        with self._size_lock:
+            self._size = size
+
+    def clear(self):
+        """Remove all the cached data."""
+        self.evict(max_size=0)
+
+
+class CatalogueCache:
+    """Cache of the agrometeo catalogues, i.e., the stations and sensors data."""
+
+    def __init__(self, *, cache_dir=None, ttl=None):
+        """
+        Initialize a catalogue cache.
+
+        The catalogues are kept in memory (and optionally on disk) for `ttl`. Once
+        expired, they are revalidated against the API with a conditional request
+        (using the "ETag" and "Last-Modified" response headers), so that they are only
+        downloaded again when they have actually changed.
+
+        Parameters
+        ----------
+        cache_dir : str or pathlib.Path object, optional
+            Path to the directory where the catalogues are stored so that they can be
+            shared across processes. If None, the value from
+            `settings.CATALOGUE_CACHE_DIR` is used, where a value of None means that the
+            catalogues are only kept in memory.
+        ttl : str or timedelta, optional
+            Time during which the cached catalogues are used without revalidation. If
+            None, the value from `settings.CATALOGUE_CACHE_TTL` is used.
+        """
+        if cache_dir is None:
+            cache_dir = settings.CATALOGUE_CACHE_DIR
+        self.cache_dir = cache_dir
+        if ttl is None:
+            ttl = settings.CATALOGUE_CACHE_TTL
+        self.ttl = pd.Timedelta(ttl)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _get_filepath(self, url):
+        return path.join(
+            self.cache_dir,
+            f"{hashlib.sha1(url.encode()).hexdigest()}{CATALOGUE_FILE_EXT}",
+        )
+
+    def _read_entry(self, url):
+        if self.cache_dir is None:
+            return
+        filepath = self._get_filepath(url)
+        if path.exists(filepath):
+            with open(filepath) as src:
+                return json.load(src)
+
+    def _write_entry(self, url, entry):
+        def _dump(filepath):
+            with open(filepath, "w") as dst:
+                json.dump(entry, dst)
+
+        if self.cache_dir is not None:
+            _atomic_write(self._get_filepath(url), _dump)
+
+    def _get_entry(self, url, now):
+        # get the (in-memory or on-disk) entry of the url, and whether it is still fresh
+        entry = self._entries.get(url)
+        if entry is None:
+            entry = self._read_entry(url)
+        if entry is not None and now - entry["fetched_at"] < self.ttl.total_seconds():
+            self._entries[url] = entry
+            instrumentation.count("catalogue_cache.hit", url=url)
+            return entry, True
+        instrumentation.count("catalogue_cache.miss", url=url)
+        return entry, False
+
+    def _set_entry(self, url, entry, response, now):
+        # update the entry of the url with the response to the conditional request
+        if entry is not None and response.status_code == NOT_MODIFIED_STATUS_CODE:
+            entry["fetched_at"] = now
+        else:
+            response.raise_for_status()
+            entry = {
+                "data": response.json()["data"],
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": now,
+            }
+        self._entries[url] = entry
+        self._write_entry(url, entry)
+        return entry
+
+    def get_data(self, url, get_func=None):
+        """
+        Get the data of a catalogue endpoint.
+
+        Parameters
+        ----------
+        url : str
+            Url of the catalogue endpoint.
+        get_func : callable, optional
+            Function used to send the (conditional) GET requests, which must accept the
+            url as first positional argument and a `headers` keyword argument. If None,
+            `requests.get` is used.
+
+        Returns
+        -------
+        data : list of dict
+            Catalogue data, i.e., the "data" item of the endpoint's JSON response.
+        """
+        if get_func is None:
+            get_func = requests.get
+        # ACHTUNG: hold the lock during the request so that concurrent datasets share a
+        # single download
+        with self._lock:
+            now = time.time()
+            entry, is_fresh = self._get_entry(url, now)
+            if is_fresh:
+                return entry["data"]
+            response = get_func(url, headers=_get_conditional_headers(entry))
+            return self._set_entry(url, entry, response, now)["data"]
+
+    async def aget_data(self, url, get_func):
+        """
+        Get the data of a catalogue endpoint asynchronously.
+
+        Parameters
+        ----------
+        url : str
+            Url of the catalogue endpoint.
+        get_func : coroutine function
+            Function used to send the (conditional) GET requests, which must accept the
+            url as first positional argument and a `headers` keyword argument, e.g.,
+            `agrometeo.core.AsyncAPIClient.get`.
+
+        Returns
+        -------
+        data : list of dict
+            Catalogue data, i.e., the "data" item of the endpoint's JSON response.
+        """
+        # ACHTUNG: the lock cannot be held while awaiting the request (it would block
+        # the event loop), so concurrent calls with an expired entry may download the
+        # catalogue more than once
+        with self._lock:
+            now = time.time()
+            entry, is_fresh = self._get_entry(url, now)
+        if is_fresh:
+            return entry["data"]
+        response = await get_func(url, headers=_get_conditional_headers(entry))
+        with self._lock:
+            return self._set_entry(url, entry, response, now)["data"]
+
+    def clear(self):
+        """Remove all the cached catalogues (both from memory and disk)."""
+        with self._lock:
+            self._entries = {}
+            if self.cache_dir is not None and path.exists(self.cache_dir):
+                for filename in os.listdir(self.cache_dir):
+                    if filename.endswith(CATALOGUE_FILE_EXT):
+                        os.remove(path.join(self.cache_dir, filename))
+
+
+class RegionCache:
+    """Cache of the region geo-data frames, i.e., geocoded or read from files."""
+
+    def __init__(self, *, cache_dir=None):
+        """
+        Initialize a region cache.
+
+        The region geo-data frames are kept in memory (and optionally stored on disk
+        as GeoParquet, which requires the pyarrow package) by key, e.g., the Nominatim
+        query and the geocoding keyword arguments, or the path and modification time
+        of the region file.
+
+        Parameters
+        ----------
+        cache_dir : str or pathlib.Path object, optional
+            Path to the directory where the regions are stored so that they are
+            persisted across processes. If None, the value from
+            `settings.REGION_CACHE_DIR` is used, where a value of None means that the
+            regions are only kept in memory.
+        """
+        if cache_dir is None:
+            cache_dir = settings.REGION_CACHE_DIR
+        self.cache_dir = cache_dir
+        self._regions = {}
+        self._lock = threading.Lock()
+
+    def _get_filepath(self, key):
+        return path.join(
+            self.cache_dir,
+            f"{hashlib.sha1(repr(key).encode()).hexdigest()}{REGION_FILE_EXT}",
+        )
+
+    def get_region(self, key, load_func):
+        """
+        Get a region geo-data frame, loading it if it is not cached.
+
+        Parameters
+        ----------
+        key : tuple
+            Key of the region, whose items must be strings or numbers.
+        load_func : callable
+            Function without arguments that loads the region geo-data frame.
+
+        Returns
+        -------
+        region : gpd.GeoDataFrame
+            A copy of the region geo-data frame, so that it can be safely modified.
+        """
+        with self._lock:
+            region = self._regions.get(key)
+        if region is None:
+            if self.cache_dir is None:
+                instrumentation.count("region_cache.miss")
+                region = load_func()
+            else:
+                filepath = self._get_filepath(key)
+                if path.exists(filepath):
+                    instrumentation.count("region_cache.hit")
+                    region = gpd.read_parquet(filepath)
+                else:
+                    instrumentation.count("region_cache.miss")
+                    region = load_func()
+                    _atomic_write(filepath, region.to_parquet)
+            with self._lock:
+                self._regions[key] = region
+        else:
+            instrumentation.count("region_cache.hit")
+        return region.copy()
+
+    def clear(self):
+        """Remove all the cached regions (both from memory and disk)."""
+        with self._lock:
+            self._regions = {}
+            if self.cache_dir is not None and path.exists(self.cache_dir):
+                for filename in os.listdir(self.cache_dir):
+                    if filename.endswith(REGION_FILE_EXT):
+                        os.remove(path.join(self.cache_dir, filename))
+
+
+class BasemapCache:
+    """Cache of basemap rasters, e.g., for plotting, by CRS, tile source and zoom."""
+
+    def __init__(self, *, cache_dir=None):
+        """
+        Initialize a basemap cache.
+
+        Each basemap raster is stored with its extent, so that it is used for any
+        requested bounds that it covers, e.g., a basemap for the extent of a region
+        serves the plots of any subset of its stations.
+
+        Parameters
+        ----------
+        cache_dir : str or pathlib.Path object, optional
+            Path to the directory where the basemaps are stored so that they are
+            persisted across processes (and can be used without network access). If
+            None, the value from `settings.BASEMAP_CACHE_DIR` is used, where a value of
+            None means that the basemaps are only kept in memory.
+        """
+        if cache_dir is None:
+            cache_dir = settings.BASEMAP_CACHE_DIR
+        self.cache_dir = cache_dir
+        # key: list of entries, i.e., dicts with the "extent", "attribution" and
+        # "filename" of the basemap, and its "img" once loaded
+        self._basemaps = {}
+        self._lock = threading.Lock()
+
+    def _get_index_filepath(self, key):
+        return path.join(
+            self.cache_dir,
+            f"{hashlib.sha1(repr(key).encode()).hexdigest()}{BASEMAP_INDEX_FILE_EXT}",
+        )
+
+    def _get_entries(self, key):
+        # ACHTUNG: must be called with `self._lock` held
+        entries = self._basemaps.get(key)
+        if entries is None:
+            entries = []
+            if self.cache_dir is not None:
+                index_filepath = self._get_index_filepath(key)
+                if path.exists(index_filepath):
+                    with open(index_filepath) as src:
+                        entries = json.load(src)
+            self._basemaps[key] = entries
+        return entries
+
+    def _load_img(self, entry):
+        if "img" not in entry:
+            with np.load(path.join(self.cache_dir, entry["filename"])) as npz:
+                entry["img"] = npz["img"]
+        return entry["img"]
+
+    def get_basemap(self, key, bounds, load_func):
+        """
+        Get a basemap raster covering some bounds, loading it if it is not cached.
+
+        Parameters
+        ----------
+        key : tuple
+            Key of the basemap, e.g., the CRS, tile source and zoom, whose items must be
+            strings or numbers.
+        bounds : list-like
+            West, south, east and north bounds that the basemap must cover.
+        load_func : callable
+            Function that takes the bounds as its only argument and returns a tuple with
+            the image array, its extent as (west, east, south, north), i.e., the order
+            of `matplotlib.axes.Axes.imshow`, and the attribution text (or None).
+
+        Returns
+        -------
+        img : np.ndarray
+            Image array of the basemap.
+        extent : tuple
+            Extent of the basemap as (west, east, south, north).
+        attribution : str or None
+            Attribution text of the basemap source.
+        """
+        west, south, east, north = bounds
+        with self._lock:
+            for entry in self._get_entries(key):
+                _west, _east, _south, _north = entry["extent"]
+                if (
+                    _west <= west
+                    and _south <= south
+                    and _east >= east
+                    and _north >= north
+                ):
+                    return (
+                        self._load_img(entry),
+                        tuple(entry["extent"]),
+                        entry["attribution"],
+                    )
+
+        img, extent, attribution = load_func(bounds)
+        extent = tuple(float(coord) for coord in extent)
+        entry = {"extent": extent, "attribution": attribution}
+        if self.cache_dir is not None:
+            entry["filename"] = (
+                f"{hashlib.sha1(repr((key, extent)).encode()).hexdigest()}"
+                f"{BASEMAP_FILE_EXT}"
+            )
+
+            def _dump_img(filepath):
+                with open(filepath, "wb") as dst:
+                    np.savez(dst, img=img)
+
+            _atomic_write(path.join(self.cache_dir, entry["filename"]), _dump_img)
+        with self._lock:
+            if self.cache_dir is not None:
+                # reread the index in case other processes have added basemaps
+                self._basemaps.pop(key, None)
+            entries = self._get_entries(key)
+            entries.append(entry)
+            if self.cache_dir is not None:
+
+                def _dump_index(filepath):
+                    with open(filepath, "w") as dst:
+                        json.dump(
+                            [
+                                {_key: _entry[_key] for _key in _entry if _key != "img"}
+                                for _entry in entries
+                            ],
+                            dst,
+                        )
+
+                _atomic_write(self._get_index_filepath(key), _dump_index)
+            entry["img"] = img
+        return img, extent, attribution
+
+    def clear(self):
+        """Remove all the cached basemaps (both from memory and disk)."""
+        with self._lock:
+            self._basemaps = {}
+            if self.cache_dir is not None and path.exists(self.cache_dir):
+                for filename in os.listdir(self.cache_dir):
+                    if filename.endswith((BASEMAP_FILE_EXT, BASEMAP_INDEX_FILE_EXT)):
+                        os.remove(path.join(self.cache_dir, filename))
+
+
+def get_catalogue_cache():
+    """
+    Get the process-wide catalogue cache.
+
+    The cache is initialized at the first call, using the values from
+    `settings.CATALOGUE_CACHE_DIR` and `settings.CATALOGUE_CACHE_TTL`.
+
+    Returns
+    -------
+    catalogue_cache : CatalogueCache
+        Catalogue cache shared by all the datasets that are not initialized with their
+        own `catalogue_cache`.
+    """
+    global _catalogue_cache
+    with _catalogue_cache_lock:
+        if _catalogue_cache is None:
+            _catalogue_cache = CatalogueCache()
+    return _catalogue_cache
+
+
+def get_region_cache():
+    """
+    Get the process-wide region cache.
+
+    The cache is initialized at the first call, using the value from
+    `settings.REGION_CACHE_DIR`.
+
+    Returns
+    -------
+    region_cache : RegionCache
+        Region cache shared by all the datasets that are not initialized with their
+        own `region_cache`.
+    """
+    global _region_cache
+    with _region_cache_lock:
+        if _region_cache is None:
+            _region_cache = RegionCache()
+    return _region_cache
+
+
+def get_basemap_cache():
+    """
+    Get the process-wide basemap cache.
+
+    The cache is initialized at the first call, using the value from
+    `settings.BASEMAP_CACHE_DIR`.
+
+    Returns
+    -------
+    basemap_cache : BasemapCache
+        Basemap cache shared by all the plots that are not passed their own
+        `basemap_cache`.
+    """
+    global _basemap_cache
+    with _basemap_cache_lock:
+        if _basemap_cache is None:
+            _basemap_cache = BasemapCache()
+    return _basemap_cache
@@ -1,18 +1,35 @@
 """Agrometeo."""
+import asyncio
+import collections
+import contextvars
 import datetime
-import warnings
+import functools
+import itertools
+import json
+import threading
+import time
+from concurrent import futures
 from os import path
 
 import geopandas as gpd
 import numpy as np
 import pandas as pd
 import requests
-from shapely.errors import ShapelyDeprecationWarning
-from shapely.geometry import Point
+from requests import adapters
 
-from . import base, settings
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
 
-__all__ = ["AgrometeoDataset"]
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from . import base, cache, instrumentation, settings
+
+__all__ = ["AgrometeoDataset", "APIClient", "AsyncAPIClient", "TSSync", "get_client"]
 
 # API endpoints
 BASE_URL = "https://www.agrometeo.ch/backend/api"
@@ -35,6 +52,614 @@ API_DT_FMT = "%Y-%m-%d"
 SJOIN_PREDICATE = "within"
 SCALE = "none"
 MEASUREMENT = "avg"
+# scales for which the requested period can be split into time windows without altering
+# the returned values
+CHUNKABLE_SCALES = ["none", "hour", "day"]
+# scales for which the data can be cached by day
+CACHEABLE_SCALES = CHUNKABLE_SCALES
+# separator of the items of list query parameters (url-encoded comma)
+QUERY_LIST_SEP = "%2C"
+# levels of the columns of the time series data frames before they are mapped to the
+# requested station identifiers and variable labels
+SENSOR_LEVELS = ["station_id", "variable_code", "measurement"]
+# base number of seconds to wait before retrying a failed request (doubled at each try)
+RETRY_BACKOFF_FACTOR = 0.5
+# response status codes for which the request is retried (too many requests and
+# transient server errors)
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+
+# predicates such that `predicate(station, region)` is equivalent to
+# `INVERSE_PREDICATES[predicate](region, station)`, so that the stations can be selected
+# by querying their spatial index with the region geometries
+INVERSE_PREDICATES = {
+    "intersects": "intersects",
+    "within": "contains",
+    "contains": "within",
+    "covered_by": "covers",
+    "covers": "covered_by",
+    "touches": "touches",
+    "crosses": "crosses",
+    "overlaps": "overlaps",
+}
+
+# process-wide stations catalogue geo-data frames (with their spatial index) by CRS,
+# see `_get_catalogue_stations_gdf`
+_catalogue_stations_gdfs = {}
+_catalogue_stations_gdfs_lock = threading.Lock()
+
+# process-wide API client, see `get_client`
+_client = None
+_client_lock = threading.Lock()
+
+
+def _get_date_windows(start_date, end_date, chunk_freq):
+    # ACHTUNG: the API treats both `from` and `to` as inclusive days, i.e., the data of
+    # the whole `to` day is returned, so consecutive windows do not share any day
+    # the window boundaries are thus rounded down to whole days (and de-duplicated), so
+    # that a `chunk_freq` shorter than a day results in windows of one day
+    start_ts = pd.Timestamp(start_date).normalize()
+    end_ts = pd.Timestamp(end_date).normalize()
+    window_starts = [start_ts] + [
+        boundary
+        for boundary in pd.date_range(start_ts, end_ts, freq=chunk_freq)
+        .normalize()
+        .unique()
+        if start_ts < boundary <= end_ts
+    ]
+    window_ends = [
+        window_start - pd.Timedelta(days=1) for window_start in window_starts[1:]
+    ] + [end_ts]
+    return [
+        (window_start.strftime(API_DT_FMT), window_end.strftime(API_DT_FMT))
+        for window_start, window_end in zip(window_starts, window_ends)
+    ]
+
+
+def _get_periods(days):
+    # group consecutive days into (first day, last day) periods
+    periods = []
+    for day in days:
+        if periods and day - periods[-1][1] == pd.Timedelta(days=1):
+            periods[-1][1] = day
+        else:
+            periods.append([day, day])
+    return periods
+
+
+def _get_stations_gdf(stations_data, crs):
+    stations_df = pd.json_normalize(stations_data)
+    geom_cols = GEOM_COL_DICT[crs]
+    # build the geometries from the coordinate arrays at once (rather than a `Point`
+    # for each row)
+    return gpd.GeoDataFrame(
+        stations_df.drop(geom_cols, axis=1),
+        geometry=gpd.points_from_xy(
+            *(stations_df[geom_col].astype(np.float64) for geom_col in geom_cols)
+        ),
+        crs=crs,
+    )
+
+
+def _get_catalogue_stations_gdf(stations_data, crs):
+    # get the geo-data frame of the whole stations catalogue, which is only rebuilt
+    # (with its spatial index) when the catalogue data changes, i.e., when the catalogue
+    # cache returns a different object
+    with _catalogue_stations_gdfs_lock:
+        cached = _catalogue_stations_gdfs.get(crs)
+        if cached is None or cached[0] is not stations_data:
+            stations_gdf = _get_stations_gdf(stations_data, crs)
+            # ACHTUNG: build the spatial index now (it is lazily built and then cached
+            # by geopandas) so that it is shared by all the regions and datasets
+            stations_gdf.sindex
+            cached = (stations_data, stations_gdf)
+            _catalogue_stations_gdfs[crs] = cached
+        return cached[1]
+
+
+def _split_key(key):
+    station_id, variable_code, measurement = key.rsplit("_", 2)
+    return station_id, int(variable_code), measurement
+
+
+def _parse_data(content, sensors, stations_ids, time_name, dtype):
+    if orjson is None:
+        data = json.loads(content)["data"]
+    else:
+        data = orjson.loads(content)["data"]
+    if len(data) == 0:
+        return pd.DataFrame(
+            index=pd.DatetimeIndex([], name=time_name),
+            columns=pd.MultiIndex.from_arrays([[], [], []], names=SENSOR_LEVELS),
+            dtype=dtype,
+        )
+    records_df = pd.DataFrame.from_records(data)
+    index = pd.DatetimeIndex(pd.to_datetime(records_df.pop("date")), name=time_name)
+    # convert all the values at once, first trying the fast path that works when the
+    # values are numbers or numeric strings
+    values = records_df.to_numpy(dtype=object)
+    values[pd.isna(values)] = np.nan
+    try:
+        values = values.astype(np.float64)
+    except (TypeError, ValueError):
+        values = pd.to_numeric(values.ravel(), errors="coerce").reshape(values.shape)
+    # ACHTUNG: note that agrometeo returns the data indexed by keys of the form
+    # "{station_id}_{variable_code}_{measurement}", which are mapped to (station id,
+    # variable code, measurement) tuples with a precomputed dict (unexpected keys are
+    # split instead)
+    key_dict = {
+        f"{station_id}_{variable_code}_{measurement}": (
+            station_id,
+            variable_code,
+            measurement,
+        )
+        for station_id in stations_ids
+        for variable_code, measurement in sensors
+    }
+    return pd.DataFrame(
+        values,
+        index=index,
+        columns=pd.MultiIndex.from_tuples(
+            [key_dict.get(key) or _split_key(key) for key in records_df.columns],
+            names=SENSOR_LEVELS,
+        ),
+    ).astype(dtype, copy=False)
+
+
+def _get_sensor_ts_df(ts_df, sensor):
+    # select the columns of a sensor, i.e., a (variable code, measurement) pair, as a
+    # data frame with a column for each station id
+    sensor_ts_df = ts_df.loc[
+        :,
+        (ts_df.columns.get_level_values(SENSOR_LEVELS[1]) == sensor[0])
+        & (ts_df.columns.get_level_values(SENSOR_LEVELS[2]) == sensor[1]),
+    ]
+    sensor_ts_df.columns = sensor_ts_df.columns.get_level_values(SENSOR_LEVELS[0])
+    return sensor_ts_df
+
+
+def _get_request_url(sensors, start_date, end_date, scale, stations_ids):
+    _sensors = [
+        f"{variable_code}%3A{measurement}" for variable_code, measurement in sensors
+    ]
+    return f"{METEO_DATA_API_ENDPOINT}?" + "&".join(
+        [
+            f"from={start_date}",
+            f"to={end_date}",
+            f"scale={scale}",
+            f"sensors={QUERY_LIST_SEP.join(_sensors)}",
+            f"stations={QUERY_LIST_SEP.join(stations_ids)}",
+        ]
+    )
+
+
+def _get_stations_batches(stations_ids, max_stations, max_url_length, base_url_length):
+    # greedily fill each batch until either the number of stations or the length of
+    # the resulting request url exceeds the maximum
+    stations_batches = []
+    batch = []
+    url_length = base_url_length
+    for station_id in stations_ids:
+        id_length = len(station_id) + (len(QUERY_LIST_SEP) if batch else 0)
+        if batch and (
+            len(batch) == max_stations or url_length + id_length > max_url_length
+        ):
+            stations_batches.append(batch)
+            batch = []
+            url_length = base_url_length
+            id_length = len(station_id)
+        batch.append(station_id)
+        url_length += id_length
+    if batch:
+        stations_batches.append(batch)
+    return stations_batches
+
+
+def _get_fetch_tasks(sensors, periods, scale, stations_ids, chunk_freq):
+    # split the requested periods into time windows and the stations into batches
+    if scale in CHUNKABLE_SCALES:
+        windows = [
+            window
+            for start_date, end_date in periods
+            for window in _get_date_windows(start_date, end_date, chunk_freq)
+        ]
+    else:
+        windows = periods
+    stations_batches = _get_stations_batches(
+        stations_ids,
+        settings.MAX_STATIONS_PER_REQUEST,
+        settings.MAX_URL_LENGTH,
+        max(len(_get_request_url(sensors, *window, scale, [])) for window in windows),
+    )
+    return stations_batches, windows
+
+
+def _stitch_ts_dfs(window_ts_dfs, stations_batches, windows, dtype):
+    # stitch the windows of each batch together (row-wise) and then merge the batches
+    # (column-wise). Note that `window_ts_dfs` must follow the order of
+    # `itertools.product(stations_batches, windows)`
+    batch_ts_dfs = []
+    for i in range(len(stations_batches)):
+        batch_ts_df = pd.concat(
+            window_ts_dfs[i * len(windows) : (i + 1) * len(windows)]
+        )
+        batch_ts_dfs.append(batch_ts_df[~batch_ts_df.index.duplicated()])
+    # ACHTUNG: stations missing from some windows are filled with NaN on concatenation,
+    # which may upcast their columns
+    return pd.concat(batch_ts_dfs, axis=1).astype(dtype, copy=False)
+
+
+def _get_missing_periods(missing_days):
+    # the `to` day is inclusive (see `_get_date_windows`), so each period of missing
+    # days is requested as is
+    return [tuple(period) for period in _get_periods(missing_days)]
+
+
+def _concat_sensor_ts_dfs(sensor_ts_dfs, dtype):
+    # concatenate the data frames of each sensor into a single data frame with the
+    # `SENSOR_LEVELS` columns
+    ts_df = pd.concat(
+        sensor_ts_dfs.values(), axis=1, keys=sensor_ts_dfs.keys()
+    ).reorder_levels([2, 0, 1], axis=1)
+    ts_df.columns.names = SENSOR_LEVELS
+    return ts_df.astype(dtype, copy=False)
+
+
+class _TokenBucket:
+    """Thread-safe token bucket rate limiter."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token, returning the number of seconds until it is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+            # ACHTUNG: the token is reserved even if the bucket is empty (i.e., the
+            # number of tokens can become negative) so that concurrent callers wait in
+            # turns rather than competing for the next token
+            self._tokens -= 1
+            return max(-self._tokens / self.rate, 0)
+
+    def acquire(self):
+        """Take a token, waiting until it is available."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+def _get_retry_wait(response, i):
+    # honor the "Retry-After" header (in seconds) if provided, otherwise back off
+    # exponentially
+    try:
+        return float(response.headers["Retry-After"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return RETRY_BACKOFF_FACTOR * 2**i
+
+
+class APIClient:
+    """HTTP client shared by all the requests to the agrometeo API."""
+
+    def __init__(
+        self,
+        *,
+        timeout=None,
+        num_retries=None,
+        rate_limit=None,
+        rate_limit_burst=None,
+        pool_maxsize=None,
+    ):
+        """
+        Initialize an API client.
+
+        The client keeps a session with a pool of persistent connections, so that
+        consecutive (or concurrent) requests do not need a new TCP/TLS handshake. The
+        requests that fail due to connection errors, timeouts or "429" and "5xx"
+        responses are retried with exponential backoff, and the rate at which requests
+        are sent is limited with a token bucket.
+
+        Parameters
+        ----------
+        timeout : numeric or tuple, optional
+            Number of seconds to wait for the server to respond, or (connect, read)
+            tuple, as passed to `requests.Session.get`. If None, the value from
+            `settings.REQUEST_TIMEOUT` is used.
+        num_retries : int, optional
+            Default number of times that a request is retried after a failure. If
+            None, the value from `settings.NUM_RETRIES` is used.
+        rate_limit : numeric, optional
+            Maximum average number of requests per second. If None, the value from
+            `settings.RATE_LIMIT` is used, where a value of None means that the rate
+            is unlimited.
+        rate_limit_burst : int, optional
+            Maximum number of requests that can be sent at once before the rate limit
+            applies. If None, the value from `settings.RATE_LIMIT_BURST` is used.
+        pool_maxsize : int, optional
+            Maximum number of connections kept in the pool, which should be at least
+            the number of concurrent requests. If None, the value from
+            `settings.POOL_MAXSIZE` is used.
+        """
+        if timeout is None:
+            timeout = settings.REQUEST_TIMEOUT
+        self.timeout = timeout
+        if num_retries is None:
+            num_retries = settings.NUM_RETRIES
+        self.num_retries = num_retries
+        if rate_limit is None:
+            rate_limit = settings.RATE_LIMIT
+        if rate_limit_burst is None:
+            rate_limit_burst = settings.RATE_LIMIT_BURST
+        if rate_limit is None:
+            self._rate_limiter = None
+        else:
+            self._rate_limiter = _TokenBucket(rate_limit, rate_limit_burst)
+        if pool_maxsize is None:
+            pool_maxsize = settings.POOL_MAXSIZE
+
+        self.session = requests.Session()
+        # ACHTUNG: retries are handled in `get` (rather than by the adapter) so that
+        # they also go through the rate limiter
+        adapter = adapters.HTTPAdapter(pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url, *, headers=None, num_retries=None):
+        """
+        Send a GET request, retrying it on transient failures.
+
+        Parameters
+        ----------
+        url : str
+            Url of the request.
+        headers : dict, optional
+            Headers of the request.
+        num_retries : int, optional
+            Number of times that the request is retried after a failure. If None, the
+            `num_retries` attribute of the client is used.
+
+        Returns
+        -------
+        response : requests.Response
+            Response of the last try, whose status must be checked by the caller.
+        """
+        if num_retries is None:
+            num_retries = self.num_retries
+        with instrumentation.span("http", url=url) as attributes:
+            for i in range(num_retries + 1):
+                attributes["num_tries"] = i + 1
+                if self._rate_limiter is not None:
+                    self._rate_limiter.acquire()
+                try:
+                    response = self.session.get(
+                        url, headers=headers, timeout=self.timeout
+                    )
+                except (requests.ConnectionError, requests.Timeout):
+                    if i == num_retries:
+                        raise
+                    wait = RETRY_BACKOFF_FACTOR * 2**i
+                else:
+                    if (
+                        response.status_code not in RETRY_STATUS_CODES
+                        or i == num_retries
+                    ):
+                        _set_response_attributes(attributes, response)
+                        return response
+                    wait = _get_retry_wait(response, i)
+                time.sleep(wait)
+
+
+def _set_response_attributes(attributes, response):
+    # ACHTUNG: the bytes are those of the (decompressed) content
+    attributes["status_code"] = response.status_code
+    attributes["bytes"] = len(response.content)
+
+
+def _get_response(url, status_code, reason, headers, content):
+    # build a `requests.Response` so that the responses of the async client can be
+    # processed by the same code as those of the sync client
+    response = requests.Response()
+    response.url = url
+    response.status_code = status_code
+    response.reason = reason
+    response.headers = requests.structures.CaseInsensitiveDict(headers)
+    response._content = content
+    return response
+
+
+class AsyncAPIClient:
+    """Asynchronous HTTP client for the agrometeo API."""
+
+    def __init__(
+        self,
+        *,
+        timeout=None,
+        num_retries=None,
+        rate_limit=None,
+        rate_limit_burst=None,
+        max_concurrency=None,
+    ):
+        """
+        Initialize an asynchronous API client.
+
+        The client behaves as `APIClient` (connection pooling, retries with exponential
+        backoff and rate limiting) but its requests are coroutines, so that a single
+        event loop can drive many concurrent requests. Note that the underlying
+        `aiohttp.ClientSession` is bound to the event loop in which the first request
+        is sent, so the client must not be shared across event loops. The session can
+        be closed with `close` or by using the client as an async context manager.
+
+        Parameters
+        ----------
+        timeout : numeric or tuple, optional
+            Number of seconds to wait for the server to respond, or (connect, read)
+            tuple. If None, the value from `settings.REQUEST_TIMEOUT` is used.
+        num_retries : int, optional
+            Default number of times that a request is retried after a failure. If
+            None, the value from `settings.NUM_RETRIES` is used.
+        rate_limit : numeric, optional
+            Maximum average number of requests per second. If None, the value from
+            `settings.RATE_LIMIT` is used, where a value of None means that the rate
+            is unlimited.
+        rate_limit_burst : int, optional
+            Maximum number of requests that can be sent at once before the rate limit
+            applies. If None, the value from `settings.RATE_LIMIT_BURST` is used.
+        max_concurrency : int, optional
+            Maximum number of concurrent requests, which is also the size of the
+            connection pool. If None, the value from `settings.MAX_CONCURRENCY` is
+            used.
+        """
+        if aiohttp is None:
+            raise ImportError(
+                "The asynchronous client requires the aiohttp package. You can install"
+                " it using conda or pip. See https://github.com/aio-libs/aiohttp."
+            )
+        if timeout is None:
+            timeout = settings.REQUEST_TIMEOUT
+        if isinstance(timeout, tuple):
+            self.timeout = aiohttp.ClientTimeout(
+                sock_connect=timeout[0], sock_read=timeout[1]
+            )
+        else:
+            self.timeout = aiohttp.ClientTimeout(total=timeout)
+        if num_retries is None:
+            num_retries = settings.NUM_RETRIES
+        self.num_retries = num_retries
+        if rate_limit is None:
+            rate_limit = settings.RATE_LIMIT
+        if rate_limit_burst is None:
+            rate_limit_burst = settings.RATE_LIMIT_BURST
+        if rate_limit is None:
+            self._rate_limiter = None
+        else:
+            self._rate_limiter = _TokenBucket(rate_limit, rate_limit_burst)
+        if max_concurrency is None:
+            max_concurrency = settings.MAX_CONCURRENCY
+        self.max_concurrency = max_concurrency
+        # ACHTUNG: the session and semaphore are created lazily, i.e., within the
+        # running event loop
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def _request(self, url, headers):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+                timeout=self.timeout,
+            )
+        async with self._session.get(url, headers=headers) as response:
+            content = await response.read()
+        return _get_response(
+            url, response.status, response.reason, response.headers, content
+        )
+
+    async def get(self, url, *, headers=None, num_retries=None):
+        """
+        Send a GET request, retrying it on transient failures.
+
+        Parameters
+        ----------
+        url : str
+            Url of the request.
+        headers : dict, optional
+            Headers of the request.
+        num_retries : int, optional
+            Number of times that the request is retried after a failure. If None, the
+            `num_retries` attribute of the client is used.
+
+        Returns
+        -------
+        response : requests.Response
+            Response of the last try (with its content already read), whose status must
+            be checked by the caller.
+        """
+        if num_retries is None:
+            num_retries = self.num_retries
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        with instrumentation.span("http", url=url) as attributes:
+            for i in range(num_retries + 1):
+                attributes["num_tries"] = i + 1
+                if self._rate_limiter is not None:
+                    await asyncio.sleep(self._rate_limiter.reserve())
+                try:
+                    async with self._semaphore:
+                        response = await self._request(url, headers)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    if i == num_retries:
+                        raise
+                    wait = RETRY_BACKOFF_FACTOR * 2**i
+                else:
+                    if (
+                        response.status_code not in RETRY_STATUS_CODES
+                        or i == num_retries
+                    ):
+                        _set_response_attributes(attributes, response)
+                        return response
+                    wait = _get_retry_wait(response, i)
+                await asyncio.sleep(wait)
+
+    async def close(self):
+        """Close the underlying session, if any."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+# client of the ongoing asynchronous call of a dataset without its own async client,
+# see `_with_async_client`
+_call_async_client = contextvars.ContextVar("agrometeo_async_client", default=None)
+
+
+def _with_async_client(coro_func):
+    # ACHTUNG: the session of an async client is bound to the event loop of its first
+    # request, so a dataset without its own async client uses a new client for each
+    # asynchronous call (shared by its nested calls), which is closed at the end of the
+    # call. Otherwise, the dataset could not be used in another event loop (e.g., in
+    # successive `asyncio.run` calls) and its session would never be closed
+    @functools.wraps(coro_func)
+    async def _coro_func(self, *args, **kwargs):
+        if self._async_client is not None or _call_async_client.get() is not None:
+            return await coro_func(self, *args, **kwargs)
+        async with AsyncAPIClient() as async_client:
+            token = _call_async_client.set(async_client)
+            try:
+                return await coro_func(self, *args, **kwargs)
+            finally:
+                _call_async_client.reset(token)
+
+    return _coro_func
+
+
+def get_client():
+    """
+    Get the process-wide API client.
+
+    The client is initialized at the first call, using the values from `settings`.
+
+    Returns
+    -------
+    client : APIClient
+        API client shared by all the datasets that are not initialized with their own
+        `client`, so that they share the connection pool and rate limit.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = APIClient()
+    return _client
 
 
 class AgrometeoDataset(base.MeteoStationDataset):
@@ -49,6 +674,11 @@ class AgrometeoDataset(base.MeteoStationDataset):
         crs=None,
         geocode_to_gdf_kws=None,
         sjoin_kws=None,
+        ts_cache=None,
+        catalogue_cache=None,
+        region_cache=None,
+        client=None,
+        async_client=None,
     ):
         """
         Initialize an Agrometeo dataset.
@@ -65,6 +695,36 @@ class AgrometeoDataset(base.MeteoStationDataset):
             * A geometric object, e.g., shapely geometry
             * A filename or URL, a file-like object opened in binary ('rb') mode, or a
               Path object that will be passed to `geopandas.read_file`.
+        stations_id_name, time_name : str, optional
+            Names of the stations identifier and time index respectively. If None, the
+            values from `settings.STATIONS_ID_NAME` and `settings.TIME_NAME` are used.
+        crs : str, optional
+            CRS of the stations' geometries, which can be either `LONLAT_CRS` or
+            `LV03_CRS`. If None, `LONLAT_CRS` is used.
+        geocode_to_gdf_kws, sjoin_kws : dict, optional
+            Keyword arguments passed to `osmnx.geocode_to_gdf` and
+            `geopandas.GeoDataFrame.sjoin` respectively.
+        ts_cache : str, pathlib.Path object or `agrometeo.cache.TSCache`, optional
+            Persistent cache of the time series data, which can be provided as a
+            `TSCache` instance or as the path to its directory. If None, the data is
+            always fetched from the API.
+        catalogue_cache : `agrometeo.cache.CatalogueCache`, optional
+            Cache of the stations and sensors catalogues. If None, the process-wide
+            cache returned by `agrometeo.cache.get_catalogue_cache` is used, so that
+            the catalogues are shared across datasets.
+        region_cache : `agrometeo.cache.RegionCache`, optional
+            Cache of the geocoded regions and region files. If None, the process-wide
+            cache returned by `agrometeo.cache.get_region_cache` is used.
+        client : `agrometeo.core.APIClient`, optional
+            Client used to send all the requests to the API. If None, the process-wide
+            client returned by `agrometeo.core.get_client` is used.
+        async_client : `agrometeo.core.AsyncAPIClient`, optional
+            Client used to send the requests of the asynchronous methods, e.g.,
+            `aget_ts_df`. If None, a new client is initialized for each asynchronous
+            call and closed at its end, so that the dataset can be used across event
+            loops, e.g., in successive `asyncio.run` calls. Sharing a client across
+            datasets (within an event loop) makes them share the connection pool,
+            concurrency limit and rate limit.
         """
         # ACHTUNG: need to define the CRS before calling the parent's init
         if crs is None:
@@ -76,12 +736,27 @@ class AgrometeoDataset(base.MeteoStationDataset):
             stations_id_name=stations_id_name,
             time_name=time_name,
             geocode_to_gdf_kws=geocode_to_gdf_kws,
+            region_cache=region_cache,
         )
 
         if sjoin_kws is None:
             sjoin_kws = {}
         self.sjoin_kws = sjoin_kws
 
+        if ts_cache is not None and not isinstance(ts_cache, cache.TSCache):
+            ts_cache = cache.TSCache(ts_cache)
+        self.ts_cache = ts_cache
+
+        if catalogue_cache is None:
+            catalogue_cache = cache.get_catalogue_cache()
+        self.catalogue_cache = catalogue_cache
+
+        if client is None:
+            client = get_client()
+        self.client = client
+
+        self._async_client = async_client
+
     @property
     def CRS(self):  # pylint: disable=invalid-name
         """CRS of the data source."""
@@ -93,30 +768,11 @@ class AgrometeoDataset(base.MeteoStationDataset):
         try:
             return self._stations_gdf
         except AttributeError:
-            geom_cols = GEOM_COL_DICT[self.crs]
-            response = requests.get(STATIONS_API_ENDPOINT)
-            stations_df = pd.json_normalize(response.json()["data"])
-            # it is fine to filter out this ShapelyDeprecationWarning, see
-            # https://shapely.readthedocs.io/en/latest/migration.html
-            # #creating-numpy-arrays-of-geometry-objects
-            with warnings.catch_warnings():
-                warnings.filterwarnings("ignore", category=ShapelyDeprecationWarning)
-                stations_gdf = gpd.GeoDataFrame(
-                    stations_df.drop(geom_cols, axis=1),
-                    geometry=stations_df[geom_cols]
-                    .astype(np.float64)
-                    .apply(lambda xy_ser: Point(xy_ser[0], xy_ser[1]), axis=1),
-                    crs=self.crs,
+            with instrumentation.span("catalogue", url=STATIONS_API_ENDPOINT):
+                stations_data = self.catalogue_cache.get_data(
+                    STATIONS_API_ENDPOINT, get_func=self.client.get
                 )
-
-            _sjoin_kws = self.sjoin_kws.copy()
-            predicate = _sjoin_kws.pop("predicate", SJOIN_PREDICATE)
-            stations_gdf = stations_gdf.sjoin(
-                self.region.to_crs(stations_gdf.crs), predicate=predicate, **_sjoin_kws
-            )
-            # stations_gdf.index.name = self.stations_id_name
-
-            self._stations_gdf = stations_gdf
+            self._stations_gdf = self._process_stations_data(stations_data)
 
             return self._stations_gdf
 
@@ -126,34 +782,572 @@ class AgrometeoDataset(base.MeteoStationDataset):
         try:
             return self._variables_df
         except AttributeError:
-            response = requests.get(VARIABLES_API_ENDPOINT)
-            variables_df = pd.json_normalize(response.json()["data"])
+            with instrumentation.span("catalogue", url=VARIABLES_API_ENDPOINT):
+                variables_data = self.catalogue_cache.get_data(
+                    VARIABLES_API_ENDPOINT, get_func=self.client.get
+                )
+            self._variables_df = self._process_variables_data(variables_data)
 
-            # ACHTUNG: need to strip strings, at least in variables name column. Note
-            # that *it seems* that the integer type of variable code column is inferred
-            # correctly
-            variables_df[VARIABLES_NAME_COL] = variables_df[
-                VARIABLES_NAME_COL
-            ].str.strip()
+            return self._variables_df
 
-            self._variables_df = variables_df
+    @property
+    def async_client(self):
+        """Asynchronous API client, i.e., the one of the ongoing asynchronous call."""
+        if self._async_client is not None:
+            return self._async_client
+        return _call_async_client.get()
 
-            return self._variables_df
+    @_with_async_client
+    async def aload_catalogues(self):
+        """
+        Load the stations and variables catalogues asynchronously.
 
-    def _get_region_data(self, variable_code, start_date, end_date, scale, measurement):
-        # use a variable for the station ids just to keep the line below shorter
-        _stations_ids = self.stations_gdf[STATIONS_API_ID_COL].astype(str)
-        request_url = f"{METEO_DATA_API_ENDPOINT}?" + "&".join(
-            [
-                f"from={start_date}",
-                f"to={end_date}",
-                f"scale={scale}",
-                f"sensors={variable_code}%3A{measurement}",
-                f"stations={'%2C'.join(_stations_ids)}",
+        Once loaded, the catalogues are available as the `stations_gdf` and
+        `variables_df` attributes without any blocking request. Note that this is
+        called by `aget_ts_df` and `aget_ts_gdf` if needed.
+        """
+        if hasattr(self, "_stations_gdf") and hasattr(self, "_variables_df"):
+            return
+        with instrumentation.span("catalogue"):
+            stations_data, variables_data = await asyncio.gather(
+                self.catalogue_cache.aget_data(
+                    STATIONS_API_ENDPOINT, self.async_client.get
+                ),
+                self.catalogue_cache.aget_data(
+                    VARIABLES_API_ENDPOINT, self.async_client.get
+                ),
+            )
+        if not hasattr(self, "_stations_gdf"):
+            self._stations_gdf = self._process_stations_data(stations_data)
+        if not hasattr(self, "_variables_df"):
+            self._variables_df = self._process_variables_data(variables_data)
+
+    def _process_stations_data(self, stations_data):
+        catalogue_stations_gdf = _get_catalogue_stations_gdf(stations_data, self.crs)
+        with instrumentation.span(
+            "sjoin", num_catalogue_stations=len(catalogue_stations_gdf)
+        ) as attributes:
+            stations_gdf = self._sjoin_stations(catalogue_stations_gdf)
+            attributes["num_rows"] = len(stations_gdf)
+        return stations_gdf
+
+    def _sjoin_stations(self, catalogue_stations_gdf):
+        _sjoin_kws = self.sjoin_kws.copy()
+        predicate = _sjoin_kws.pop("predicate", SJOIN_PREDICATE)
+        # ACHTUNG: only join the region geometries (with an unnamed index) so that the
+        # region columns cannot clash with the stations' ones (e.g., "name") and the
+        # region of each station is always in the `_region_index_col` column
+        region = self.region[[self.region.geometry.name]].rename_axis(None)
+        if region.crs != catalogue_stations_gdf.crs:
+            region = region.to_crs(catalogue_stations_gdf.crs)
+        inverse_predicate = INVERSE_PREDICATES.get(predicate)
+        if inverse_predicate is None or set(_sjoin_kws) - {"rsuffix"}:
+            # other predicates or sjoin options (e.g., `how`)
+            return catalogue_stations_gdf.sjoin(
+                region, predicate=predicate, **_sjoin_kws
+            )
+
+        # query the (prebuilt) spatial index of the catalogue rather than joining, and
+        # sort the matches by station (as in the output of `sjoin`)
+        region_idx, station_idx = catalogue_stations_gdf.sindex.query(
+            region.geometry, predicate=inverse_predicate
+        )
+        order = np.lexsort((region_idx, station_idx))
+        return catalogue_stations_gdf.iloc[station_idx[order]].assign(
+            **{self._region_index_col: region.index[region_idx[order]]}
+        )
+
+    @property
+    def _region_index_col(self):
+        # column of `stations_gdf` with the index of the region that contains each
+        # station, as set by `geopandas.sjoin`
+        return f"index_{self.sjoin_kws.get('rsuffix', 'right')}"
+
+    def _get_query_stations_gdf(self):
+        # stations of the dataset (without duplicates) with their spatial index, which
+        # is built once and reused by all the nearest/within-distance queries
+        try:
+            return self._query_stations_gdf
+        except AttributeError:
+            query_stations_gdf = self.stations_gdf.drop_duplicates(
+                subset=STATIONS_API_ID_COL
+            ).drop(columns=self._region_index_col, errors="ignore")
+            query_stations_gdf.sindex
+            self._query_stations_gdf = query_stations_gdf
+            return self._query_stations_gdf
+
+    def _process_geoms_arg(self, geoms):
+        # get a geo-series in the dataset's CRS
+        if isinstance(geoms, gpd.GeoDataFrame):
+            geoms = geoms.geometry
+        elif not isinstance(geoms, gpd.GeoSeries):
+            geoms = gpd.GeoSeries(geoms, crs=self.crs)
+        if geoms.crs is None:
+            return geoms.set_crs(self.crs)
+        return geoms.to_crs(self.crs)
+
+    def _get_query_gdf(self, geoms, geom_idx, station_idx):
+        # get the matched stations indexed by the (index of the) query geometries, with
+        # their distance and sorted by geometry and distance
+        query_stations_gdf = self._get_query_stations_gdf()
+        distances = (
+            geoms.iloc[geom_idx]
+            .distance(query_stations_gdf.geometry.iloc[station_idx], align=False)
+            .to_numpy()
+        )
+        order = np.lexsort((distances, geom_idx))
+        query_gdf = query_stations_gdf.iloc[station_idx[order]].assign(
+            **{settings.DISTANCE_NAME: distances[order]}
+        )
+        query_gdf.index = geoms.index[geom_idx[order]]
+        return query_gdf, geom_idx[order]
+
+    def get_nearest_stations(self, geoms, *, k=1, max_distance=None):
+        """
+        Get the nearest stations of each geometry.
+
+        The stations are queried with a spatial index that is built once for the
+        dataset, so that the stations of many geometries (e.g., field parcels) can be
+        obtained at once.
+
+        Parameters
+        ----------
+        geoms : geopandas.GeoSeries, geopandas.GeoDataFrame or list-like of geometric
+                objects
+            Query geometries. If they have no CRS, they are assumed to be in the CRS
+            of the dataset.
+        k : int, default 1
+            Number of nearest stations of each geometry. Note that if `k` is 1, all
+            the stations that are equidistant to a geometry are returned.
+        max_distance : numeric, optional
+            Maximum distance (in units of the dataset's CRS) of the stations to each
+            geometry. If None, the distance is not limited.
+
+        Returns
+        -------
+        nearest_gdf : gpd.GeoDataFrame
+            Geo-data frame with a row for each (geometry, station) pair, indexed by the
+            index of `geoms` and with the columns of `stations_gdf` plus a
+            `settings.DISTANCE_NAME` column, sorted by geometry and distance.
+        """
+        geoms = self._process_geoms_arg(geoms)
+        sindex = self._get_query_stations_gdf().sindex
+        if k == 1:
+            geom_idx, station_idx = sindex.nearest(
+                geoms, return_all=True, max_distance=max_distance
+            )
+            return self._get_query_gdf(geoms, geom_idx, station_idx)[0]
+
+        if max_distance is None:
+            # ACHTUNG: the spatial index only returns the nearest station, so for `k`
+            # greater than 1 the distances to all the stations are computed (note that
+            # there are at most a few hundred stations)
+            num_stations = len(self._get_query_stations_gdf())
+            geom_idx = np.repeat(np.arange(len(geoms)), num_stations)
+            station_idx = np.tile(np.arange(num_stations), len(geoms))
+        else:
+            geom_idx, station_idx = self._query_within_distance(geoms, max_distance)
+        query_gdf, geom_idx = self._get_query_gdf(geoms, geom_idx, station_idx)
+        # keep the `k` first (i.e., nearest) stations of each geometry
+        rank = np.arange(len(geom_idx)) - np.searchsorted(geom_idx, geom_idx)
+        return query_gdf[rank < k]
+
+    def _query_within_distance(self, geoms, distance):
+        # query the stations whose bounding box intersects the bounding box of each
+        # geometry expanded by `distance` (square caps and mitre joins), and then keep
+        # those within `distance`
+        query_stations_gdf = self._get_query_stations_gdf()
+        geom_idx, station_idx = query_stations_gdf.sindex.query(
+            geoms.envelope.buffer(distance, cap_style=3, join_style=2)
+        )
+        mask = (
+            geoms.iloc[geom_idx]
+            .distance(query_stations_gdf.geometry.iloc[station_idx], align=False)
+            .to_numpy()
+            <= distance
+        )
+        return geom_idx[mask], station_idx[mask]
+
+    def get_stations_within_distance(self, geoms, distance):
+        """
+        Get the stations within a distance of each geometry.
+
+        Parameters
+        ----------
+        geoms : geopandas.GeoSeries, geopandas.GeoDataFrame or list-like of geometric
+                objects
+            Query geometries. If they have no CRS, they are assumed to be in the CRS
+            of the dataset.
+        distance : numeric
+            Distance (in units of the dataset's CRS).
+
+        Returns
+        -------
+        within_gdf : gpd.GeoDataFrame
+            Geo-data frame with a row for each (geometry, station) pair, as returned by
+            `get_nearest_stations`.
+        """
+        geoms = self._process_geoms_arg(geoms)
+        return self._get_query_gdf(
+            geoms, *self._query_within_distance(geoms, distance)
+        )[0]
+
+    def _process_variables_data(self, variables_data):
+        variables_df = pd.json_normalize(variables_data)
+
+        # ACHTUNG: need to strip strings, at least in variables name column. Note that
+        # *it seems* that the integer type of variable code column is inferred correctly
+        variables_df[VARIABLES_NAME_COL] = variables_df[VARIABLES_NAME_COL].str.strip()
+
+        return variables_df
+
+    def _get_variable_code(self, variable):
+        # variable is a string that can be either:
+        # a) an agrometeo variable code
+        # b) an essential climate variable (ECV) following the meteostations-geopy
+        # nomenclature
+        # c) an agrometeo variable name
+        if isinstance(variable, int) or variable.isdigit():
+            # case a: if variable is an integer, assert that it is a valid variable code
+            variable_code = int(variable)
+            if variable_code not in self.variables_df[VARIABLES_CODE_COL].values:
+                raise ValueError(
+                    f"variable {variable} is not a valid agrometeo variable code"
+                )
+            return variable_code
+        else:
+            # case b or c: if variable is an ECV, it will be a key in the ECV_DICT so
+            # the agrometeo variable code can be retrieved directly, otherwise we
+            # assume that variable is an agrometeo variable name
+            agm_variable_name = settings.ECV_DICT.get(variable, variable)
+            return self.variables_df.loc[
+                self.variables_df[VARIABLES_NAME_COL] == agm_variable_name,
+                VARIABLES_CODE_COL,
+            ].item()
+
+    def _get_region_data(
+        self, sensors, start_date, end_date, scale, stations_ids, num_retries
+    ):
+        return self.client.get(
+            _get_request_url(sensors, start_date, end_date, scale, stations_ids),
+            num_retries=num_retries,
+        )
+
+    def _fetch_window(
+        self, sensors, start_date, end_date, scale, stations_ids, num_retries, dtype
+    ):
+        # retry each window individually so that a transient failure does not require
+        # fetching the whole requested period again
+        response = self._get_region_data(
+            sensors, start_date, end_date, scale, stations_ids, num_retries
+        )
+        response.raise_for_status()
+        # parse the response within the thread so that it can be garbage-collected as
+        # soon as possible
+        with instrumentation.span("parse", bytes=len(response.content)) as attributes:
+            ts_df = _parse_data(
+                response.content, sensors, stations_ids, self.time_name, dtype
+            )
+            attributes["num_rows"], attributes["num_columns"] = ts_df.shape
+        return ts_df
+
+    def _fetch_ts_df(
+        self,
+        sensors,
+        periods,
+        scale,
+        stations_ids,
+        chunk_freq,
+        max_workers,
+        num_retries,
+        dtype,
+    ):
+        # query the API, splitting the requested periods into time windows and the
+        # stations into batches so that neither the responses nor the request urls get
+        # too large. The requests for each window and batch are fetched concurrently.
+        # Note that all the sensors are requested at once.
+        stations_batches, windows = _get_fetch_tasks(
+            sensors, periods, scale, stations_ids, chunk_freq
+        )
+        with instrumentation.span(
+            "fetch", num_requests=len(stations_batches) * len(windows)
+        ) as attributes:
+            with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                window_ts_dfs = list(
+                    executor.map(
+                        instrumentation.bind_span(
+                            lambda task: self._fetch_window(
+                                sensors, *task[1], scale, task[0], num_retries, dtype
+                            )
+                        ),
+                        itertools.product(stations_batches, windows),
+                    )
+                )
+            ts_df = _stitch_ts_dfs(window_ts_dfs, stations_batches, windows, dtype)
+            attributes["num_rows"], attributes["num_columns"] = ts_df.shape
+        return ts_df
+
+    def _get_ts_df(
+        self, sensors, start_date, end_date, scale, stations_ids, dtype, **fetch_kws
+    ):
+        # get the data, either from the API or from the cache (when provided), in which
+        # case only the days and stations missing from the cache are fetched
+        if self.ts_cache is None or scale not in CACHEABLE_SCALES:
+            return self._fetch_ts_df(
+                sensors,
+                [(start_date, end_date)],
+                scale,
+                stations_ids,
+                dtype=dtype,
+                **fetch_kws,
+            )
+
+        days = pd.date_range(start_date, end_date, freq="D")
+        sensor_ts_dfs, missing_dict = self._get_cached_ts_dfs(
+            sensors, days, scale, stations_ids
+        )
+        for (missing_days, missing_stations_ids), _sensors in missing_dict.items():
+            fetched_ts_df = self._fetch_ts_df(
+                _sensors,
+                _get_missing_periods(missing_days),
+                scale,
+                missing_stations_ids,
+                # ACHTUNG: always cache the data at full precision
+                dtype=np.float64,
+                **fetch_kws,
+            )
+            self._put_cached_ts_df(
+                fetched_ts_df,
+                _sensors,
+                scale,
+                missing_days,
+                missing_stations_ids,
+                sensor_ts_dfs,
+            )
+
+        return _concat_sensor_ts_dfs(sensor_ts_dfs, dtype)
+
+    def _get_cached_ts_dfs(self, sensors, days, scale, stations_ids):
+        # get the cached data frame of each sensor, and group the sensors that miss the
+        # same days and stations so that they can be fetched together
+        sensor_ts_dfs = {}
+        missing_dict = {}
+        with instrumentation.span("ts_cache", num_days=len(days)):
+            for sensor in sensors:
+                ts_df, missing_days, missing_stations_ids = self.ts_cache.get_ts_df(
+                    *sensor, scale, days, stations_ids
+                )
+                sensor_ts_dfs[sensor] = ts_df
+                if missing_days:
+                    missing_dict.setdefault(
+                        (tuple(missing_days), tuple(missing_stations_ids)), []
+                    ).append(sensor)
+        return sensor_ts_dfs, missing_dict
+
+    def _put_cached_ts_df(
+        self,
+        fetched_ts_df,
+        sensors,
+        scale,
+        missing_days,
+        missing_stations_ids,
+        sensor_ts_dfs,
+    ):
+        # put the fetched data of each sensor into the cache and combine it with the
+        # cached data (in place) in `sensor_ts_dfs`
+        fetched_ts_df = fetched_ts_df[
+            fetched_ts_df.index.normalize().isin(missing_days)
+        ]
+        with instrumentation.span("ts_cache.put", num_days=len(missing_days)):
+            for sensor in sensors:
+                sensor_ts_df = _get_sensor_ts_df(fetched_ts_df, sensor)
+                self.ts_cache.put_ts_df(
+                    sensor_ts_df, *sensor, scale, missing_days, missing_stations_ids
+                )
+                sensor_ts_dfs[sensor] = sensor_ts_df.combine_first(
+                    sensor_ts_dfs[sensor]
+                )
+
+    async def _afetch_window(
+        self, sensors, start_date, end_date, scale, stations_ids, num_retries, dtype
+    ):
+        response = await self.async_client.get(
+            _get_request_url(sensors, start_date, end_date, scale, stations_ids),
+            num_retries=num_retries,
+        )
+        response.raise_for_status()
+        # parse the response in the default executor so that it does not block the
+        # event loop
+        with instrumentation.span("parse", bytes=len(response.content)) as attributes:
+            ts_df = await asyncio.get_running_loop().run_in_executor(
+                None,
+                _parse_data,
+                response.content,
+                sensors,
+                stations_ids,
+                self.time_name,
+                dtype,
+            )
+            attributes["num_rows"], attributes["num_columns"] = ts_df.shape
+        return ts_df
+
+    async def _afetch_ts_df(
+        self, sensors, periods, scale, stations_ids, chunk_freq, num_retries, dtype
+    ):
+        # asynchronous counterpart of `_fetch_ts_df`, where the number of concurrent
+        # requests is bounded by the async client
+        stations_batches, windows = _get_fetch_tasks(
+            sensors, periods, scale, stations_ids, chunk_freq
+        )
+        with instrumentation.span(
+            "fetch", num_requests=len(stations_batches) * len(windows)
+        ) as attributes:
+            window_ts_dfs = await asyncio.gather(
+                *[
+                    self._afetch_window(
+                        sensors, *window, scale, stations_batch, num_retries, dtype
+                    )
+                    for stations_batch, window in itertools.product(
+                        stations_batches, windows
+                    )
+                ]
+            )
+            ts_df = _stitch_ts_dfs(window_ts_dfs, stations_batches, windows, dtype)
+            attributes["num_rows"], attributes["num_columns"] = ts_df.shape
+        return ts_df
+
+    async def _aget_ts_df(
+        self, sensors, start_date, end_date, scale, stations_ids, dtype, **fetch_kws
+    ):
+        # asynchronous counterpart of `_get_ts_df`, where the (blocking) cache reads
+        # and writes are run in the default executor
+        if self.ts_cache is None or scale not in CACHEABLE_SCALES:
+            return await self._afetch_ts_df(
+                sensors,
+                [(start_date, end_date)],
+                scale,
+                stations_ids,
+                dtype=dtype,
+                **fetch_kws,
+            )
+
+        loop = asyncio.get_running_loop()
+        days = pd.date_range(start_date, end_date, freq="D")
+        sensor_ts_dfs, missing_dict = await loop.run_in_executor(
+            None,
+            instrumentation.bind_span(self._get_cached_ts_dfs),
+            sensors,
+            days,
+            scale,
+            stations_ids,
+        )
+        missing_items = list(missing_dict.items())
+        fetched_ts_dfs = await asyncio.gather(
+            *[
+                self._afetch_ts_df(
+                    _sensors,
+                    _get_missing_periods(missing_days),
+                    scale,
+                    missing_stations_ids,
+                    # ACHTUNG: always cache the data at full precision
+                    dtype=np.float64,
+                    **fetch_kws,
+                )
+                for (missing_days, missing_stations_ids), _sensors in missing_items
             ]
         )
+        for ((missing_days, missing_stations_ids), _sensors), fetched_ts_df in zip(
+            missing_items, fetched_ts_dfs
+        ):
+            await loop.run_in_executor(
+                None,
+                instrumentation.bind_span(self._put_cached_ts_df),
+                fetched_ts_df,
+                _sensors,
+                scale,
+                missing_days,
+                missing_stations_ids,
+                sensor_ts_dfs,
+            )
+
+        return _concat_sensor_ts_dfs(sensor_ts_dfs, dtype)
+
+    def _get_sensors(self, variable, measurement):
+        # get the list of (variable code, measurement) pairs to request, the mapping
+        # of each variable code to the variable label (as provided) to be used in the
+        # returned data frame, and whether multiple sensors have been requested
+        multi_sensor = pd.api.types.is_list_like(variable) or pd.api.types.is_list_like(
+            measurement
+        )
+        if not pd.api.types.is_list_like(variable):
+            variable = [variable]
+        variables_dict = {}
+        for _variable in variable:
+            variables_dict.setdefault(self._get_variable_code(_variable), _variable)
+        if measurement is None:
+            measurement = MEASUREMENT
+        if not pd.api.types.is_list_like(measurement):
+            measurement = [measurement]
+        sensors = list(itertools.product(variables_dict, measurement))
+        return sensors, variables_dict, multi_sensor
+
+    def _get_stations_ids(self):
+        # ACHTUNG: if `region` has overlapping geometries, a station can appear in
+        # several rows of `stations_gdf` (one for each region that contains it), but
+        # its data must only be fetched once
+        return self.stations_gdf[STATIONS_API_ID_COL].astype(str).drop_duplicates()
 
-        return requests.get(request_url)
+    def _set_ts_columns(self, ts_df, stations_id_col, variables_dict, multi_sensor):
+        with instrumentation.span("remap", num_columns=len(ts_df.columns)):
+            return self._remap_ts_columns(
+                ts_df, stations_id_col, variables_dict, multi_sensor
+            )
+
+    def _get_long_categories(
+        self, stations_id_col, sensors, variables_dict, multi_sensor
+    ):
+        # categories of the column levels of the long data frames, which are shared by
+        # all the windows (and by the synchronous and asynchronous methods) so that
+        # the data frames can be concatenated as categoricals
+        categories = [self.stations_gdf[stations_id_col].unique()]
+        if multi_sensor:
+            categories += [
+                list(variables_dict.values()),
+                list(dict.fromkeys(measurement for _, measurement in sensors)),
+            ]
+        return categories
+
+    def _remap_ts_columns(self, ts_df, stations_id_col, variables_dict, multi_sensor):
+        # ACHTUNG: to properly set the columns as the desired station identifier (e.g.,
+        # "id" or "name") we need to map the station ids with the stations_gdf.
+        stations_dict = dict(
+            zip(
+                self.stations_gdf[STATIONS_API_ID_COL].astype(str),
+                self.stations_gdf[stations_id_col],
+            )
+        )
+        stations_columns = pd.Index(
+            ts_df.columns.get_level_values(SENSOR_LEVELS[0]).map(stations_dict),
+            name=stations_id_col,
+        )
+        if multi_sensor:
+            ts_df.columns = pd.MultiIndex.from_arrays(
+                [
+                    stations_columns,
+                    ts_df.columns.get_level_values(SENSOR_LEVELS[1]).map(
+                        variables_dict
+                    ),
+                    ts_df.columns.get_level_values(SENSOR_LEVELS[2]),
+                ],
+                names=[
+                    stations_id_col,
+                    settings.VARIABLE_NAME,
+                    settings.MEASUREMENT_NAME,
+                ],
+            )
+        else:
+            ts_df.columns = stations_columns
+        return ts_df
 
     def get_ts_df(
         self,
@@ -164,96 +1358,381 @@ class AgrometeoDataset(base.MeteoStationDataset):
         scale=None,
         measurement=None,
         stations_id_col=None,
+        chunk_freq=None,
+        max_workers=None,
+        num_retries=None,
+        long_format=False,
+        dtype=None,
+        dropna=False,
     ):
         """
         Get time series data frame.
 
         Parameters
         ----------
-        variable : str or int
+        variable : str, int or list-like of str or int
             Target variable, which can be either an agrometeo variable code (integer or
             string), an essential climate variable (ECV) following the
             meteostations-geopy nomenclature (string), or an agrometeo variable name
-            (string).
+            (string). A list-like of variables can also be provided, in which case they
+            are requested together and the returned data frame has a column for each
+            (station, variable, measurement) triplet.
         start_date, end_date : str or datetime
             String in the "YYYY-MM-DD" format or datetime instance, respectively
-            representing the start and end of the  requested data period.
+            representing the first and last (inclusive) days of the requested data
+            period.
         scale : None or {"hour", "day", "month", "year"}, default None
             Temporal scale of the measurements. The default value of None returns the
             finest scale, i.e., 10 minutes.
-        measurement : {"min", "avg", "max"}, default "avg"
+        measurement : {"min", "avg", "max"} or list-like, default "avg"
             Whether the measurement values correspond to the minimum, average or maximum
-            value for the required temporal scale. Ignored if `scale` is None.
+            value for the required temporal scale. Ignored if `scale` is None. A
+            list-like of measurements can also be provided, in which case the returned
+            data frame has a column for each (station, variable, measurement) triplet.
         stations_id_col : str, optional
             Column of `stations_gdf` that will be used in the returned data frame to
             identify the stations. If None, the value from
             `settings.DEFAULT_STATIONS_ID_COL` will be used.
+        chunk_freq : str or pandas.DateOffset, optional
+            Length of the time windows into which the requested period is split, each
+            of which is fetched with a separate API request. Ignored if `scale` is
+            "month" or "year". If None, the value from `settings.CHUNK_FREQ` is used.
+            Since the API is queried by days, the window boundaries are rounded down
+            to whole days.
+        max_workers : int, optional
+            Maximum number of time windows that are fetched concurrently. If None, the
+            value from `settings.MAX_WORKERS` is used.
+        num_retries : int, optional
+            Number of times that the request of a time window is retried after a
+            failure before raising. If None, the value from `settings.NUM_RETRIES` is
+            used.
+        long_format : bool, default False
+            Whether the data frame should be returned in long (tidy) format, i.e., with
+            a row for each measurement and columns for the time, station identifier and
+            measured value. In such case, the data frame is built by time windows (see
+            `iter_ts_df`) so that the wide data frame is never fully materialized.
+        dtype : str, numpy.dtype or pandas.api.extensions.ExtensionDtype, optional
+            Data type of the measurement values, e.g., "float32" to halve the memory
+            usage, or a nullable type such as "Float32" so that missing values are
+            represented as `pd.NA`. If None, the value from `settings.TS_DTYPE` is
+            used.
+        dropna : bool, default False
+            Whether the rows of missing measurements are dropped from the long data
+            frame. Ignored if `long_format` is False.
 
         Returns
         -------
         ts_df : pd.DataFrame
             Data frame with a time series of meaurements (rows) at each station
-            (columns).
+            (columns). If `variable` or `measurement` are list-like, the columns are a
+            multi-index of (station, variable, measurement) triplets, named after
+            `stations_id_col`, `settings.VARIABLE_NAME` and `settings.MEASUREMENT_NAME`
+            respectively. If `long_format` is True, data frame with a row for each
+            measurement and columns named after `time_name`, `stations_id_name`
+            (`settings.VARIABLE_NAME` and `settings.MEASUREMENT_NAME` if list-like
+            `variable` or `measurement` are provided) and `settings.VALUE_NAME`, where
+            all but the time and value columns are categorical.
         """
-        # process the variable arg
-        # variable is a string that can be either:
-        # a) an agrometeo variable code
-        # b) an essential climate variable (ECV) following the meteostations-geopy
-        # nomenclature
-        # c) an agrometeo variable name
-        if isinstance(variable, int) or variable.isdigit():
-            # case a: if variable is an integer, assert that it is a valid variable code
-            variable_code = int(variable)
-            if variable_code not in self.variables_df[VARIABLES_CODE_COL].values:
-                raise ValueError(
-                    f"variable {variable} is not a valid agrometeo variable code"
+        with instrumentation.span("get_ts_df") as attributes:
+            if long_format:
+                # ACHTUNG: melt the data frame of each window as soon as it is fetched
+                # so that the wide data frame of the whole period is never built
+                ts_df = pd.concat(
+                    self.iter_ts_df(
+                        variable,
+                        start_date,
+                        end_date,
+                        scale=scale,
+                        measurement=measurement,
+                        stations_id_col=stations_id_col,
+                        chunk_freq=chunk_freq,
+                        max_workers=max_workers,
+                        num_retries=num_retries,
+                        long_format=True,
+                        dtype=dtype,
+                        dropna=dropna,
+                    ),
+                    ignore_index=True,
                 )
-        else:
-            # case b or c: if variable is an ECV, it will be a key in the ECV_DICT so
-            # the agrometeo variable code can be retrieved directly, otherwise we
-            # assume that variable is an agrometeo variable name
-            agm_variable_name = settings.ECV_DICT.get(variable, variable)
-            variable_code = self.variables_df.loc[
-                self.variables_df[VARIABLES_NAME_COL] == agm_variable_name,
-                VARIABLES_CODE_COL,
-            ].item()
+                attributes["num_rows"], attributes["num_columns"] = ts_df.shape
+                return ts_df
+
+            # process the variable and measurement args
+            sensors, variables_dict, multi_sensor = self._get_sensors(
+                variable, measurement
+            )
+            # process date args
+            if isinstance(start_date, datetime.datetime):
+                start_date = start_date.strftime(API_DT_FMT)
+            if isinstance(end_date, datetime.datetime):
+                end_date = end_date.strftime(API_DT_FMT)
+            # process scale arg
+            if scale is None:
+                # the API needs it to be lowercase
+                scale = SCALE
+            # process the stations_id_col arg
+            if stations_id_col is None:
+                stations_id_col = settings.DEFAULT_STATIONS_ID_COL
+            # process the fetching args
+            if chunk_freq is None:
+                chunk_freq = settings.CHUNK_FREQ
+            if max_workers is None:
+                max_workers = settings.MAX_WORKERS
+            if num_retries is None:
+                num_retries = settings.NUM_RETRIES
+            # process the dtype arg
+            if dtype is None:
+                dtype = settings.TS_DTYPE
+
+            stations_ids = self._get_stations_ids()
+            attributes.update(
+                scale=scale, num_sensors=len(sensors), num_stations=len(stations_ids)
+            )
+            ts_df = self._get_ts_df(
+                sensors,
+                start_date,
+                end_date,
+                scale,
+                stations_ids,
+                dtype,
+                chunk_freq=chunk_freq,
+                max_workers=max_workers,
+                num_retries=num_retries,
+            )
+            ts_df = self._set_ts_columns(
+                ts_df, stations_id_col, variables_dict, multi_sensor
+            )
+
+            ts_df = ts_df.sort_index()
+            attributes["num_rows"], attributes["num_columns"] = ts_df.shape
+
+        return ts_df
+
+    def iter_ts_df(
+        self,
+        variable,
+        start_date,
+        end_date,
+        *,
+        scale=None,
+        measurement=None,
+        stations_id_col=None,
+        chunk_freq=None,
+        max_workers=None,
+        num_retries=None,
+        long_format=False,
+        dtype=None,
+        dropna=False,
+    ):
+        """
+        Iterate over the time series data frame by time windows.
+
+        The requested period is split into time windows of length `chunk_freq`, and
+        the data frame of each window is yielded (in chronological order) as soon as it
+        has been fetched and parsed. At most `max_workers` windows are fetched ahead,
+        so that memory usage is bounded by the window length rather than the whole
+        requested period.
+
+        Parameters
+        ----------
+        variable : str, int or list-like of str or int
+            Target variable, which can be either an agrometeo variable code (integer or
+            string), an essential climate variable (ECV) following the
+            meteostations-geopy nomenclature (string), or an agrometeo variable name
+            (string). A list-like of variables can also be provided, in which case they
+            are requested together and the yielded data frames have a column for each
+            (station, variable, measurement) triplet.
+        start_date, end_date : str or datetime
+            String in the "YYYY-MM-DD" format or datetime instance, respectively
+            representing the first and last (inclusive) days of the requested data
+            period.
+        scale : None or {"hour", "day", "month", "year"}, default None
+            Temporal scale of the measurements. The default value of None returns the
+            finest scale, i.e., 10 minutes.
+        measurement : {"min", "avg", "max"} or list-like, default "avg"
+            Whether the measurement values correspond to the minimum, average or maximum
+            value for the required temporal scale. Ignored if `scale` is None. A
+            list-like of measurements can also be provided, in which case the yielded
+            data frames have a column for each (station, variable, measurement) triplet.
+        stations_id_col : str, optional
+            Column of `stations_gdf` that will be used in the yielded data frames to
+            identify the stations. If None, the value from
+            `settings.DEFAULT_STATIONS_ID_COL` will be used.
+        chunk_freq : str or pandas.DateOffset, optional
+            Length of the time windows into which the requested period is split. Ignored
+            if `scale` is "month" or "year", in which case a single data frame is
+            yielded. If None, the value from `settings.CHUNK_FREQ` is used. Since the
+            API is queried by days, the window boundaries are rounded down to whole
+            days.
+        max_workers : int, optional
+            Maximum number of requests that are fetched concurrently, which is also the
+            maximum number of time windows fetched ahead. If None, the value from
+            `settings.MAX_WORKERS` is used.
+        num_retries : int, optional
+            Number of times that a request is retried after a failure before raising.
+            If None, the value from `settings.NUM_RETRIES` is used.
+        long_format : bool, default False
+            Whether the data frames should be yielded in long (tidy) format, i.e., with
+            a row for each measurement and columns for the time, station identifier and
+            measured value.
+        dtype : str, numpy.dtype or pandas.api.extensions.ExtensionDtype, optional
+            Data type of the measurement values, e.g., "float32" to halve the memory
+            usage, or a nullable type such as "Float32" so that missing values are
+            represented as `pd.NA`. If None, the value from `settings.TS_DTYPE` is
+            used.
+        dropna : bool, default False
+            Whether the rows of missing measurements are dropped from the long data
+            frame. Ignored if `long_format` is False.
+
+        Yields
+        ------
+        ts_df : pd.DataFrame
+            Data frame with a time series of meaurements (rows) at each station
+            (columns) for a time window. If `long_format` is True, data frame in long
+            format, as returned by `get_ts_df`. The categories of the categorical
+            columns are the same for all the windows.
+        """
+        # process the variable and measurement args
+        sensors, variables_dict, multi_sensor = self._get_sensors(variable, measurement)
         # process date args
         if isinstance(start_date, datetime.datetime):
             start_date = start_date.strftime(API_DT_FMT)
         if isinstance(end_date, datetime.datetime):
             end_date = end_date.strftime(API_DT_FMT)
-        # process scale and measurement args
+        # process scale arg
         if scale is None:
             # the API needs it to be lowercase
             scale = SCALE
-        if measurement is None:
-            measurement = MEASUREMENT
         # process the stations_id_col arg
         if stations_id_col is None:
             stations_id_col = settings.DEFAULT_STATIONS_ID_COL
+        # process the fetching args
+        if chunk_freq is None:
+            chunk_freq = settings.CHUNK_FREQ
+        if max_workers is None:
+            max_workers = settings.MAX_WORKERS
+        if num_retries is None:
+            num_retries = settings.NUM_RETRIES
+        # process the dtype arg
+        if dtype is None:
+            dtype = settings.TS_DTYPE
 
-        # query the API
-        response = self._get_region_data(
-            variable_code, start_date, end_date, scale, measurement
-        )
-
-        # parse the response as a data frame
-        ts_df = pd.json_normalize(response.json()["data"]).set_index("date")
-        ts_df.index = pd.to_datetime(ts_df.index)
-        ts_df.index.name = self.time_name
-        # ts_df.columns = self.stations_gdf[STATIONS_ID_COL]
-        # ACHTUNG: note that agrometeo returns the data indexed by keys of the form
-        # "{station_id}_{variable_code}_{measurement}", so to properly set the columns
-        # as the desired station identifier (e.g., "id" or "name") we need to first get
-        # the ids and then get (loc) the station data from the stations_gdf.
-        ts_df.columns = self.stations_gdf.set_index(STATIONS_API_ID_COL).loc[
-            ts_df.columns.str.replace(f"_{variable_code}_{measurement}", "").astype(
-                self.stations_gdf[STATIONS_API_ID_COL].dtype
+        stations_ids = self._get_stations_ids()
+        if long_format:
+            # use the same categories for all the windows
+            categories = self._get_long_categories(
+                stations_id_col, sensors, variables_dict, multi_sensor
             )
-        ][stations_id_col]
-        ts_df = ts_df.apply(pd.to_numeric, axis=1)
+        if scale in CHUNKABLE_SCALES:
+            windows = _get_date_windows(start_date, end_date, chunk_freq)
+        else:
+            windows = [(start_date, end_date)]
+        # ACHTUNG: each window is fetched by a single worker (with its station batches
+        # fetched sequentially) so that the overall number of concurrent requests is
+        # bounded by `max_workers`
+        with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = collections.deque()
+            windows_iter = iter(windows)
+            last_ts = None
+            while True:
+                # keep at most `max_workers` windows fetched ahead
+                for window in itertools.islice(
+                    windows_iter, max_workers - len(pending)
+                ):
+                    pending.append(
+                        executor.submit(
+                            instrumentation.bind_span(self._get_ts_df),
+                            sensors,
+                            *window,
+                            scale,
+                            stations_ids,
+                            dtype,
+                            chunk_freq=chunk_freq,
+                            max_workers=1,
+                            num_retries=num_retries,
+                        )
+                    )
+                if not pending:
+                    break
+                ts_df = pending.popleft().result().sort_index()
+                # drop the timestamps of the boundary shared with the previous window
+                if last_ts is not None:
+                    ts_df = ts_df[ts_df.index > last_ts]
+                if len(ts_df.index) > 0:
+                    last_ts = ts_df.index[-1]
+                ts_df = self._set_ts_columns(
+                    ts_df, stations_id_col, variables_dict, multi_sensor
+                )
+                if long_format:
+                    ts_df = base._long_ts_df(
+                        ts_df,
+                        self.stations_id_name,
+                        self.time_name,
+                        settings.VALUE_NAME,
+                        categories=categories,
+                        dropna=dropna,
+                    )
+                yield ts_df
 
-        return ts_df.sort_index()
+    def get_regions_ts_df(
+        self, variable, start_date, end_date, *, regions_id_col=None, **get_ts_df_kws
+    ):
+        """
+        Get a time series data frame for each region.
+
+        When the dataset's `region` has several rows (e.g., communes), the stations
+        of all the regions are obtained with a single spatial join, and the data of
+        each station is fetched only once, even if it is in several (overlapping)
+        regions. The data is then split by region.
+
+        Parameters
+        ----------
+        variable : str, int or list-like of str or int
+            Target variable, as in `get_ts_df`.
+        start_date, end_date : str or datetime
+            String in the "YYYY-MM-DD" format or datetime instance, respectively
+            representing the first and last (inclusive) days of the requested data
+            period.
+        regions_id_col : str, optional
+            Column of the dataset's `region` used to identify the regions. If None, the
+            regions are identified by the index of `region`.
+        **get_ts_df_kws
+            Keyword arguments passed to `get_ts_df`, e.g., `scale`, `measurement`,
+            `stations_id_col` or `long_format`.
+
+        Returns
+        -------
+        regions_ts_dfs : dict
+            Mapping of each region identifier to the data frame of the stations within
+            the region, as returned by `get_ts_df`. Regions without any station are
+            mapped to an empty data frame.
+        """
+        ts_df = self.get_ts_df(variable, start_date, end_date, **get_ts_df_kws)
+
+        stations_id_col = get_ts_df_kws.get("stations_id_col")
+        if stations_id_col is None:
+            stations_id_col = settings.DEFAULT_STATIONS_ID_COL
+        if regions_id_col is None:
+            regions_ids = self.region.index
+        else:
+            regions_ids = self.region[regions_id_col]
+        region_stations_ser = self.stations_gdf.groupby(self._region_index_col)[
+            stations_id_col
+        ].unique()
+        if get_ts_df_kws.get("long_format"):
+            ts_stations = ts_df[self.stations_id_name]
+        else:
+            ts_stations = ts_df.columns.get_level_values(0)
+
+        regions_ts_dfs = {}
+        for region_index, region_id in zip(self.region.index, regions_ids):
+            mask = ts_stations.isin(region_stations_ser.get(region_index, []))
+            if get_ts_df_kws.get("long_format"):
+                regions_ts_dfs[region_id] = ts_df[mask].reset_index(drop=True)
+            else:
+                regions_ts_dfs[region_id] = ts_df.loc[:, mask]
+
+        return regions_ts_dfs
 
     def get_ts_gdf(
         self,
@@ -264,30 +1743,57 @@ class AgrometeoDataset(base.MeteoStationDataset):
         scale=None,
         measurement=None,
         stations_id_col=None,
+        chunk_freq=None,
+        max_workers=None,
+        num_retries=None,
+        dtype=None,
     ):
         """
         Get time series geo-data frame.
 
         Parameters
         ----------
-        variable : str or int
+        variable : str, int or list-like of str or int
             Target variable, which can be either an agrometeo variable code (integer or
             string), an essential climate variable (ECV) following the
             meteostations-geopy nomenclature (string), or an agrometeo variable name
-            (string).
+            (string). A list-like of variables can also be provided, in which case they
+            are requested together and the returned geo-data frame has a row for each
+            (station, variable, measurement) triplet.
         start_date, end_date : str or datetime
             String in the "YYYY-MM-DD" format or datetime instance, respectively
-            representing the start and end of the  requested data period.
+            representing the first and last (inclusive) days of the requested data
+            period.
         scale : None or {"hour", "day", "month", "year"}, default None
             Temporal scale of the measurements. The default value of None returns the
             finest scale, i.e., 10 minutes.
-        measurement : {"min", "avg", "max"}, default "avg"
+        measurement : {"min", "avg", "max"} or list-like, default "avg"
             Whether the measurement values correspond to the minimum, average or maximum
-            value for the required temporal scale. Ignored if `scale` is None.
+            value for the required temporal scale. Ignored if `scale` is None. A
+            list-like of measurements can also be provided, in which case the returned
+            geo-data frame has a row for each (station, variable, measurement) triplet.
         stations_id_col : str, optional
             Column of `stations_gdf` that will be used in the returned data frame to
             identify the stations. If None, the value from
             `settings.DEFAULT_STATIONS_ID_COL` is used.
+        chunk_freq : str or pandas.DateOffset, optional
+            Length of the time windows into which the requested period is split, each
+            of which is fetched with a separate API request. Ignored if `scale` is
+            "month" or "year". If None, the value from `settings.CHUNK_FREQ` is used.
+            Since the API is queried by days, the window boundaries are rounded down
+            to whole days.
+        max_workers : int, optional
+            Maximum number of time windows that are fetched concurrently. If None, the
+            value from `settings.MAX_WORKERS` is used.
+        num_retries : int, optional
+            Number of times that the request of a time window is retried after a
+            failure before raising. If None, the value from `settings.NUM_RETRIES` is
+            used.
+        dtype : str, numpy.dtype or pandas.api.extensions.ExtensionDtype, optional
+            Data type of the measurement values, e.g., "float32" to halve the memory
+            usage, or a nullable type such as "Float32" so that missing values are
+            represented as `pd.NA`. If None, the value from `settings.TS_DTYPE` is
+            used.
 
         Returns
         -------
@@ -295,7 +1801,7 @@ class AgrometeoDataset(base.MeteoStationDataset):
             Geo-data frame with a time series of meaurements (columns) at each station
             (rows), with an additional geometry column with the stations' locations.
         """
-        ts_gdf = gpd.GeoDataFrame(
+        return self._get_ts_gdf(
             self.get_ts_df(
                 variable,
                 start_date,
@@ -303,14 +1809,543 @@ class AgrometeoDataset(base.MeteoStationDataset):
                 scale=scale,
                 measurement=measurement,
                 stations_id_col=stations_id_col,
-            ).T
+                chunk_freq=chunk_freq,
+                max_workers=max_workers,
+                num_retries=num_retries,
+                dtype=dtype,
+            )
         )
-        # get the geometry from stations_gdf
-        ts_gdf["geometry"] = self.stations_gdf.set_index(ts_gdf.index.name).loc[
-            ts_gdf.index
-        ]["geometry"]
-        # sort the timestamp columns
-        ts_columns = ts_gdf.columns.drop("geometry")
-        ts_gdf = ts_gdf[sorted(ts_columns) + ["geometry"]]
-
-        return ts_gdf
+
+    @_with_async_client
+    async def aget_ts_df(
+        self,
+        variable,
+        start_date,
+        end_date,
+        *,
+        scale=None,
+        measurement=None,
+        stations_id_col=None,
+        chunk_freq=None,
+        num_retries=None,
+        long_format=False,
+        dtype=None,
+        dropna=False,
+    ):
+        """
+        Get time series data frame asynchronously.
+
+        The catalogues are loaded with `aload_catalogues` if needed, and all the time
+        windows and station batches of the requested period are fetched concurrently
+        with the `async_client`, whose `max_concurrency` bounds the number of
+        concurrent requests.
+
+        Parameters
+        ----------
+        variable : str, int or list-like of str or int
+            Target variable, which can be either an agrometeo variable code (integer or
+            string), an essential climate variable (ECV) following the
+            meteostations-geopy nomenclature (string), or an agrometeo variable name
+            (string). A list-like of variables can also be provided, in which case they
+            are requested together and the returned data frame has a column for each
+            (station, variable, measurement) triplet.
+        start_date, end_date : str or datetime
+            String in the "YYYY-MM-DD" format or datetime instance, respectively
+            representing the first and last (inclusive) days of the requested data
+            period.
+        scale : None or {"hour", "day", "month", "year"}, default None
+            Temporal scale of the measurements. The default value of None returns the
+            finest scale, i.e., 10 minutes.
+        measurement : {"min", "avg", "max"} or list-like, default "avg"
+            Whether the measurement values correspond to the minimum, average or maximum
+            value for the required temporal scale. Ignored if `scale` is None. A
+            list-like of measurements can also be provided, in which case the returned
+            data frame has a column for each (station, variable, measurement) triplet.
+        stations_id_col : str, optional
+            Column of `stations_gdf` that will be used in the returned data frame to
+            identify the stations. If None, the value from
+            `settings.DEFAULT_STATIONS_ID_COL` will be used.
+        chunk_freq : str or pandas.DateOffset, optional
+            Length of the time windows into which the requested period is split, each
+            of which is fetched with a separate API request. Ignored if `scale` is
+            "month" or "year". If None, the value from `settings.CHUNK_FREQ` is used.
+            Since the API is queried by days, the window boundaries are rounded down
+            to whole days.
+        num_retries : int, optional
+            Number of times that the request of a time window is retried after a
+            failure before raising. If None, the value from `settings.NUM_RETRIES` is
+            used.
+        long_format : bool, default False
+            Whether the data frame should be returned in long (tidy) format, i.e., with
+            a row for each measurement and columns for the time, station identifier and
+            measured value.
+        dtype : str, numpy.dtype or pandas.api.extensions.ExtensionDtype, optional
+            Data type of the measurement values, e.g., "float32" to halve the memory
+            usage, or a nullable type such as "Float32" so that missing values are
+            represented as `pd.NA`. If None, the value from `settings.TS_DTYPE` is
+            used.
+        dropna : bool, default False
+            Whether the rows of missing measurements are dropped from the long data
+            frame. Ignored if `long_format` is False.
+
+        Returns
+        -------
+        ts_df : pd.DataFrame
+            Data frame with a time series of meaurements (rows) at each station
+            (columns), as returned by `get_ts_df`.
+        """
+        with instrumentation.span("aget_ts_df") as attributes:
+            await self.aload_catalogues()
+            # process the variable and measurement args
+            sensors, variables_dict, multi_sensor = self._get_sensors(
+                variable, measurement
+            )
+            # process date args
+            if isinstance(start_date, datetime.datetime):
+                start_date = start_date.strftime(API_DT_FMT)
+            if isinstance(end_date, datetime.datetime):
+                end_date = end_date.strftime(API_DT_FMT)
+            # process scale arg
+            if scale is None:
+                # the API needs it to be lowercase
+                scale = SCALE
+            # process the stations_id_col arg
+            if stations_id_col is None:
+                stations_id_col = settings.DEFAULT_STATIONS_ID_COL
+            # process the fetching args
+            if chunk_freq is None:
+                chunk_freq = settings.CHUNK_FREQ
+            if num_retries is None:
+                num_retries = settings.NUM_RETRIES
+            # process the dtype arg
+            if dtype is None:
+                dtype = settings.TS_DTYPE
+
+            stations_ids = self._get_stations_ids()
+            attributes.update(
+                scale=scale, num_sensors=len(sensors), num_stations=len(stations_ids)
+            )
+            ts_df = await self._aget_ts_df(
+                sensors,
+                start_date,
+                end_date,
+                scale,
+                stations_ids,
+                dtype,
+                chunk_freq=chunk_freq,
+                num_retries=num_retries,
+            )
+            ts_df = self._set_ts_columns(
+                ts_df, stations_id_col, variables_dict, multi_sensor
+            ).sort_index()
+            if long_format:
+                ts_df = base._long_ts_df(
+                    ts_df,
+                    self.stations_id_name,
+                    self.time_name,
+                    settings.VALUE_NAME,
+                    categories=self._get_long_categories(
+                        stations_id_col, sensors, variables_dict, multi_sensor
+                    ),
+                    dropna=dropna,
+                )
+            attributes["num_rows"], attributes["num_columns"] = ts_df.shape
+
+        return ts_df
+
+    async def aget_ts_gdf(
+        self,
+        variable,
+        start_date,
+        end_date,
+        *,
+        scale=None,
+        measurement=None,
+        stations_id_col=None,
+        chunk_freq=None,
+        num_retries=None,
+        dtype=None,
+    ):
+        """
+        Get time series geo-data frame asynchronously.
+
+        Parameters
+        ----------
+        variable : str, int or list-like of str or int
+            Target variable, as in `aget_ts_df`.
+        start_date, end_date : str or datetime
+            String in the "YYYY-MM-DD" format or datetime instance, respectively
+            representing the first and last (inclusive) days of the requested data
+            period.
+        scale, measurement, stations_id_col, chunk_freq, num_retries, dtype : optional
+            Same as in `aget_ts_df`.
+
+        Returns
+        -------
+        ts_gdf : gpd.GeoDataFrame
+            Geo-data frame with a time series of meaurements (columns) at each station
+            (rows), with an additional geometry column with the stations' locations.
+        """
+        return self._get_ts_gdf(
+            await self.aget_ts_df(
+                variable,
+                start_date,
+                end_date,
+                scale=scale,
+                measurement=measurement,
+                stations_id_col=stations_id_col,
+                chunk_freq=chunk_freq,
+                num_retries=num_retries,
+                dtype=dtype,
+            )
+        )
+
+    def _get_ts_gdf(self, ts_df):
+        # ACHTUNG: avoid copies of the (potentially huge) wide data frame. The
+        # timestamps are only sorted if needed (the time series data frames are
+        # already sorted), and for numpy dtypes, the station-by-time values are built
+        # as the transposed view of the values array
+        if not ts_df.index.is_monotonic_increasing:
+            ts_df = ts_df.sort_index()
+        if all(isinstance(dtype, np.dtype) for dtype in ts_df.dtypes):
+            values_df = pd.DataFrame(
+                ts_df.to_numpy().T,
+                index=ts_df.columns,
+                columns=ts_df.index,
+                copy=False,
+            )
+        else:
+            # extension dtypes, e.g., nullable floats, cannot be viewed as a 2D array
+            values_df = ts_df.T
+        # get the geometry from stations_gdf (note that the station identifiers are in
+        # the first level of the index if multiple variables or measurements have been
+        # requested)
+        stations_index = values_df.index.get_level_values(0)
+        geometry = (
+            self.stations_gdf.drop_duplicates(subset=STATIONS_API_ID_COL)
+            .set_index(stations_index.name)
+            .geometry.loc[stations_index]
+            .values
+        )
+
+        return gpd.GeoDataFrame(values_df, geometry=geometry, copy=False)
+
+    def get_ts_sync(
+        self,
+        variable,
+        *,
+        scale=None,
+        measurement=None,
+        stations_id_col=None,
+        buffer_size=None,
+        lookback=None,
+        state_filepath=None,
+        max_workers=None,
+        num_retries=None,
+        dtype=None,
+    ):
+        """
+        Get an incremental synchronization of the latest measurements.
+
+        Parameters
+        ----------
+        variable : str, int or list-like of str or int
+            Target variable, which can be either an agrometeo variable code (integer or
+            string), an essential climate variable (ECV) following the
+            meteostations-geopy nomenclature (string), or an agrometeo variable name
+            (string). A list-like of variables can also be provided.
+        scale : None or {"hour", "day"}, default None
+            Temporal scale of the measurements. The default value of None synchronizes
+            the finest scale, i.e., 10 minutes.
+        measurement : {"min", "avg", "max"} or list-like, default "avg"
+            Whether the measurement values correspond to the minimum, average or maximum
+            value for the required temporal scale. Ignored if `scale` is None. A
+            list-like of measurements can also be provided.
+        stations_id_col : str, optional
+            Column of `stations_gdf` that will be used in the returned data frames to
+            identify the stations. If None, the value from
+            `settings.DEFAULT_STATIONS_ID_COL` is used.
+        buffer_size : int, optional
+            Number of timestamps kept in the in-memory ring buffer. If None, the value
+            from `settings.SYNC_BUFFER_SIZE` is used.
+        lookback : str or pandas.Timedelta, optional
+            Period requested for the stations and sensors that have not been
+            synchronized yet. If None, the value from `settings.SYNC_LOOKBACK` is used.
+        state_filepath : str, optional
+            Path to the JSON file where the last timestamp of each station and sensor
+            is persisted, so that the synchronization can be resumed across sessions.
+            If None, the state is only kept in memory.
+        max_workers : int, optional
+            Maximum number of requests that are fetched concurrently. If None, the
+            value from `settings.MAX_WORKERS` is used.
+        num_retries : int, optional
+            Number of times that a request is retried after a failure before raising.
+            If None, the value from `settings.NUM_RETRIES` is used.
+        dtype : str, numpy.dtype or pandas.api.extensions.ExtensionDtype, optional
+            Data type of the measurement values. If None, the value from
+            `settings.TS_DTYPE` is used.
+
+        Returns
+        -------
+        ts_sync : TSSync
+            Incremental synchronization, whose `poll` method fetches the measurements
+            since the last poll.
+        """
+        return TSSync(
+            self,
+            variable,
+            scale=scale,
+            measurement=measurement,
+            stations_id_col=stations_id_col,
+            buffer_size=buffer_size,
+            lookback=lookback,
+            state_filepath=state_filepath,
+            max_workers=max_workers,
+            num_retries=num_retries,
+            dtype=dtype,
+        )
+
+
+def _get_sync_key(scale, sensor):
+    # key of the persisted sync state of a sensor
+    return ":".join(str(part) for part in [scale, *sensor])
+
+
+class TSSync:
+    """Incremental synchronization of the latest measurements of a set of stations."""
+
+    def __init__(
+        self,
+        agm_ds,
+        variable,
+        *,
+        scale=None,
+        measurement=None,
+        stations_id_col=None,
+        buffer_size=None,
+        lookback=None,
+        state_filepath=None,
+        max_workers=None,
+        num_retries=None,
+        dtype=None,
+    ):
+        """
+        Initialize the synchronization.
+
+        Each call to `poll` only requests the measurements after the last timestamp
+        seen for each station and sensor, which are appended to an in-memory ring
+        buffer of fixed length. Since the API has a daily granularity, the requests
+        cover the days since the last timestamp seen, and the measurements that have
+        already been seen are discarded locally.
+
+        See `AgrometeoDataset.get_ts_sync` for the description of the arguments,
+        where `agm_ds` is the `AgrometeoDataset` instance whose stations are
+        synchronized.
+        """
+        self.agm_ds = agm_ds
+        self.sensors, variables_dict, multi_sensor = agm_ds._get_sensors(
+            variable, measurement
+        )
+        if scale is None:
+            scale = SCALE
+        if scale not in CHUNKABLE_SCALES:
+            raise ValueError(
+                f"scale {scale} cannot be synchronized. Must be one of "
+                f"{CHUNKABLE_SCALES}"
+            )
+        self.scale = scale
+        if stations_id_col is None:
+            stations_id_col = settings.DEFAULT_STATIONS_ID_COL
+        if buffer_size is None:
+            buffer_size = settings.SYNC_BUFFER_SIZE
+        self.buffer_size = buffer_size
+        if lookback is None:
+            lookback = settings.SYNC_LOOKBACK
+        self.lookback = pd.Timedelta(lookback)
+        if state_filepath is not None:
+            state_filepath = path.abspath(state_filepath)
+        self.state_filepath = state_filepath
+        if max_workers is None:
+            max_workers = settings.MAX_WORKERS
+        self.max_workers = max_workers
+        if num_retries is None:
+            num_retries = settings.NUM_RETRIES
+        self.num_retries = num_retries
+        if dtype is None:
+            dtype = settings.TS_DTYPE
+        self.dtype = dtype
+
+        # the buffer has a fixed column for each station and sensor
+        self._stations_ids = list(agm_ds._get_stations_ids())
+        self._columns = pd.MultiIndex.from_tuples(
+            [
+                (station_id, *sensor)
+                for station_id in self._stations_ids
+                for sensor in self.sensors
+            ],
+            names=SENSOR_LEVELS,
+        )
+        self.columns = agm_ds._set_ts_columns(
+            pd.DataFrame(columns=self._columns),
+            stations_id_col,
+            variables_dict,
+            multi_sensor,
+        ).columns
+
+        # ring buffer, where `_head` is the slot of the next timestamp and `_slots`
+        # maps the (int64) buffered timestamps to their slot
+        self._times = np.full(buffer_size, np.datetime64("NaT"), dtype="datetime64[ns]")
+        self._values = np.full((buffer_size, len(self._columns)), np.nan)
+        self._head = 0
+        self._num_rows = 0
+        self._slots = {}
+
+        # last timestamp seen for each column
+        self._last_times = np.full(
+            len(self._columns), np.datetime64("NaT"), dtype="datetime64[ns]"
+        )
+        if state_filepath is not None and path.exists(state_filepath):
+            state = self._load_state()
+            for i, (station_id, *sensor) in enumerate(self._columns):
+                last_time = state.get(_get_sync_key(scale, sensor), {}).get(station_id)
+                if last_time is not None:
+                    self._last_times[i] = np.datetime64(pd.Timestamp(last_time))
+
+    def _load_state(self):
+        with open(self.state_filepath) as src:
+            return json.load(src)
+
+    def _save_state(self):
+        # ACHTUNG: the state file can be shared with the synchronizations of other
+        # variables, so that it is updated rather than overwritten
+        if path.exists(self.state_filepath):
+            state = self._load_state()
+        else:
+            state = {}
+        for (station_id, *sensor), last_time in zip(self._columns, self._last_times):
+            if not np.isnat(last_time):
+                state.setdefault(_get_sync_key(self.scale, sensor), {})[
+                    station_id
+                ] = pd.Timestamp(last_time).isoformat()
+
+        def _dump(filepath):
+            with open(filepath, "w") as dst:
+                json.dump(state, dst)
+
+        cache._atomic_write(self.state_filepath, _dump)
+
+    @property
+    def last_timestamps(self):
+        """Last timestamp seen for each station and sensor."""
+        return pd.Series(self._last_times, index=self.columns)
+
+    @property
+    def buffer(self):
+        """Data frame with the buffered measurements, sorted by time."""
+        slots = (
+            np.arange(self._num_rows) + self._head - self._num_rows
+        ) % self.buffer_size
+        return pd.DataFrame(
+            self._values[slots],
+            index=pd.DatetimeIndex(self._times[slots], name=self.agm_ds.time_name),
+            columns=self.columns,
+        ).astype(self.dtype, copy=False)
+
+    def _append(self, times, values):
+        for _time, time_int, row in zip(times, times.view("i8"), values):
+            slot = self._slots.get(time_int)
+            if slot is not None:
+                # late measurements of an already buffered timestamp
+                self._values[slot] = np.where(np.isnan(row), self._values[slot], row)
+            elif self._num_rows == 0 or _time > self._times[self._head - 1]:
+                if self._num_rows == self.buffer_size:
+                    # overwrite the oldest timestamp
+                    del self._slots[self._times[self._head].view("i8")]
+                else:
+                    self._num_rows += 1
+                self._times[self._head] = _time
+                self._values[self._head] = row
+                self._slots[time_int] = self._head
+                self._head = (self._head + 1) % self.buffer_size
+            # otherwise, the timestamp is older than the buffered ones, which happens
+            # when a station catches up, and it is not buffered
+
+    def poll(self, *, end_date=None):
+        """
+        Fetch the measurements since the last poll.
+
+        Parameters
+        ----------
+        end_date : str or datetime, optional
+            End of the synchronized period, the measurements after which are
+            discarded. If None, all the available measurements are synchronized.
+
+        Returns
+        -------
+        ts_df : pd.DataFrame
+            Data frame with the new measurements (rows) at each station (columns),
+            with the same columns as `buffer`. Rows without any new measurement are
+            not included.
+        """
+        if end_date is None:
+            # ACHTUNG: the (naive) local time of the host can be behind the time of
+            # the API's measurements (e.g., a UTC host and Swiss time data), so it does
+            # not bound the synchronized measurements, and the next day is requested
+            # too so that the latest day of the API is always covered
+            end_ts = None
+            now = pd.Timestamp.now()
+            end_day = (now + pd.Timedelta(days=1)).strftime(API_DT_FMT)
+        else:
+            end_ts = pd.Timestamp(end_date)
+            now = end_ts
+            # the `to` day is inclusive (see `_get_date_windows`)
+            end_day = end_ts.strftime(API_DT_FMT)
+        # request each station from the day of the earliest last timestamp of its
+        # sensors, so that stations that are up to date share a single request
+        start_times = pd.Series(self._last_times, index=self._columns).fillna(
+            now - self.lookback
+        )
+        start_days = start_times.groupby(level=SENSOR_LEVELS[0], sort=False).min()
+        start_days = start_days.dt.normalize()
+        ts_dfs = [
+            self.agm_ds._fetch_ts_df(
+                self.sensors,
+                [(start_day.strftime(API_DT_FMT), end_day)],
+                self.scale,
+                list(stations_start_days.index),
+                settings.CHUNK_FREQ,
+                self.max_workers,
+                self.num_retries,
+                np.float64,
+            )
+            for start_day, stations_start_days in start_days.groupby(start_days)
+        ]
+        ts_df = pd.concat(ts_dfs, axis=1).reindex(columns=self._columns).sort_index()
+        if end_ts is not None:
+            ts_df = ts_df[ts_df.index <= end_ts]
+
+        # discard the measurements that have already been seen. For the columns that
+        # have not been synchronized yet, only those within the lookback are kept
+        times = ts_df.index.to_numpy(dtype="datetime64[ns]")
+        values = ts_df.to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+        thresholds = start_times.to_numpy(dtype="datetime64[ns]")
+        thresholds[np.isnat(self._last_times)] -= np.timedelta64(1, "ns")
+        values[times[:, np.newaxis] <= thresholds[np.newaxis, :]] = np.nan
+        valid = ~np.isnan(values)
+        rows = valid.any(axis=1)
+        times, values, valid = times[rows], values[rows], valid[rows]
+
+        if len(times) > 0:
+            # update the last timestamps of the columns with new measurements
+            updated = valid.any(axis=0)
+            last_rows = len(times) - 1 - np.argmax(valid[::-1], axis=0)
+            self._last_times[updated] = times[last_rows[updated]]
+            self._append(times, values)
+            if self.state_filepath is not None:
+                self._save_state()
+
+        return pd.DataFrame(
+            values,
+            index=pd.DatetimeIndex(times, name=self.agm_ds.time_name),
+            columns=self.columns,
+        ).astype(self.dtype, copy=False)
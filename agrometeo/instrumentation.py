@@ -0,0 +1,307 @@
+"""Instrumentation."""
+import contextlib
+import contextvars
+import itertools
+import json
+import logging
+import threading
+import time
+
+import pandas as pd
+
+__all__ = [
+    "add_hook",
+    "remove_hook",
+    "hooks",
+    "span",
+    "count",
+    "bind_span",
+    "log_event",
+    "EventRecorder",
+]
+
+SPAN_EVENT = "span"
+COUNTER_EVENT = "counter"
+LOGGER_NAME = "agrometeo"
+# items of the span events (other than the attributes)
+SPAN_COLUMNS = ["name", "span_id", "parent_id", "start_time", "duration"]
+
+# process-wide hooks, see `add_hook`
+_hooks = []
+_hooks_lock = threading.Lock()
+# identifier of the next span and of the current span (of each thread or task)
+_span_ids = itertools.count(1)
+_current_span_id = contextvars.ContextVar("agrometeo_span_id", default=None)
+
+
+def add_hook(hook):
+    """
+    Add a hook that receives the instrumentation events.
+
+    Parameters
+    ----------
+    hook : callable
+        Function that is called with each event, i.e., a dict with the "type" (either
+        `SPAN_EVENT` or `COUNTER_EVENT`), "name", "span_id" and "parent_id" items as
+        well as an "attributes" dict, e.g., the bytes transferred or the number of rows
+        and columns. Span events also have "start_time" (seconds since the epoch) and
+        "duration" (seconds) items, whereas counter events have a "value" item. Note
+        that hooks may be called concurrently from several threads, and that the
+        exceptions that they raise are logged (with the logger named after
+        `LOGGER_NAME`) rather than propagated.
+    """
+    with _hooks_lock:
+        _hooks.append(hook)
+
+
+def remove_hook(hook):
+    """
+    Remove a hook added with `add_hook`.
+
+    Parameters
+    ----------
+    hook : callable
+        Hook to remove.
+    """
+    with _hooks_lock:
+        _hooks.remove(hook)
+
+
+@contextlib.contextmanager
+def hooks(*funcs):
+    """
+    Context manager that adds hooks on enter and removes them on exit.
+
+    Parameters
+    ----------
+    *funcs : callable
+        Hooks, see `add_hook`.
+    """
+    for func in funcs:
+        add_hook(func)
+    try:
+        yield
+    finally:
+        for func in funcs:
+            remove_hook(func)
+
+
+def _emit(event):
+    # ACHTUNG: exceptions raised by hooks are logged rather than propagated, so that
+    # hooks cannot change the control flow of the instrumented code, e.g., replace the
+    # exception raised within a span or make a successful call fail
+    for hook in list(_hooks):
+        try:
+            hook(event)
+        except Exception:
+            logging.getLogger(LOGGER_NAME).exception(
+                "Instrumentation hook %r raised an exception", hook
+            )
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """
+    Context manager that times a stage and emits it as a span event on exit.
+
+    Spans opened within the context (in the same thread or task) are its children.
+    When there are no hooks, nothing is timed nor emitted.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage, e.g., "http" or "parse".
+    **attributes
+        Attributes of the span.
+
+    Yields
+    ------
+    attributes : dict
+        Attributes of the span, which can be updated within the context, e.g., with
+        the number of rows of its result. If the context raises, the name of the
+        exception is set as its "error" item.
+    """
+    if not _hooks:
+        yield attributes
+        return
+
+    span_id = next(_span_ids)
+    parent_id = _current_span_id.get()
+    token = _current_span_id.set(span_id)
+    start_time = time.time()
+    start = time.perf_counter()
+    try:
+        yield attributes
+    except BaseException as exc:
+        attributes["error"] = type(exc).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        _current_span_id.reset(token)
+        _emit(
+            {
+                "type": SPAN_EVENT,
+                "name": name,
+                "span_id": span_id,
+                "parent_id": parent_id,
+                "start_time": start_time,
+                "duration": duration,
+                "attributes": attributes,
+            }
+        )
+
+
+def count(name, value=1, **attributes):
+    """
+    Emit a counter event, e.g., a cache hit or miss.
+
+    Parameters
+    ----------
+    name : str
+        Name of the counter, e.g., "ts_cache.hit".
+    value : numeric, default 1
+        Value added to the counter.
+    **attributes
+        Attributes of the counter event.
+    """
+    if not _hooks:
+        return
+    _emit(
+        {
+            "type": COUNTER_EVENT,
+            "name": name,
+            "span_id": None,
+            "parent_id": _current_span_id.get(),
+            "value": value,
+            "attributes": attributes,
+        }
+    )
+
+
+def bind_span(func):
+    """
+    Bind a function to the current span, e.g., to run it in a thread pool.
+
+    The threads of a pool do not inherit the context of the thread that submits the
+    tasks, so the spans opened by the function would otherwise not be children of the
+    current span.
+
+    Parameters
+    ----------
+    func : callable
+        Function to bind.
+
+    Returns
+    -------
+    bound_func : callable
+        Function that runs `func` with the current span (at the time of binding) as
+        parent of the spans that it opens.
+    """
+    parent_id = _current_span_id.get()
+
+    def _func(*args, **kwargs):
+        token = _current_span_id.set(parent_id)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current_span_id.reset(token)
+
+    return _func
+
+
+def log_event(event):
+    """
+    Log an event as a JSON line, e.g., to be used as a hook.
+
+    The events are logged at the DEBUG level with the logger named after
+    `LOGGER_NAME`, so that structured logs can be obtained with
+    `agrometeo.add_hook(agrometeo.log_event)` and a logging handler.
+
+    Parameters
+    ----------
+    event : dict
+        Instrumentation event, see `add_hook`.
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(json.dumps(event, default=str))
+
+
+class EventRecorder:
+    """Hook that records the instrumentation events in memory."""
+
+    def __init__(self):
+        """
+        Initialize an event recorder.
+
+        The recorder can be passed to `add_hook` or `hooks`, e.g., to profile a
+        `get_ts_df` call, and then summarized with the `get_timings` and
+        `get_counters` methods.
+        """
+        self.events = []
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        """Record an event."""
+        with self._lock:
+            self.events.append(event)
+
+    def clear(self):
+        """Clear the recorded events."""
+        with self._lock:
+            self.events = []
+
+    def get_spans_df(self):
+        """
+        Get the recorded spans.
+
+        Returns
+        -------
+        spans_df : pd.DataFrame
+            Data frame with a row for each span (sorted by start time) and a column
+            for each span item and attribute.
+        """
+        records = [
+            {**{key: event[key] for key in SPAN_COLUMNS}, **event["attributes"]}
+            for event in self.events
+            if event["type"] == SPAN_EVENT
+        ]
+        if not records:
+            return pd.DataFrame(columns=SPAN_COLUMNS)
+        return pd.DataFrame(records).sort_values("start_time", ignore_index=True)
+
+    def get_timings(self):
+        """
+        Get the timing breakdown by stage.
+
+        Returns
+        -------
+        timings_df : pd.DataFrame
+            Data frame indexed by span name with the number of spans and their total,
+            mean and maximum duration (in seconds), sorted by total duration. Note that
+            the durations of nested or concurrent spans overlap.
+        """
+        return (
+            self.get_spans_df()
+            .groupby("name")["duration"]
+            .agg(["count", "sum", "mean", "max"])
+            .rename(columns={"sum": "total"})
+            .sort_values("total", ascending=False)
+        )
+
+    def get_counters(self):
+        """
+        Get the totals of the recorded counters.
+
+        Returns
+        -------
+        counters : pd.Series
+            Series indexed by counter name with the sum of its values.
+        """
+        counters = {}
+        for event in self.events:
+            if event["type"] == COUNTER_EVENT:
+                counters[event["name"]] = (
+                    counters.get(event["name"], 0) + event["value"]
+                )
+        return pd.Series(counters, dtype=float).sort_index()
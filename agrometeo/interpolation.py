@@ -0,0 +1,484 @@
+"""Spatial interpolation."""
+import logging
+
+import geopandas as gpd
+import numpy as np
+
+try:
+    import xarray as xr
+except ImportError:
+    xr = None
+
+from . import settings
+
+__all__ = [
+    "get_grid_coords",
+    "get_idw_weights",
+    "get_kriging_weights",
+    "interpolate_values",
+    "interpolate_ts_gdf",
+]
+
+INTERPOLATION_METHODS = ["idw", "kriging"]
+X_NAME = "x"
+Y_NAME = "y"
+POINT_NAME = "point"
+# maximum number of target-station distances computed at once when selecting the
+# nearest stations of each target location, see `_get_nearest_stations`
+NEAREST_BLOCK_SIZE = 2**20
+
+
+def _exponential_variogram(distances, psill, variogram_range, nugget):
+    return nugget + psill * (1 - np.exp(-distances / variogram_range))
+
+
+def _gaussian_variogram(distances, psill, variogram_range, nugget):
+    return nugget + psill * (1 - np.exp(-((distances / variogram_range) ** 2)))
+
+
+def _spherical_variogram(distances, psill, variogram_range, nugget):
+    scaled_distances = np.minimum(distances / variogram_range, 1)
+    return nugget + psill * (1.5 * scaled_distances - 0.5 * scaled_distances**3)
+
+
+VARIOGRAM_MODELS = {
+    "exponential": _exponential_variogram,
+    "gaussian": _gaussian_variogram,
+    "spherical": _spherical_variogram,
+}
+
+
+def _get_distances(xy, other_xy):
+    # distance matrix between the (n, 2) and (m, 2) coordinate arrays
+    return np.hypot(
+        xy[:, np.newaxis, 0] - other_xy[np.newaxis, :, 0],
+        xy[:, np.newaxis, 1] - other_xy[np.newaxis, :, 1],
+    )
+
+
+def _get_inverse_distances(distances, power):
+    # ACHTUNG: zero distances result in infinite weights and infinite distances (i.e.,
+    # excluded stations) in zero weights
+    with np.errstate(divide="ignore"):
+        return distances**-power
+
+
+def _get_nearest_stations(stations_xy, target_xy, k, max_distance):
+    # select the (at most) `k` nearest stations within `max_distance` of each target
+    # location, computing the distances by blocks of target locations so that memory
+    # does not grow with the product of the number of target locations and stations.
+    # Returns arrays of shape (m, num_neighbors) with the station indices and their
+    # distances, which are infinite for the padding of target locations with fewer
+    # neighbors
+    num_stations = len(stations_xy)
+    if k is None or k > num_stations:
+        k = num_stations
+    block_size = max(1, NEAREST_BLOCK_SIZE // max(num_stations, 1))
+    blocks = []
+    for start in range(0, len(target_xy), block_size):
+        block_distances = _get_distances(
+            target_xy[start : start + block_size], stations_xy
+        )
+        block_k = k
+        if max_distance is not None:
+            block_distances[block_distances > max_distance] = np.inf
+            block_k = min(
+                block_k, np.isfinite(block_distances).sum(axis=1).max(initial=0)
+            )
+        if block_k < num_stations:
+            block_indices = np.argpartition(block_distances, block_k, axis=1)[
+                :, :block_k
+            ]
+        else:
+            block_indices = np.broadcast_to(
+                np.arange(num_stations), block_distances.shape
+            )
+        blocks.append(
+            (
+                block_indices,
+                np.take_along_axis(block_distances, block_indices, axis=1),
+            )
+        )
+    num_neighbors = max((block[0].shape[1] for block in blocks), default=0)
+    indices = np.zeros((len(target_xy), num_neighbors), dtype=np.intp)
+    distances = np.full((len(target_xy), num_neighbors), np.inf)
+    start = 0
+    for block_indices, block_distances in blocks:
+        end = start + len(block_indices)
+        indices[start:end, : block_indices.shape[1]] = block_indices
+        distances[start:end, : block_indices.shape[1]] = block_distances
+        start = end
+    return indices, distances
+
+
+def _interpolate_nearest(indices, weights, values):
+    # counterpart of `interpolate_values` for the weights of the nearest stations of
+    # each target location, accumulated neighbor by neighbor so that no (m, n) matrix
+    # is built
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0)
+    numerator = np.zeros((len(indices), values.shape[1]), dtype=weights.dtype)
+    denominator = np.zeros_like(numerator)
+    for j in range(indices.shape[1]):
+        neighbor_weights = weights[:, j, np.newaxis]
+        numerator += neighbor_weights * filled[indices[:, j]]
+        denominator += neighbor_weights * valid[indices[:, j]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator != 0, numerator / denominator, np.nan)
+
+
+def _get_xy(geoms):
+    return np.column_stack([geoms.x.to_numpy(), geoms.y.to_numpy()])
+
+
+def get_grid_coords(bounds, res):
+    """
+    Get the coordinates of the cell centers of a regular grid.
+
+    Parameters
+    ----------
+    bounds : list-like
+        West, south, east and north bounds of the grid, e.g., the `total_bounds` of a
+        geo-data frame.
+    res : numeric
+        Resolution of the grid (in the units of the bounds' CRS).
+
+    Returns
+    -------
+    xs, ys : np.ndarray
+        Coordinates of the cell centers along the x (increasing) and y (decreasing,
+        i.e., north-up) axes.
+    """
+    west, south, east, north = bounds
+    xs = np.arange(west + res / 2, east, res)
+    ys = np.arange(north - res / 2, south, -res)
+    return xs, ys
+
+
+def get_idw_weights(stations_xy, target_xy, *, power=None, k=None, max_distance=None):
+    """
+    Get the inverse distance weighting (IDW) weight matrix.
+
+    Parameters
+    ----------
+    stations_xy, target_xy : np.ndarray
+        Arrays of shape (n, 2) and (m, 2) with the x and y coordinates of the n
+        stations and m target locations respectively.
+    power : numeric, optional
+        Power of the inverse distance. If None, the value from `settings.IDW_POWER` is
+        used.
+    k : int, optional
+        Number of nearest stations used for each target location. If None, all the
+        stations are used.
+    max_distance : numeric, optional
+        Maximum distance of the stations used for each target location. If None, the
+        distance is not limited.
+
+    Returns
+    -------
+    weights : np.ndarray
+        Array of shape (m, n) with the (non-normalized) weight of each station for
+        each target location. Target locations at the same location as a station are
+        only weighted by such station, so their interpolated values are missing where
+        the station has no value (`interpolate_ts_gdf` falls back to the other
+        stations instead, without building the (m, n) matrix if `k` or `max_distance`
+        are provided).
+    """
+    if power is None:
+        power = settings.IDW_POWER
+
+    distances = _get_distances(target_xy, stations_xy)
+    weights = _get_inverse_distances(distances, power)
+    # target locations that coincide with a station take its value
+    zero_mask = distances == 0
+    zero_rows = zero_mask.any(axis=1)
+    weights[zero_rows] = zero_mask[zero_rows]
+    if k is not None and k < distances.shape[1]:
+        np.put_along_axis(
+            weights, np.argpartition(distances, k, axis=1)[:, k:], 0, axis=1
+        )
+    if max_distance is not None:
+        weights[distances > max_distance] = 0
+
+    return weights
+
+
+def get_kriging_weights(
+    stations_xy,
+    target_xy,
+    *,
+    variogram_model=None,
+    variogram_range=None,
+    psill=1,
+    nugget=0,
+):
+    """
+    Get the ordinary kriging weight matrix.
+
+    The kriging system is solved once for all the target locations, so that the
+    weights can be reused for any number of timestamps. Note that the variogram is
+    not fitted to the data.
+
+    Parameters
+    ----------
+    stations_xy, target_xy : np.ndarray
+        Arrays of shape (n, 2) and (m, 2) with the x and y coordinates of the n
+        stations and m target locations respectively.
+    variogram_model : {"exponential", "gaussian", "spherical"}, optional
+        Variogram model. If None, the value from `settings.VARIOGRAM_MODEL` is used.
+    variogram_range : numeric, optional
+        Range of the variogram (in the units of the coordinates). If None, half the
+        maximum distance between stations is used.
+    psill, nugget : numeric, default 1 and 0 respectively
+        Partial sill and nugget of the variogram. Note that without nugget, the
+        weights do not depend on the partial sill.
+
+    Returns
+    -------
+    weights : np.ndarray
+        Array of shape (m, n) with the weight of each station for each target
+        location, which sum to one for each target location.
+    """
+    if variogram_model is None:
+        variogram_model = settings.VARIOGRAM_MODEL
+    try:
+        variogram = VARIOGRAM_MODELS[variogram_model]
+    except KeyError:
+        raise ValueError(
+            f"variogram_model {variogram_model} is not valid. Must be one of "
+            f"{list(VARIOGRAM_MODELS)}"
+        )
+
+    stations_distances = _get_distances(stations_xy, stations_xy)
+    if variogram_range is None:
+        variogram_range = stations_distances.max() / 2
+    num_stations = len(stations_xy)
+    # ordinary kriging system, with the Lagrange multiplier in the last row/column
+    a = np.ones((num_stations + 1, num_stations + 1))
+    a[:num_stations, :num_stations] = variogram(
+        stations_distances, psill, variogram_range, nugget
+    )
+    a[np.diag_indices(num_stations)] = 0
+    a[num_stations, num_stations] = 0
+    b = np.ones((num_stations + 1, len(target_xy)))
+    target_distances = _get_distances(stations_xy, target_xy)
+    b[:num_stations] = np.where(
+        target_distances == 0,
+        0,
+        variogram(target_distances, psill, variogram_range, nugget),
+    )
+
+    return np.linalg.solve(a, b)[:num_stations].T
+
+
+def interpolate_values(weights, values):
+    """
+    Interpolate station values with a weight matrix.
+
+    All the timestamps are interpolated at once with matrix products. With
+    non-negative weights (e.g., IDW), missing values are handled by normalizing the
+    weights of each target location and timestamp by the sum of the weights of the
+    stations with a value. Weights that can be negative (e.g., kriging) cannot be
+    normalized this way, so the values of a target location and timestamp are missing
+    if any station with a non-zero weight has no value (see `interpolate_ts_gdf`,
+    which solves the kriging system for the stations with a value instead).
+
+    Parameters
+    ----------
+    weights : np.ndarray
+        Array of shape (m, n) with the weight of each of the n stations for each of
+        the m target locations, e.g., as returned by `get_idw_weights` or
+        `get_kriging_weights`.
+    values : np.ndarray
+        Array of shape (n, t) with the values of each station at t timestamps.
+
+    Returns
+    -------
+    interpolated : np.ndarray
+        Array of shape (m, t) with the interpolated values, which are missing where
+        no station with a (non-zero) weight has a value, or, if any weight is negative,
+        where any station with a non-zero weight has no value.
+    """
+    valid = ~np.isnan(values)
+    numerator = weights @ np.where(valid, values, 0)
+    if (weights < 0).any():
+        # ACHTUNG: the sum of the weights of the stations with a value can be close to
+        # zero or negative, so normalizing by it would yield huge or sign-flipped values
+        incomplete = (weights != 0).astype(weights.dtype) @ (~valid).astype(
+            weights.dtype
+        )
+        return np.where(incomplete == 0, numerator, np.nan)
+    denominator = weights @ valid.astype(weights.dtype)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator != 0, numerator / denominator, np.nan)
+
+
+def _interpolate_idw(
+    stations_xy, target_xy, values, dtype, *, power=None, k=None, max_distance=None
+):
+    # ACHTUNG: target locations that coincide with a station take its value, but fall
+    # back to the other stations where the station has no value. Hence, the weight of
+    # coincident stations is zeroed and their values are set afterwards
+    if power is None:
+        power = settings.IDW_POWER
+    if k is None and max_distance is None:
+        distances = _get_distances(target_xy, stations_xy)
+        indices = np.broadcast_to(np.arange(len(stations_xy)), distances.shape)
+    else:
+        indices, distances = _get_nearest_stations(
+            stations_xy, target_xy, k, max_distance
+        )
+    zero_mask = distances == 0
+    weights = _get_inverse_distances(distances, power)
+    weights[zero_mask] = 0
+    weights = weights.astype(dtype, copy=False)
+    if k is None and max_distance is None:
+        interpolated = interpolate_values(weights, values)
+    else:
+        interpolated = _interpolate_nearest(indices, weights, values)
+    zero_rows = np.flatnonzero(zero_mask.any(axis=1))
+    if len(zero_rows) > 0:
+        coincident_values = values[
+            indices[zero_rows, zero_mask[zero_rows].argmax(axis=1)]
+        ]
+        interpolated[zero_rows] = np.where(
+            np.isnan(coincident_values), interpolated[zero_rows], coincident_values
+        )
+    return interpolated
+
+
+def _interpolate_kriging(stations_xy, target_xy, values, dtype, weights_kws):
+    # solve the kriging system once for each distinct set of stations with a value, and
+    # interpolate all the timestamps of each set at once. The default variogram range
+    # is computed from all the stations so that it does not depend on the missing ones
+    if weights_kws.get("variogram_range") is None:
+        weights_kws = {
+            **weights_kws,
+            "variogram_range": _get_distances(stations_xy, stations_xy).max() / 2,
+        }
+    valid = ~np.isnan(values)
+    interpolated = np.full((len(target_xy), values.shape[1]), np.nan, dtype=dtype)
+    valid_sets, set_idx = np.unique(valid.T, axis=0, return_inverse=True)
+    set_idx = set_idx.ravel()
+    for i, valid_set in enumerate(valid_sets):
+        if not valid_set.any():
+            continue
+        columns = set_idx == i
+        weights = get_kriging_weights(
+            stations_xy[valid_set], target_xy, **weights_kws
+        ).astype(dtype, copy=False)
+        interpolated[:, columns] = weights @ values[valid_set][:, columns]
+    return interpolated
+
+
+def interpolate_ts_gdf(
+    ts_gdf, target, *, method=None, as_xarray=False, dtype=None, weights_kws=None
+):
+    """
+    Interpolate a time series geo-data frame.
+
+    The weight matrix is computed once and reused for all the timestamps, which are
+    interpolated with a single (batched) matrix product. For IDW with `k` or
+    `max_distance`, only the weights of the nearest stations of each target location
+    are kept. For kriging, whose weights cannot be normalized over the stations with a
+    value, the weight matrix is computed once for each distinct set of stations with a
+    value instead. Target locations that coincide with a station take its value, or,
+    where it has no value, are interpolated from the other stations.
+
+    The distances are computed in the units of the CRS of `ts_gdf`, which should thus
+    be projected, e.g., `LV03_CRS` rather than the default `LONLAT_CRS` of
+    `AgrometeoDataset`.
+
+    Parameters
+    ----------
+    ts_gdf : gpd.GeoDataFrame
+        Geo-data frame with a time series of measurements (columns) at each station
+        (rows) of a single variable and measurement, as returned by
+        `AgrometeoDataset.get_ts_gdf`.
+    target : tuple of np.ndarray, geopandas.GeoSeries or geopandas.GeoDataFrame
+        Target locations, which can be either a (xs, ys) tuple with the coordinates of
+        the cell centers of a regular grid (e.g., as returned by `get_grid_coords`),
+        or point geometries. In both cases, the coordinates are assumed to be in the
+        CRS of `ts_gdf` unless the geometries have a CRS, in which case they are
+        reprojected.
+    method : {"idw", "kriging"}, optional
+        Interpolation method. If None, the value from
+        `settings.INTERPOLATION_METHOD` is used.
+    as_xarray : bool, default False
+        Whether the interpolated values are returned as a `xarray.DataArray` (with
+        time, y and x coordinates for a regular grid or time and point coordinates for
+        point geometries, where the latter is named after the index of `target` if it
+        has a name), which requires the xarray package.
+    dtype : str or numpy.dtype, optional
+        Data type of the weights and values used in the matrix product, e.g.,
+        "float32" to halve the memory. If None, "float64" is used.
+    weights_kws : dict, optional
+        Keyword arguments passed to `get_idw_weights` or `get_kriging_weights`.
+
+    Returns
+    -------
+    interpolated : np.ndarray or xarray.DataArray
+        Interpolated values, of shape (t, ny, nx) for a regular grid or (t, m) for m
+        point geometries, where t is the number of timestamps.
+    """
+    if method is None:
+        method = settings.INTERPOLATION_METHOD
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(
+            f"method {method} is not valid. Must be one of {INTERPOLATION_METHODS}"
+        )
+    if as_xarray and xr is None:
+        raise ImportError(
+            "Returning the interpolated values as xarray requires the xarray package. "
+            "You can install it using conda or pip. See https://xarray.dev."
+        )
+    if dtype is None:
+        dtype = np.float64
+    if weights_kws is None:
+        weights_kws = {}
+
+    if isinstance(target, (gpd.GeoSeries, gpd.GeoDataFrame)):
+        target = target.geometry
+        if target.crs is not None and ts_gdf.crs is not None:
+            target = target.to_crs(ts_gdf.crs)
+        target_xy = _get_xy(target)
+        shape = (len(target_xy),)
+    else:
+        xs, ys = target
+        grid_xs, grid_ys = np.meshgrid(xs, ys)
+        target_xy = np.column_stack([grid_xs.ravel(), grid_ys.ravel()])
+        shape = (len(ys), len(xs))
+
+    if ts_gdf.crs is not None and ts_gdf.crs.is_geographic:
+        logging.warning(
+            f"""
+The CRS of `ts_gdf` ({ts_gdf.crs.to_string()}) is geographic, so the interpolation
+distances (and the kriging variogram range) are in degrees. Reproject it first, e.g.,
+to the Swiss LV03 CRS with `ts_gdf.to_crs("epsg:21781")`.
+"""
+        )
+
+    stations_xy = _get_xy(ts_gdf.geometry)
+    values_df = ts_gdf.drop(columns=ts_gdf.geometry.name)
+    values = values_df.to_numpy(dtype=dtype, na_value=np.nan)
+    if method == "idw":
+        interpolated = _interpolate_idw(
+            stations_xy, target_xy, values, dtype, **weights_kws
+        )
+    else:
+        interpolated = _interpolate_kriging(
+            stations_xy, target_xy, values, dtype, weights_kws
+        )
+    interpolated = interpolated.T.reshape((len(values_df.columns),) + shape)
+
+    if not as_xarray:
+        return interpolated
+    time_name = values_df.columns.name or settings.TIME_NAME
+    if len(shape) == 1:
+        point_name = target.index.name or POINT_NAME
+        dims = [time_name, point_name]
+        coords = {time_name: values_df.columns, point_name: target.index.to_numpy()}
+    else:
+        dims = [time_name, Y_NAME, X_NAME]
+        coords = {time_name: values_df.columns, Y_NAME: ys, X_NAME: xs}
+    return xr.DataArray(interpolated, dims=dims, coords=coords)
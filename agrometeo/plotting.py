@@ -1,17 +1,128 @@
 """Plotting."""
 import logging
+import os
+from concurrent import futures
+from os import path
 
+import geopandas as gpd
 import matplotlib.pyplot as plt
+import numpy as np
+import pyproj
+from matplotlib import animation, figure, patheffects
 from mpl_toolkits.axes_grid1 import make_axes_locatable
+from shapely import geometry
 
 try:
     import contextily as cx
 except ImportError:
     cx = None
 
-from . import settings
+from . import cache, settings
 
-__all__ = ["plot_temperature_map"]
+__all__ = ["plot_temperature_map", "save_temperature_maps", "warm_basemap_cache"]
+
+WEB_MERCATOR_CRS = "epsg:3857"
+
+# column of the geo-data frame used to draw the base map of the frames
+FRAME_COL = "_frame"
+# file extensions that are saved as a series of image files (one per frame) rather
+# than as a video
+FRAME_FILE_EXTS = [".png", ".jpg", ".jpeg", ".tif", ".tiff", ".svg", ".pdf"]
+
+# state of the worker processes that render frames, see `_init_frames_worker`
+_frames_worker_state = {}
+
+
+def _get_basemap_key(crs, source, zoom):
+    if crs is not None:
+        crs = pyproj.CRS(crs).to_string()
+    if isinstance(source, dict):
+        # e.g., a `xyzservices.TileProvider`
+        source = source["url"]
+    return (crs, source, zoom)
+
+
+def _load_basemap(bounds, *, crs, source, zoom):
+    # fetch the tiles that cover `bounds` (in `crs`) with contextily, as in
+    # `contextily.add_basemap`
+    if cx is None:
+        raise ImportError("contextily is required to fetch basemap tiles")
+    if source is None:
+        source = cx.providers.OpenStreetMap.HOT
+    if crs is not None:
+        bounds = (
+            gpd.GeoSeries([geometry.box(*bounds)], crs=crs)
+            .to_crs(WEB_MERCATOR_CRS)
+            .total_bounds
+        )
+    west, south, east, north = bounds
+    img, extent = cx.bounds2img(west, south, east, north, zoom=zoom, source=source)
+    if crs is not None and not pyproj.CRS(crs).equals(WEB_MERCATOR_CRS):
+        img, extent = cx.warp_tiles(img, extent, t_crs=crs)
+    if isinstance(source, dict):
+        attribution = source.get("attribution")
+    else:
+        attribution = None
+    return img, extent, attribution
+
+
+def _add_basemap(
+    ax,
+    crs,
+    *,
+    attribution=None,
+    basemap_cache=None,
+    source=None,
+    zoom="auto",
+    interpolation="bilinear",
+    attribution_size=8,
+    reset_extent=True,
+    **imshow_kws,
+):
+    # same as `contextily.add_basemap` but looking up the basemap cache first
+    if isinstance(source, (str, os.PathLike)) and path.exists(source):
+        # ACHTUNG: local raster files are already on disk, so they are not cached but
+        # read (and warped) by contextily
+        if cx is None:
+            raise ImportError("contextily is required to read local basemap files")
+        if attribution is True:
+            # local files have no default attribution
+            attribution = None
+        cx.add_basemap(
+            ax,
+            crs=crs,
+            source=source,
+            zoom=zoom,
+            interpolation=interpolation,
+            attribution=attribution,
+            attribution_size=attribution_size,
+            reset_extent=reset_extent,
+            **imshow_kws,
+        )
+        return
+    if basemap_cache is None:
+        basemap_cache = cache.get_basemap_cache()
+    xmin, xmax, ymin, ymax = ax.axis()
+    img, extent, source_attribution = basemap_cache.get_basemap(
+        _get_basemap_key(crs, source, zoom),
+        (xmin, ymin, xmax, ymax),
+        lambda bounds: _load_basemap(bounds, crs=crs, source=source, zoom=zoom),
+    )
+    ax.imshow(img, extent=extent, interpolation=interpolation, **imshow_kws)
+    if reset_extent:
+        ax.axis((xmin, xmax, ymin, ymax))
+    if attribution is None or attribution is True:
+        attribution = source_attribution
+    if attribution:
+        ax.text(
+            0.005,
+            0.005,
+            attribution,
+            transform=ax.transAxes,
+            size=attribution_size,
+            path_effects=[patheffects.withStroke(linewidth=2, foreground="w")],
+            wrap=True,
+        )
 
 
 def plot_temperature_map(  # noqa: C901
@@ -32,6 +143,7 @@ def plot_temperature_map(  # noqa: C901
     set_title_kws=None,
     add_basemap_kws=None,
     append_axes_kws=None,
+    basemap_cache=None,
 ):
     """
     Plot a map of station measurements.
@@ -69,8 +181,9 @@ def plot_temperature_map(  # noqa: C901
         so that it is used as title label (instead of the timestamp). If None, the value
         from `settings.PLOT_TITLE` is used.
     add_basemap : bool, optional
-        Whether a basemap should be added to the plot using `contextily.add_basemap`. If
-        None, the value from `settings.PLOT_ADD_BASEMAP` is used.
+        Whether a basemap should be added to the plot. The basemap is first looked up
+        in the basemap cache, and only fetched (using contextily) if no cached basemap
+        covers the plot. If None, the value from `settings.PLOT_ADD_BASEMAP` is used.
     attribution : str or bool, optional
         Attribution text for the basemap source, added to the bottom of the plot, passed
         to `contextily.add_basemap`. If False, no attribution is added. If None, the
@@ -81,6 +194,14 @@ def plot_temperature_map(  # noqa: C901
         `geopandas.GeoDataFrame.plot`, `matplotlib.axes.Axes.set_title`,
         `contextily.add_basemap` and
         `mpl_toolkits.axes_grid1.axes_divider.AxesDivider.append_axes` respectively.
+        Note that the arguments of `contextily.add_basemap` other than `source`,
+        `zoom`, `interpolation`, `attribution`, `attribution_size` and `reset_extent`
+        are passed to `matplotlib.axes.Axes.imshow`, unless `source` is the path to a
+        local raster file, which is added with `contextily.add_basemap` (without
+        caching).
+    basemap_cache : BasemapCache, optional
+        Cache of basemap rasters. If None, the process-wide cache returned by
+        `get_basemap_cache` is used.
 
     Returns
     -------
@@ -147,20 +268,313 @@ def plot_temperature_map(  # noqa: C901
         # _add_basemap_kws = {key: add_basemap_kws[key] for key in add_basemap_kws}
         if attribution is None:
             attribution = _add_basemap_kws.pop("attribution", settings.PLOT_ATTRIBUTION)
-        if cx is None:
+        try:
+            _add_basemap(
+                ax,
+                ts_gdf.crs,
+                attribution=attribution,
+                basemap_cache=basemap_cache,
+                **_add_basemap_kws,
+            )
+        except ImportError:
             logging.warning(
                 """
-The `add_basemap=True` option requires the contextily package. You can install it using
-conda or pip. See https://github.com/geopandas/contextily.
+The `add_basemap=True` option requires the contextily package (unless the basemap is
+cached). You can install it using conda or pip. See
+https://github.com/geopandas/contextily.
 """
             )
+
+    return ax
+
+
+def _get_frame_values(ts_gdf, dt):
+    # masked so that stations without measurement are not drawn
+    return np.ma.masked_invalid(ts_gdf[dt].to_numpy(dtype=float, na_value=np.nan))
+
+
+def _draw_base_map(ts_gdf, vmin, vmax, subplot_kws, plot_kws, plot_temperature_map_kws):
+    # draw the stations (all of them, regardless of missing measurements), colorbar and
+    # basemap once, with a fixed color normalization
+    if subplot_kws is None:
+        subplot_kws = {}
+    if plot_kws is None:
+        plot_kws = {}
+    # ACHTUNG: use a figure not managed by pyplot so that it does not need to be closed
+    # and can be safely used in worker processes
+    fig = figure.Figure(**subplot_kws)
+    ax = fig.subplots()
+    base_gdf = ts_gdf[[ts_gdf.geometry.name]].assign(**{FRAME_COL: vmin})
+    plot_temperature_map(
+        base_gdf,
+        dt=FRAME_COL,
+        ax=ax,
+        title=False,
+        plot_kws={**plot_kws, "vmin": vmin, "vmax": vmax},
+        **plot_temperature_map_kws,
+    )
+    return fig, ax, ax.collections[0]
+
+
+def _update_frame(ts_gdf, dt, ax, collection, title, set_title_kws):
+    # only update the collection's values (and the title)
+    collection.set_array(_get_frame_values(ts_gdf, dt))
+    if title:
+        if title is True:
+            title_label = dt
         else:
-            # add basemap
-            cx.add_basemap(
-                ax=ax,
-                crs=ts_gdf.crs,
-                attribution=attribution,
-                **_add_basemap_kws,
+            title_label = title
+        ax.set_title(title_label, **set_title_kws)
+
+
+class _FramesBasemapCache:
+    # basemap "cache" that only holds the basemap of the frames, which is fetched once
+    # in the main process and then pickled (without the underlying cache) to the worker
+    # processes
+    def __init__(self, basemap_cache=None):
+        if basemap_cache is None:
+            basemap_cache = cache.get_basemap_cache()
+        self.basemap_cache = basemap_cache
+        self.basemap = None
+
+    def __getstate__(self):
+        return {"basemap_cache": None, "basemap": self.basemap}
+
+    def get_basemap(self, key, bounds, load_func):
+        # ACHTUNG: all the frames are drawn on the same base map, so the same basemap
+        # covers the bounds of all of them
+        if self.basemap is None:
+            if self.basemap_cache is None:
+                # the basemap could not be fetched in the main process
+                self.basemap = load_func(bounds)
+            else:
+                self.basemap = self.basemap_cache.get_basemap(key, bounds, load_func)
+        return self.basemap
+
+
+def _init_frames_worker(ts_gdf, base_map_args, update_frame_kws, savefig_kws):
+    fig, ax, collection = _draw_base_map(ts_gdf, *base_map_args)
+    _frames_worker_state.update(
+        ts_gdf=ts_gdf,
+        fig=fig,
+        ax=ax,
+        collection=collection,
+        update_frame_kws=update_frame_kws,
+        savefig_kws=savefig_kws,
+    )
+
+
+def _save_frames(frames):
+    state = _frames_worker_state
+    for dt, filepath in frames:
+        _update_frame(
+            state["ts_gdf"],
+            dt,
+            state["ax"],
+            state["collection"],
+            **state["update_frame_kws"],
+        )
+        state["fig"].savefig(filepath, **state["savefig_kws"])
+
+
+def save_temperature_maps(
+    ts_gdf,
+    dst,
+    *,
+    dts=None,
+    vmin=None,
+    vmax=None,
+    title=None,
+    fps=None,
+    max_workers=None,
+    subplot_kws=None,
+    plot_kws=None,
+    set_title_kws=None,
+    savefig_kws=None,
+    save_kws=None,
+    **plot_temperature_map_kws,
+):
+    """
+    Save maps of station measurements for multiple instants.
+
+    The stations, colorbar and basemap are drawn only once, and each frame only updates
+    the values of the stations (and the title), with the same color normalization for
+    all the frames. When the frames are rendered in worker processes, the basemap is
+    fetched (or read from the basemap cache) once in the main process and passed to the
+    workers.
+
+    Parameters
+    ----------
+    ts_gdf : geopandas.GeoDataFrame
+        Geo-data frame with a time series of temperature measurements.
+    dst : str or pathlib.Path object
+        Destination of the maps. If it has an image extension, e.g., ".png", each frame
+        is saved as a separate file, named after `dst` with the (zero-padded) frame
+        number appended to its stem. The frames are rendered in parallel worker
+        processes. Otherwise, the frames are saved as an animation (in the main
+        process) using `matplotlib.animation.Animation.save`, e.g., ".mp4" (which
+        requires ffmpeg) or ".gif".
+    dts : list-like of str or datetime, optional
+        Instants to be plotted, which must match columns of `ts_gdf`. If None, all the
+        columns (other than `geometry`) are plotted.
+    vmin, vmax : numeric, optional
+        Minimum and maximum values of the color normalization, shared by all the frames.
+        If None, the minimum and maximum measurements over all the frames are used.
+    title : bool or str, optional
+        Whether a title should be added to each frame. If True, the timestamp of the
+        frame is used. It is also possible to pass a string so that it is used as title
+        label for all the frames. If None, the value from `settings.PLOT_TITLE` is used.
+    fps : numeric, optional
+        Frames per second of the animation. Ignored if the frames are saved as separate
+        files. If None, the value from `settings.PLOT_FPS` is used.
+    max_workers : int, optional
+        Maximum number of worker processes that render the frames saved as separate
+        files. If 1, the frames are rendered in the main process. If None, the value
+        from `settings.PLOT_MAX_WORKERS` is used, where a value of None means the
+        number of processors of the machine.
+    subplot_kws, plot_kws, set_title_kws : dict, optional
+        Keyword arguments passed to `matplotlib.figure.Figure`,
+        `geopandas.GeoDataFrame.plot` and `matplotlib.axes.Axes.set_title`
+        respectively.
+    savefig_kws, save_kws : dict, optional
+        Keyword arguments passed to `matplotlib.figure.Figure.savefig` (for separate
+        files) and `matplotlib.animation.Animation.save` (for animations)
+        respectively.
+    **plot_temperature_map_kws
+        Other keyword arguments passed to `plot_temperature_map`, e.g., `cmap`,
+        `legend` or `add_basemap`.
+
+    Returns
+    -------
+    dst_filepaths : list of str
+        Paths to the saved files, i.e., one for each frame or a single one for the
+        animation.
+    """
+    if dts is None:
+        dts = ts_gdf.columns.drop(ts_gdf.geometry.name)
+    # fixed color normalization
+    if vmin is None or vmax is None:
+        values = ts_gdf[list(dts)].to_numpy(dtype=float, na_value=np.nan)
+        if vmin is None:
+            vmin = np.nanmin(values)
+        if vmax is None:
+            vmax = np.nanmax(values)
+    if title is None:
+        title = settings.PLOT_TITLE
+    if set_title_kws is None:
+        set_title_kws = {}
+    if savefig_kws is None:
+        savefig_kws = {}
+    if save_kws is None:
+        save_kws = {}
+    # only pass the required data to the workers
+    ts_gdf = ts_gdf[list(dts) + [ts_gdf.geometry.name]]
+    base_map_args = (vmin, vmax, subplot_kws, plot_kws, plot_temperature_map_kws)
+    update_frame_kws = dict(title=title, set_title_kws=set_title_kws)
+
+    dst = str(dst)
+    stem, ext = path.splitext(dst)
+    if ext.lower() not in FRAME_FILE_EXTS:
+        # animation
+        if fps is None:
+            fps = settings.PLOT_FPS
+        fig, ax, collection = _draw_base_map(ts_gdf, *base_map_args)
+        anim = animation.FuncAnimation(
+            fig,
+            lambda dt: _update_frame(ts_gdf, dt, ax, collection, **update_frame_kws),
+            frames=dts,
+        )
+        if ext.lower() == ".gif":
+            save_kws = {"writer": "pillow", **save_kws}
+        anim.save(dst, fps=fps, **save_kws)
+        return [dst]
+
+    # separate files, split into contiguous chunks of frames for each worker
+    if max_workers is None:
+        max_workers = settings.PLOT_MAX_WORKERS
+    if max_workers is None:
+        max_workers = os.cpu_count()
+    num_digits = len(str(len(dts) - 1))
+    frames = [(dt, f"{stem}{i:0{num_digits}d}{ext}") for i, dt in enumerate(dts)]
+    init_args = (ts_gdf, base_map_args, update_frame_kws, savefig_kws)
+    if max_workers == 1:
+        _init_frames_worker(*init_args)
+        _save_frames(frames)
+    else:
+        add_basemap = plot_temperature_map_kws.get("add_basemap")
+        if add_basemap is None:
+            add_basemap = settings.PLOT_ADD_BASEMAP
+        if add_basemap:
+            # fetch the basemap once by drawing the base map in the main process, and
+            # pass it to the workers, otherwise each worker fetches it into its own
+            # (in-process) cache
+            plot_temperature_map_kws = {
+                **plot_temperature_map_kws,
+                "basemap_cache": _FramesBasemapCache(
+                    plot_temperature_map_kws.get("basemap_cache")
+                ),
+            }
+            base_map_args = base_map_args[:-1] + (plot_temperature_map_kws,)
+            _draw_base_map(ts_gdf, *base_map_args)
+            init_args = (ts_gdf, base_map_args, update_frame_kws, savefig_kws)
+        with futures.ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_frames_worker,
+            initargs=init_args,
+        ) as executor:
+            chunk_size = -(-len(frames) // max_workers)
+            # consume the results so that worker exceptions are raised
+            list(
+                executor.map(
+                    _save_frames,
+                    [
+                        frames[i : i + chunk_size]
+                        for i in range(0, len(frames), chunk_size)
+                    ],
+                )
             )
 
-    return ax
+    return [filepath for _, filepath in frames]
+
+
+def warm_basemap_cache(gdf, *, buffer=None, source=None, zoom=None, basemap_cache=None):
+    """
+    Fetch and cache the basemap covering the extent of a geo-data frame.
+
+    This allows plotting any subset of the extent, e.g., the stations of a dataset's
+    `region`, without network access, i.e., from local disk if the cache has a
+    `cache_dir`.
+
+    Parameters
+    ----------
+    gdf : geopandas.GeoDataFrame or geopandas.GeoSeries
+        Geo-data frame whose extent (and CRS) must be covered by the basemap, e.g., the
+        `region` attribute of a dataset.
+    buffer : numeric, optional
+        Margin added to each side of the extent, as a fraction of its width and height,
+        so that the basemap also covers the margins that matplotlib adds around the
+        plotted geometries. If None, the value from `settings.PLOT_BASEMAP_BUFFER` is
+        used.
+    source, zoom : optional
+        Tile source and zoom level, as in `contextily.add_basemap`, which must match
+        the `source` and `zoom` in the `add_basemap_kws` of the plots for the cached
+        basemap to be used. If None, the contextily defaults are used.
+    basemap_cache : BasemapCache, optional
+        Cache of basemap rasters. If None, the process-wide cache returned by
+        `get_basemap_cache` is used.
+    """
+    if buffer is None:
+        buffer = settings.PLOT_BASEMAP_BUFFER
+    if zoom is None:
+        zoom = "auto"
+    if basemap_cache is None:
+        basemap_cache = cache.get_basemap_cache()
+
+    west, south, east, north = gdf.total_bounds
+    x_buffer = (east - west) * buffer
+    y_buffer = (north - south) * buffer
+    basemap_cache.get_basemap(
+        _get_basemap_key(gdf.crs, source, zoom),
+        (west - x_buffer, south - y_buffer, east + x_buffer, north + y_buffer),
+        lambda bounds: _load_basemap(bounds, crs=gdf.crs, source=source, zoom=zoom),
+    )
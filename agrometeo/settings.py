@@ -2,6 +2,37 @@
 # core
 STATIONS_ID_NAME = "station_id"
 TIME_NAME = "time"
+VARIABLE_NAME = "variable"
+MEASUREMENT_NAME = "measurement"
+VALUE_NAME = "value"
+TS_DTYPE = "float64"
+DISTANCE_NAME = "distance"
+STATISTIC_NAME = "statistic"
+# fetching
+CHUNK_FREQ = "30D"
+MAX_WORKERS = 4
+NUM_RETRIES = 3
+MAX_STATIONS_PER_REQUEST = 100
+MAX_URL_LENGTH = 2000
+REQUEST_TIMEOUT = 60
+RATE_LIMIT = 10
+RATE_LIMIT_BURST = 10
+POOL_MAXSIZE = 10
+MAX_CONCURRENCY = 10
+# synchronization
+SYNC_BUFFER_SIZE = 144
+SYNC_LOOKBACK = "1D"
+# caching
+TS_CACHE_MAX_SIZE = None
+TS_CACHE_RECENT_TIMEDELTA = "2D"
+CATALOGUE_CACHE_DIR = None
+CATALOGUE_CACHE_TTL = "1D"
+REGION_CACHE_DIR = None
+BASEMAP_CACHE_DIR = None
+# interpolation
+INTERPOLATION_METHOD = "idw"
+IDW_POWER = 2
+VARIOGRAM_MODEL = "exponential"
 
 # plotting
 PLOT_CMAP = "coolwarm"
@@ -12,6 +43,9 @@ PLOT_LEGEND_SIZE = "2.5%"
 PLOT_LEGEND_PAD = 0.2
 PLOT_TITLE = True
 PLOT_ADD_BASEMAP = True
+PLOT_BASEMAP_BUFFER = 0.1
+PLOT_FPS = 10
+PLOT_MAX_WORKERS = None
 
 # agrometeo specific
 DEFAULT_STATIONS_ID_COL = "name"
@@ -0,0 +1,549 @@
+"""Storage backends."""
+import functools
+import json
+import logging
+import os
+from os import path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+try:
+    import xarray as xr
+except ImportError:
+    xr = None
+
+from . import base, cache, settings
+
+__all__ = ["ParquetTSStore", "ZarrTSStore", "MemmapTSStore"]
+
+PARQUET_FILE_EXT = ".parquet"
+PARQUET_FILENAME = f"part-0{PARQUET_FILE_EXT}"
+PARTITION_DT_FMT = "%Y-%m-%d"
+DATE_NAME = "date"
+MEMMAP_VALUES_FILENAME = "values.dat"
+MEMMAP_TIMES_FILENAME = "times.npy"
+MEMMAP_METADATA_FILENAME = "metadata.json"
+
+
+def _check_ts_df(ts_df):
+    if ts_df.columns.nlevels != 3:
+        raise ValueError(
+            "The data frames must have a column for each (station, variable, "
+            "measurement) triplet, e.g., as yielded by `iter_ts_df` with a list-like "
+            "`variable`."
+        )
+
+
+def _dump_json(obj, filepath):
+    with open(filepath, "w") as dst:
+        json.dump(obj, dst)
+
+
+def _dump_npy(arr, filepath):
+    # ACHTUNG: pass a file object so that numpy does not append the ".npy" extension
+    with open(filepath, "wb") as dst:
+        np.save(dst, arr)
+
+
+def _iter_sensor_ts_dfs(ts_df):
+    # yield the variable, measurement and data frame (with a column for each station)
+    # of each sensor
+    variables = ts_df.columns.get_level_values(1)
+    measurements = ts_df.columns.get_level_values(2)
+    for variable, measurement in dict.fromkeys(zip(variables, measurements)):
+        sensor_ts_df = ts_df.loc[
+            :, (variables == variable) & (measurements == measurement)
+        ]
+        sensor_ts_df.columns = sensor_ts_df.columns.get_level_values(0)
+        yield str(variable), str(measurement), sensor_ts_df
+
+
+class ParquetTSStore:
+    """Partitioned Parquet storage of time series data."""
+
+    def __init__(self, root_dir, *, stations_id_name=None, time_name=None):
+        """
+        Initialize a Parquet time series store.
+
+        The data is stored in long format (with a row for each measurement) as a
+        Parquet file for each variable, measurement and day, following the hive
+        partitioning layout, i.e.,
+        "<root_dir>/variable=<variable>/measurement=<measurement>/date=<YYYY-MM-DD>/",
+        so that it can be read (and filtered) as a single dataset, e.g., with
+        `pandas.read_parquet` or `pyarrow.dataset`.
+
+        Parameters
+        ----------
+        root_dir : str or pathlib.Path object
+            Path to the root directory of the dataset. It will be created if it does
+            not exist.
+        stations_id_name, time_name : str, optional
+            Names of the station identifier and time columns. If None, the values from
+            `settings.STATIONS_ID_NAME` and `settings.TIME_NAME` are used respectively.
+        """
+        self.root_dir = root_dir
+        os.makedirs(self.root_dir, exist_ok=True)
+        if stations_id_name is None:
+            stations_id_name = settings.STATIONS_ID_NAME
+        self.stations_id_name = stations_id_name
+        if time_name is None:
+            time_name = settings.TIME_NAME
+        self.time_name = time_name
+
+    def _get_sensor_dir(self, variable, measurement):
+        return path.join(
+            self.root_dir,
+            f"{settings.VARIABLE_NAME}={variable}",
+            f"{settings.MEASUREMENT_NAME}={measurement}",
+        )
+
+    def _get_filepath(self, variable, measurement, day):
+        return path.join(
+            self._get_sensor_dir(variable, measurement),
+            f"{DATE_NAME}={day.strftime(PARTITION_DT_FMT)}",
+            PARQUET_FILENAME,
+        )
+
+    def write(self, ts_df):
+        """
+        Write a time series data frame into the store.
+
+        The rows of each day are merged with the stored ones (if any), where stored
+        measurements of the same time and station are overwritten. Accordingly, writing
+        the same data twice leaves the store unchanged, and days split across several
+        data frames are stored in full.
+
+        Parameters
+        ----------
+        ts_df : pd.DataFrame
+            Data frame with a time series of measurements (rows) for each (station,
+            variable, measurement) triplet (columns), as yielded by
+            `AgrometeoDataset.iter_ts_df` with a list-like `variable`.
+        """
+        _check_ts_df(ts_df)
+        id_cols = [self.time_name, self.stations_id_name]
+        for variable, measurement, sensor_ts_df in _iter_sensor_ts_dfs(ts_df):
+            long_ts_df = base._long_ts_df(
+                sensor_ts_df,
+                self.stations_id_name,
+                self.time_name,
+                settings.VALUE_NAME,
+                dropna=True,
+            )
+            # store the labels (rather than the categorical codes), since the
+            # categories of different writes may differ
+            long_ts_df[self.stations_id_name] = long_ts_df[
+                self.stations_id_name
+            ].astype(str)
+            for day, day_ts_df in long_ts_df.groupby(
+                long_ts_df[self.time_name].dt.normalize(), sort=False
+            ):
+                filepath = self._get_filepath(variable, measurement, day)
+                if path.exists(filepath):
+                    day_ts_df = pd.concat([pd.read_parquet(filepath), day_ts_df])
+                    day_ts_df = day_ts_df[
+                        ~day_ts_df.duplicated(subset=id_cols, keep="last")
+                    ]
+                cache._atomic_write(
+                    filepath,
+                    day_ts_df.sort_values(id_cols).reset_index(drop=True).to_parquet,
+                )
+
+    def read(self, variable, measurement, *, start_date=None, end_date=None):
+        """
+        Read the stored data of a variable and measurement.
+
+        Parameters
+        ----------
+        variable, measurement : str
+            Labels of the variable and measurement, as in the columns of the written
+            data frames.
+        start_date, end_date : str or datetime, optional
+            String in the "YYYY-MM-DD" format or datetime instance, respectively
+            representing the first and last (inclusive) days to read. If None, the data
+            is read from the first or until the last stored day respectively.
+
+        Returns
+        -------
+        long_ts_df : pd.DataFrame
+            Data frame in long format, with a row for each measurement and columns
+            named after `time_name`, `stations_id_name` and `settings.VALUE_NAME`.
+        """
+        sensor_dir = self._get_sensor_dir(variable, measurement)
+        if path.exists(sensor_dir):
+            days = sorted(
+                pd.Timestamp(dirname.split("=", 1)[1])
+                for dirname in os.listdir(sensor_dir)
+            )
+        else:
+            days = []
+        if start_date is not None:
+            days = [day for day in days if day >= pd.Timestamp(start_date)]
+        if end_date is not None:
+            days = [day for day in days if day <= pd.Timestamp(end_date)]
+        if not days:
+            return pd.DataFrame(
+                columns=[self.time_name, self.stations_id_name, settings.VALUE_NAME]
+            )
+        return pd.concat(
+            [
+                pd.read_parquet(self._get_filepath(variable, measurement, day))
+                for day in days
+            ],
+            ignore_index=True,
+        )
+
+
+class ZarrTSStore:
+    """Zarr storage of time series data as (time, station) cubes."""
+
+    def __init__(self, store, *, stations_id_name=None, time_name=None):
+        """
+        Initialize a Zarr time series store.
+
+        Each variable is stored in its own Zarr group (named after the variable), with
+        a data variable for each measurement, with time and station dimensions, which
+        is appended along the time dimension. This requires the xarray and zarr
+        packages.
+
+        Parameters
+        ----------
+        store : str, pathlib.Path object or MutableMapping
+            Zarr store or path to a directory, passed to `xarray.Dataset.to_zarr`.
+        stations_id_name, time_name : str, optional
+            Names of the station identifier and time dimensions. If None, the values
+            from `settings.STATIONS_ID_NAME` and `settings.TIME_NAME` are used
+            respectively.
+        """
+        if xr is None:
+            raise ImportError(
+                "The Zarr storage requires the xarray and zarr packages. You can "
+                "install them using conda or pip. See https://xarray.dev."
+            )
+        self.store = store
+        if stations_id_name is None:
+            stations_id_name = settings.STATIONS_ID_NAME
+        self.stations_id_name = stations_id_name
+        if time_name is None:
+            time_name = settings.TIME_NAME
+        self.time_name = time_name
+
+    def _open_dataset(self, variable):
+        try:
+            return xr.open_zarr(self.store, group=variable)
+        except (FileNotFoundError, KeyError, ValueError):
+            # the variable has not been stored yet
+            return None
+
+    def write(self, ts_df):
+        """
+        Append a time series data frame to the store.
+
+        For each variable, only the rows after its last stored time are appended, so
+        that writing the same data twice leaves the store unchanged. The stations and
+        measurements of the first write of each variable define its station dimension
+        and data variables. The columns of later writes are aligned to the stored
+        stations, so that stations that are not stored are dropped (with a warning),
+        whereas measurements that are not stored raise a `ValueError`.
+
+        Parameters
+        ----------
+        ts_df : pd.DataFrame
+            Data frame with a time series of measurements (rows) for each (station,
+            variable, measurement) triplet (columns), as yielded by
+            `AgrometeoDataset.iter_ts_df` with a list-like `variable`.
+        """
+        _check_ts_df(ts_df)
+        variables_das = {}
+        for variable, measurement, sensor_ts_df in _iter_sensor_ts_dfs(ts_df):
+            variables_das.setdefault(variable, {})[measurement] = xr.DataArray(
+                sensor_ts_df.to_numpy(),
+                dims=[self.time_name, self.stations_id_name],
+                coords={
+                    self.time_name: sensor_ts_df.index.to_numpy(),
+                    self.stations_id_name: sensor_ts_df.columns.astype(str).to_numpy(),
+                },
+            )
+        # check all the variables before writing any of them
+        stored_dss = {}
+        for variable, measurements_das in variables_das.items():
+            stored_ds = self._open_dataset(variable)
+            if stored_ds is not None:
+                new_measurements = set(measurements_das).difference(stored_ds.data_vars)
+                if new_measurements:
+                    raise ValueError(
+                        f"Measurements {sorted(new_measurements)} of variable "
+                        f"{variable} are not in the store, which has "
+                        f"{sorted(stored_ds.data_vars)}. Use another store for them."
+                    )
+            stored_dss[variable] = stored_ds
+        for variable, measurements_das in variables_das.items():
+            ds = xr.Dataset(measurements_das)
+            stored_ds = stored_dss[variable]
+            if stored_ds is None:
+                to_zarr_kws = {"mode": "w"}
+            else:
+                dropped_stations_ids = np.setdiff1d(
+                    ds[self.stations_id_name], stored_ds[self.stations_id_name]
+                )
+                if len(dropped_stations_ids) > 0:
+                    logging.warning(
+                        f"Stations {list(dropped_stations_ids)} of variable "
+                        f"{variable} are not in the store, so their data is dropped."
+                    )
+                ds = ds.sel(
+                    {
+                        self.time_name: ds[self.time_name]
+                        > stored_ds[self.time_name][-1].values
+                    }
+                ).reindex({self.stations_id_name: stored_ds[self.stations_id_name]})
+                to_zarr_kws = {"append_dim": self.time_name}
+            if ds.sizes[self.time_name] > 0:
+                ds.to_zarr(self.store, group=variable, **to_zarr_kws)
+
+
+class MemmapTSStore:
+    """Memory-mapped storage of time series data as (time, station) cubes."""
+
+    def __init__(self, root_dir, *, dtype=None, stations_id_name=None, time_name=None):
+        """
+        Initialize a memory-mapped time series store.
+
+        The values of each variable and measurement are stored as a raw, row-major
+        (time, station) array in "<root_dir>/<variable>/<measurement>/values.dat",
+        which is appended along the time dimension, with its times and stations stored
+        alongside. Accordingly, the stored data can be read as zero-copy views of a
+        memory map, so that only the accessed values (e.g., the timestamps of a plot)
+        are actually loaded from disk.
+
+        Parameters
+        ----------
+        root_dir : str or pathlib.Path object
+            Path to the root directory of the store. It will be created if it does not
+            exist.
+        dtype : str or numpy.dtype, optional
+            Data type of the stored values of new variables and measurements, which
+            must be a numpy floating type (missing values are stored as NaN). Nullable
+            types such as "Float32" are mapped to their numpy counterpart. If None, the
+            value from `settings.TS_DTYPE` is used.
+        stations_id_name, time_name : str, optional
+            Names of the station identifier and time axes of the read data frames. If
+            None, the values from `settings.STATIONS_ID_NAME` and `settings.TIME_NAME`
+            are used respectively.
+        """
+        self.root_dir = root_dir
+        os.makedirs(self.root_dir, exist_ok=True)
+        if dtype is None:
+            dtype = settings.TS_DTYPE
+        self.dtype = np.dtype(
+            getattr(pd.api.types.pandas_dtype(dtype), "numpy_dtype", dtype)
+        )
+        if stations_id_name is None:
+            stations_id_name = settings.STATIONS_ID_NAME
+        self.stations_id_name = stations_id_name
+        if time_name is None:
+            time_name = settings.TIME_NAME
+        self.time_name = time_name
+
+    def _get_sensor_dir(self, variable, measurement):
+        return path.join(self.root_dir, str(variable), str(measurement))
+
+    def _read_metadata(self, sensor_dir):
+        metadata_filepath = path.join(sensor_dir, MEMMAP_METADATA_FILENAME)
+        if not path.exists(metadata_filepath):
+            return None, None
+        with open(metadata_filepath) as src:
+            metadata = json.load(src)
+        times_filepath = path.join(sensor_dir, MEMMAP_TIMES_FILENAME)
+        if path.exists(times_filepath):
+            times = np.load(times_filepath)
+        else:
+            # ACHTUNG: stores written before empty times were persisted
+            times = np.array([], dtype="datetime64[ns]")
+        return metadata, times
+
+    def write(self, ts_df):
+        """
+        Append a time series data frame to the store.
+
+        For each variable and measurement, only the rows after its last stored time are
+        appended, so that writing the same data twice leaves the store unchanged. The
+        stations of the first write define the station axis, to which the columns of
+        later writes are aligned.
+
+        Parameters
+        ----------
+        ts_df : pd.DataFrame
+            Data frame with a time series of measurements (rows) for each (station,
+            variable, measurement) triplet (columns), as yielded by
+            `AgrometeoDataset.iter_ts_df` with a list-like `variable`.
+        """
+        _check_ts_df(ts_df)
+        for variable, measurement, sensor_ts_df in _iter_sensor_ts_dfs(ts_df):
+            sensor_dir = self._get_sensor_dir(variable, measurement)
+            metadata, times = self._read_metadata(sensor_dir)
+            sensor_ts_df = sensor_ts_df.sort_index()
+            if metadata is None:
+                os.makedirs(sensor_dir, exist_ok=True)
+                metadata = {
+                    "dtype": self.dtype.str,
+                    "stations": sensor_ts_df.columns.astype(str).tolist(),
+                }
+                # ACHTUNG: persist the (empty) times before the metadata so that a
+                # store with metadata can always be read, even if its first write was
+                # empty
+                times = np.array([], dtype="datetime64[ns]")
+                cache._atomic_write(
+                    path.join(sensor_dir, MEMMAP_TIMES_FILENAME),
+                    functools.partial(_dump_npy, times),
+                )
+                cache._atomic_write(
+                    path.join(sensor_dir, MEMMAP_METADATA_FILENAME),
+                    functools.partial(_dump_json, metadata),
+                )
+            else:
+                if len(times) > 0:
+                    sensor_ts_df = sensor_ts_df[sensor_ts_df.index > times[-1]]
+                sensor_ts_df = sensor_ts_df.reindex(
+                    columns=pd.Index(metadata["stations"]).astype(
+                        sensor_ts_df.columns.dtype
+                    )
+                )
+            if len(sensor_ts_df.index) == 0:
+                continue
+            dtype = np.dtype(metadata["dtype"])
+            values_filepath = path.join(sensor_dir, MEMMAP_VALUES_FILENAME)
+            with open(values_filepath, "ab") as dst:
+                # ACHTUNG: discard any values appended after the last stored times,
+                # e.g., by an interrupted write
+                dst.truncate(len(times) * len(metadata["stations"]) * dtype.itemsize)
+                np.ascontiguousarray(
+                    sensor_ts_df.to_numpy(dtype=dtype, na_value=np.nan)
+                ).tofile(dst)
+            times = np.concatenate(
+                [times, sensor_ts_df.index.to_numpy(dtype="datetime64[ns]")]
+            )
+            cache._atomic_write(
+                path.join(sensor_dir, MEMMAP_TIMES_FILENAME),
+                functools.partial(_dump_npy, times),
+            )
+
+    def read(self, variable, measurement, *, start_date=None, end_date=None):
+        """
+        Read the stored data of a variable and measurement as a memory-mapped view.
+
+        Parameters
+        ----------
+        variable, measurement : str
+            Labels of the variable and measurement, as in the columns of the written
+            data frames.
+        start_date, end_date : str or datetime, optional
+            String or datetime instance, respectively representing the first and last
+            (inclusive) times to read. If None, the data is read from the first or until
+            the last stored time respectively.
+
+        Returns
+        -------
+        ts_df : pd.DataFrame
+            Data frame with a time series of measurements (rows) at each station
+            (columns), whose values are a read-only view of the memory-mapped array.
+        """
+        sensor_dir = self._get_sensor_dir(variable, measurement)
+        metadata, times = self._read_metadata(sensor_dir)
+        if metadata is None:
+            raise KeyError(f"No data stored for {variable} and {measurement}")
+        dtype = np.dtype(metadata["dtype"])
+        shape = (len(times), len(metadata["stations"]))
+        if len(times) == 0:
+            # ACHTUNG: empty files cannot be memory-mapped
+            values = np.empty(shape, dtype=dtype)
+        else:
+            values = np.memmap(
+                path.join(sensor_dir, MEMMAP_VALUES_FILENAME),
+                dtype=dtype,
+                mode="r",
+                shape=shape,
+            )
+        # ACHTUNG: slicing the rows (rather than boolean indexing) keeps the view
+        start = (
+            0
+            if start_date is None
+            else times.searchsorted(
+                np.datetime64(pd.Timestamp(start_date)), side="left"
+            )
+        )
+        end = (
+            len(times)
+            if end_date is None
+            else times.searchsorted(np.datetime64(pd.Timestamp(end_date)), side="right")
+        )
+        return pd.DataFrame(
+            values[start:end],
+            index=pd.DatetimeIndex(times[start:end], name=self.time_name),
+            columns=pd.Index(metadata["stations"], name=self.stations_id_name),
+            copy=False,
+        )
+
+    def read_ts_gdf(
+        self,
+        variable,
+        measurement,
+        stations_gdf,
+        *,
+        stations_id_col=None,
+        start_date=None,
+        end_date=None,
+    ):
+        """
+        Read the stored data of a variable and measurement as a geo-data frame.
+
+        The measurement values are a (transposed) view of the memory-mapped array, so
+        that, e.g., plotting a timestamp with `plot_temperature_map` only loads its
+        values from disk.
+
+        Parameters
+        ----------
+        variable, measurement : str
+            Labels of the variable and measurement, as in the columns of the written
+            data frames.
+        stations_gdf : gpd.GeoDataFrame
+            Geo-data frame with the geometries of the stations, e.g., the
+            `stations_gdf` attribute of a dataset.
+        stations_id_col : str, optional
+            Column of `stations_gdf` that identifies the stations, i.e., that matches
+            the columns of the written data frames. If None, the value from
+            `settings.DEFAULT_STATIONS_ID_COL` is used.
+        start_date, end_date : str or datetime, optional
+            String or datetime instance, respectively representing the first and last
+            (inclusive) times to read. If None, the data is read from the first or until
+            the last stored time respectively.
+
+        Returns
+        -------
+        ts_gdf : gpd.GeoDataFrame
+            Geo-data frame with a time series of measurements (columns) at each station
+            (rows), as returned by `AgrometeoDataset.get_ts_gdf`.
+        """
+        if stations_id_col is None:
+            stations_id_col = settings.DEFAULT_STATIONS_ID_COL
+        ts_df = self.read(
+            variable, measurement, start_date=start_date, end_date=end_date
+        )
+        stations_gdf = stations_gdf.drop_duplicates(subset=stations_id_col)
+        geometry = stations_gdf.geometry.set_axis(
+            stations_gdf[stations_id_col].astype(str)
+        ).reindex(ts_df.columns)
+        return gpd.GeoDataFrame(
+            pd.DataFrame(
+                ts_df.to_numpy().T,
+                index=ts_df.columns,
+                columns=ts_df.index,
+                copy=False,
+            ),
+            geometry=geometry.to_numpy(),
+            crs=stations_gdf.crs,
+            # ACHTUNG: otherwise the values are copied out of the memory map
+            copy=False,
+        )
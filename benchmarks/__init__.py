@@ -0,0 +1 @@
+"""Benchmarks for `agrometeo` package."""
@@ -0,0 +1,29 @@
+"""Fixtures for the `agrometeo` benchmarks."""
+import pytest
+
+from .mock_server import MockAPIServer, make_data_content, make_stations_data
+
+NUM_STATIONS = 5000
+NUM_DATA_STATIONS = 50
+
+
+@pytest.fixture(scope="session")
+def stations_data():
+    return make_stations_data(NUM_STATIONS)
+
+
+@pytest.fixture(scope="session")
+def stations_ids():
+    return [str(station_id) for station_id in range(1, NUM_DATA_STATIONS + 1)]
+
+
+@pytest.fixture(scope="session")
+def data_content(stations_ids):
+    return make_data_content(stations_ids, "2022-01-01", "2022-03-31 23:50")
+
+
+@pytest.fixture
+def mock_api(monkeypatch):
+    with MockAPIServer(num_stations=NUM_DATA_STATIONS) as mock_api:
+        mock_api.patch(monkeypatch)
+        yield mock_api
@@ -0,0 +1,345 @@
+"""Local stand-in for the agrometeo API, serving synthetic or recorded payloads."""
+import email.utils
+import hashlib
+import json
+import threading
+import time
+from http import server
+from os import path
+from urllib import parse
+
+import numpy as np
+import pandas as pd
+
+import agrometeo as agm
+
+API_PATH = "/backend/api"
+# `meteo/data` frequency of each scale
+SCALE_FREQS = {"none": "10min", "hour": "h", "day": "D", "month": "MS", "year": "YS"}
+VARIABLES_DATA = [
+    {"id": 1, "name": {"en": "Temperature 2m above ground "}},
+    {"id": 4, "name": {"en": "Relative humidity"}},
+    {"id": 6, "name": {"en": "Precipitation"}},
+    {"id": 9, "name": {"en": "Avg. wind speed"}},
+]
+
+
+def make_stations_data(num_stations, *, seed=0):
+    """Generate a synthetic payload of the agrometeo `stations` endpoint."""
+    rng = np.random.default_rng(seed)
+    lons = rng.uniform(5.96, 10.49, num_stations)
+    lats = rng.uniform(45.82, 47.81, num_stations)
+    return [
+        {
+            "id": station_id,
+            "name": f"STATION-{station_id}",
+            "long_dec": str(lon),
+            "lat_dec": str(lat),
+            "lon_ch": str(600000 + 75000 * (lon - 7.44)),
+            "lat_ch": str(200000 + 111000 * (lat - 46.95)),
+        }
+        for station_id, lon, lat in zip(range(1, num_stations + 1), lons, lats)
+    ]
+
+
+def make_data_content(
+    stations_ids, start, end, *, freq="10min", variable_code=1, measurement="avg"
+):
+    """Generate a synthetic (encoded) payload of the `meteo/data` endpoint."""
+    date_range = pd.date_range(start, end, freq=freq)
+    rng = np.random.default_rng(0)
+    values = rng.normal(10, 5, (len(date_range), len(stations_ids))).round(1)
+    keys = [
+        f"{station_id}_{variable_code}_{measurement}" for station_id in stations_ids
+    ]
+    return json.dumps(
+        {
+            "data": [
+                {"date": str(date), **dict(zip(keys, row.astype(str)))}
+                for date, row in zip(date_range, values)
+            ]
+        }
+    ).encode()
+
+
+def make_query_data_content(query):
+    """
+    Generate a (encoded) payload of the `meteo/data` endpoint for a request query.
+
+    The values are a deterministic function of the station, sensor and time, so that
+    overlapping requests (e.g., of different chunks or station batches) are consistent.
+    """
+    # both `from` and `to` are inclusive days, as in the agrometeo API
+    date_range = pd.date_range(
+        query["from"],
+        pd.Timestamp(query["to"]) + pd.Timedelta(days=1),
+        freq=SCALE_FREQS.get(query.get("scale"), "10min"),
+        inclusive="left",
+    )
+    stations_ids = query["stations"].split(",")
+    sensors = query["sensors"].split(",")
+    hours = (date_range.hour + date_range.minute / 60).to_numpy()
+    daily_cycle = 8 * np.sin(2 * np.pi * (hours - 9) / 24)
+    keys = []
+    columns = []
+    for sensor in sensors:
+        variable_code, _ = sensor.split(":")
+        for station_id in stations_ids:
+            keys.append(f"{station_id}_{sensor.replace(':', '_')}")
+            columns.append(
+                (10 + daily_cycle + int(station_id) % 10 + int(variable_code)).round(1)
+            )
+    values = np.column_stack(columns).astype(str) if columns else []
+    return json.dumps(
+        {
+            "data": [
+                {"date": str(date), **dict(zip(keys, row))}
+                for date, row in zip(date_range, values)
+            ]
+        }
+    ).encode()
+
+
+def _is_catalogue_path(request_path):
+    return request_path.endswith(("stations", "sensors"))
+
+
+class _RequestHandler(server.BaseHTTPRequestHandler):
+    def do_GET(self):  # noqa: N802
+        status_code, content, headers = self.server.mock_api.handle(
+            self.path, headers=self.headers
+        )
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockAPIServer:
+    """
+    Local HTTP server standing in for the agrometeo `stations`, `sensors` and
+    `meteo/data` endpoints.
+
+    The payloads are generated synthetically (scaling to any number of stations and
+    time range) or replayed from a directory of recorded responses. Each request can
+    be delayed by a fixed latency and fail with a given probability. The catalogue
+    endpoints, i.e., `stations` and `sensors`, support conditional requests (with the
+    "If-None-Match" and "If-Modified-Since" headers).
+    """
+
+    def __init__(
+        self,
+        *,
+        num_stations=100,
+        stations_data=None,
+        variables_data=None,
+        latency=0,
+        error_rate=0,
+        error_status_code=503,
+        num_failures=0,
+        recordings_dir=None,
+        seed=0,
+    ):
+        """
+        Initialize the server.
+
+        Parameters
+        ----------
+        num_stations : int, default 100
+            Number of stations of the synthetic `stations` payload. Ignored if
+            `stations_data` is provided.
+        stations_data, variables_data : list of dict, optional
+            Data of the `stations` and `sensors` payloads. If None, synthetic data is
+            used.
+        latency : numeric, default 0
+            Delay (in seconds) before responding to each request.
+        error_rate : numeric, default 0
+            Probability that a request fails with `error_status_code`.
+        error_status_code : int, default 503
+            Status code of the failed requests.
+        num_failures : int, default 0
+            Number of the next requests of the `meteo/data` endpoint that fail with
+            `error_status_code`, e.g., to test retries deterministically.
+        recordings_dir : str or pathlib.Path object, optional
+            Path to a directory of recorded responses, named after the hash of the
+            request path and query (see `get_recording_filepath`). Requests with a
+            recording are replayed from it, otherwise the generated payload is
+            recorded. If None, the payloads are always generated.
+        seed : int, default 0
+            Seed of the synthetic stations and of the injected errors.
+        """
+        if stations_data is None:
+            stations_data = make_stations_data(num_stations, seed=seed)
+        if variables_data is None:
+            variables_data = VARIABLES_DATA
+        self.stations_data = stations_data
+        self.variables_content = json.dumps({"data": variables_data}).encode()
+        # the catalogues are served as if they had been last modified when the server
+        # was initialized
+        self.last_modified = email.utils.formatdate(usegmt=True)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status_code = error_status_code
+        self.num_failures = num_failures
+        self.recordings_dir = recordings_dir
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self.requests = []
+        self._httpd = None
+
+    @property
+    def stations_data(self):
+        """Data of the `stations` payload, which can be replaced between requests."""
+        return self._stations_data
+
+    @stations_data.setter
+    def stations_data(self, stations_data):
+        self._stations_data = stations_data
+        self.stations_content = json.dumps({"data": stations_data}).encode()
+
+    @property
+    def catalogue_requests(self):
+        """Request paths of the `stations` and `sensors` endpoints."""
+        return [
+            request_path
+            for request_path in self.requests
+            if _is_catalogue_path(parse.urlparse(request_path).path)
+        ]
+
+    @property
+    def data_requests(self):
+        """Request paths of the `meteo/data` endpoint."""
+        return [
+            request_path
+            for request_path in self.requests
+            if not _is_catalogue_path(parse.urlparse(request_path).path)
+        ]
+
+    @property
+    def base_url(self):
+        """Base url of the API, i.e., the counterpart of `agrometeo.core.BASE_URL`."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{API_PATH}"
+
+    def get_recording_filepath(self, request_path):
+        """Get the path to the recorded response of a request path (with query)."""
+        return path.join(
+            self.recordings_dir,
+            f"{hashlib.sha1(request_path.encode()).hexdigest()}.json",
+        )
+
+    def _get_content(self, request_path):
+        parsed_path = parse.urlparse(request_path)
+        if parsed_path.path.endswith("stations"):
+            return self.stations_content
+        elif parsed_path.path.endswith("sensors"):
+            return self.variables_content
+        return make_query_data_content(dict(parse.parse_qsl(parsed_path.query)))
+
+    def _get_catalogue_response(self, content, headers):
+        # conditional requests are answered with "304 Not Modified" if the catalogue
+        # has not changed, with the "If-None-Match" header taking precedence
+        etag = f'"{hashlib.sha1(content).hexdigest()}"'
+        response_headers = {"ETag": etag, "Last-Modified": self.last_modified}
+        if headers.get("If-None-Match") is not None:
+            not_modified = headers["If-None-Match"] == etag
+        elif headers.get("If-Modified-Since") is not None:
+            not_modified = email.utils.parsedate_to_datetime(
+                headers["If-Modified-Since"]
+            ) >= email.utils.parsedate_to_datetime(self.last_modified)
+        else:
+            not_modified = False
+        if not_modified:
+            return 304, b"", response_headers
+        return 200, content, response_headers
+
+    def handle(self, request_path, *, headers=None):
+        """
+        Get the response to a request.
+
+        Parameters
+        ----------
+        request_path : str
+            Path (with query) of the request.
+        headers : dict-like, optional
+            Headers of the request.
+
+        Returns
+        -------
+        status_code : int
+            Status code of the response.
+        content : bytes
+            Content of the response.
+        headers : dict
+            Headers of the response.
+        """
+        if headers is None:
+            headers = {}
+        is_catalogue = _is_catalogue_path(parse.urlparse(request_path).path)
+        with self._lock:
+            self.requests.append(request_path)
+            failed = self._rng.random() < self.error_rate
+            if not is_catalogue and self.num_failures > 0:
+                self.num_failures -= 1
+                failed = True
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            return self.error_status_code, b"{}", {}
+        if self.recordings_dir is None:
+            content = self._get_content(request_path)
+        else:
+            recording_filepath = self.get_recording_filepath(request_path)
+            if path.exists(recording_filepath):
+                with open(recording_filepath, "rb") as src:
+                    content = src.read()
+            else:
+                content = self._get_content(request_path)
+                with open(recording_filepath, "wb") as dst:
+                    dst.write(content)
+        if is_catalogue:
+            return self._get_catalogue_response(content, headers)
+        return 200, content, {}
+
+    def start(self):
+        """Start serving (in a background thread) on a free local port."""
+        self._httpd = server.ThreadingHTTPServer(("127.0.0.1", 0), _RequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock_api = self
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stop serving."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def patch(self, monkeypatch):
+        """Point the `agrometeo` endpoints to the server (for the current test)."""
+        monkeypatch.setattr(
+            agm.core, "STATIONS_API_ENDPOINT", f"{self.base_url}/stations"
+        )
+        monkeypatch.setattr(
+            agm.core, "VARIABLES_API_ENDPOINT", f"{self.base_url}/sensors"
+        )
+        monkeypatch.setattr(
+            agm.core, "METEO_DATA_API_ENDPOINT", f"{self.base_url}/meteo/data"
+        )
+        # new process-wide client and catalogue cache, without rate limit so that the
+        # benchmarks measure the package (and the injected latency)
+        monkeypatch.setattr(agm.settings, "RATE_LIMIT", None)
+        monkeypatch.setattr(agm.core, "RETRY_BACKOFF_FACTOR", 0)
+        monkeypatch.setattr(agm.core, "_client", None)
+        monkeypatch.setattr(agm.cache, "_catalogue_cache", None)
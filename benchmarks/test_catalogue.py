@@ -0,0 +1,34 @@
+"""Benchmarks of the station catalogue construction."""
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import Point
+
+import agrometeo as agm
+
+
+def _get_stations_gdf_rowwise(stations_data, crs):
+    # reference implementation building a `Point` for each row
+    stations_df = pd.json_normalize(stations_data)
+    geom_cols = agm.core.GEOM_COL_DICT[crs]
+    return gpd.GeoDataFrame(
+        stations_df.drop(geom_cols, axis=1),
+        geometry=stations_df[geom_cols]
+        .astype(np.float64)
+        .apply(lambda xy_ser: Point(xy_ser.iloc[0], xy_ser.iloc[1]), axis=1),
+        crs=crs,
+    )
+
+
+@pytest.mark.parametrize("crs", [agm.core.LONLAT_CRS, agm.core.LV03_CRS])
+def test_stations_gdf(benchmark, stations_data, crs):
+    stations_gdf = benchmark(agm.core._get_stations_gdf, stations_data, crs)
+    assert len(stations_gdf) == len(stations_data)
+    assert stations_gdf.geometry.geom_equals(
+        _get_stations_gdf_rowwise(stations_data, crs).geometry
+    ).all()
+
+
+def test_stations_gdf_rowwise(benchmark, stations_data):
+    benchmark(_get_stations_gdf_rowwise, stations_data, agm.core.LONLAT_CRS)
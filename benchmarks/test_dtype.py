@@ -0,0 +1,36 @@
+"""Benchmarks of the memory usage of the time series data types."""
+import pandas as pd
+import pytest
+
+import agrometeo as agm
+
+
+@pytest.mark.parametrize("dtype", ["float64", "float32", "Float32"])
+def test_parse_data_dtype(benchmark, data_content, stations_ids, dtype):
+    ts_df = benchmark(
+        agm.core._parse_data,
+        data_content,
+        [(1, "avg")],
+        stations_ids,
+        "time",
+        dtype,
+    )
+    assert (ts_df.dtypes == dtype).all()
+    benchmark.extra_info["memory_usage"] = int(ts_df.memory_usage(deep=True).sum())
+
+
+@pytest.mark.parametrize("dtype", ["float64", "float32", "Float32"])
+def test_long_ts_df_dtype(benchmark, data_content, stations_ids, dtype):
+    ts_df = agm.core._get_sensor_ts_df(
+        agm.core._parse_data(data_content, [(1, "avg")], stations_ids, "time", dtype),
+        (1, "avg"),
+    )
+    long_ts_df = benchmark(
+        agm.base._long_ts_df, ts_df, "station_id", "time", "value", dropna=True
+    )
+    assert long_ts_df["value"].dtype == dtype
+    memory_usage = long_ts_df.memory_usage(deep=True)
+    benchmark.extra_info["memory_usage"] = int(memory_usage.sum())
+    # the labels are categorical so the values and times make up most of the memory
+    assert memory_usage["station_id"] < memory_usage["value"]
+    assert isinstance(long_ts_df["station_id"].dtype, pd.CategoricalDtype)
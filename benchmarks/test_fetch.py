@@ -0,0 +1,73 @@
+"""Benchmarks of the requests fan-out against a local mock of the API."""
+import asyncio
+
+import geopandas as gpd
+import pytest
+from shapely import geometry
+
+import agrometeo as agm
+
+# the synthetic stations are spread over the Swiss extent
+REGION_BOUNDS = (5.9, 45.8, 10.5, 47.9)
+START_DATE = "2022-01-01"
+END_DATE = "2022-01-31"
+CHUNK_FREQ = "3D"
+LATENCY = 0.02
+
+
+@pytest.fixture
+def region():
+    return gpd.GeoDataFrame(
+        geometry=[geometry.box(*REGION_BOUNDS)], crs=agm.core.LONLAT_CRS
+    )
+
+
+def test_stations_gdf(benchmark, mock_api, region):
+    # catalogue request, parsing and spatial join (without the process-wide caches)
+    def get_stations_gdf():
+        agm.cache._catalogue_cache = None
+        agm.core._catalogue_stations_gdfs.clear()
+        return agm.AgrometeoDataset(region=region).stations_gdf
+
+    stations_gdf = benchmark(get_stations_gdf)
+    assert len(stations_gdf) == mock_api.stations_content.count(b'"id"')
+
+
+@pytest.mark.parametrize("max_workers", [1, 10])
+def test_get_ts_df(benchmark, mock_api, region, max_workers):
+    mock_api.latency = LATENCY
+    agm_ds = agm.AgrometeoDataset(region=region)
+    ts_df = benchmark.pedantic(
+        agm_ds.get_ts_df,
+        args=("temperature", START_DATE, END_DATE),
+        kwargs={"chunk_freq": CHUNK_FREQ, "max_workers": max_workers},
+        rounds=3,
+    )
+    assert len(ts_df.columns) == len(agm_ds.stations_gdf)
+
+
+def test_aget_ts_df(benchmark, mock_api, region):
+    mock_api.latency = LATENCY
+
+    async def aget_ts_df():
+        # ACHTUNG: the async client cannot be shared across event loops
+        async with agm.AsyncAPIClient() as async_client:
+            return await agm.AgrometeoDataset(
+                region=region, async_client=async_client
+            ).aget_ts_df("temperature", START_DATE, END_DATE, chunk_freq=CHUNK_FREQ)
+
+    ts_df = benchmark.pedantic(lambda: asyncio.run(aget_ts_df()), rounds=3)
+    assert len(ts_df.columns) == len(agm.AgrometeoDataset(region=region).stations_gdf)
+
+
+def test_get_ts_df_errors(benchmark, mock_api, region):
+    # a fifth of the requests fail and are retried
+    mock_api.error_rate = 0.2
+    agm_ds = agm.AgrometeoDataset(region=region)
+    ts_df = benchmark.pedantic(
+        agm_ds.get_ts_df,
+        args=("temperature", START_DATE, END_DATE),
+        kwargs={"chunk_freq": CHUNK_FREQ, "num_retries": 10},
+        rounds=3,
+    )
+    assert not ts_df.isna().all().any()
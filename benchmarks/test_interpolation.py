@@ -0,0 +1,44 @@
+"""Benchmarks of the spatial interpolation."""
+import numpy as np
+import pytest
+
+import agrometeo as agm
+
+
+@pytest.fixture(scope="module")
+def stations_xy():
+    return np.random.default_rng(0).uniform(0, 100000, (200, 2))
+
+
+@pytest.fixture(scope="module")
+def values(stations_xy):
+    # one month of 10-minute data
+    return np.random.default_rng(0).normal(10, 5, (len(stations_xy), 30 * 144))
+
+
+@pytest.fixture(scope="module")
+def target_xy():
+    xs, ys = agm.get_grid_coords([0, 0, 100000, 100000], 2000)
+    grid_xs, grid_ys = np.meshgrid(xs, ys)
+    return np.column_stack([grid_xs.ravel(), grid_ys.ravel()])
+
+
+def test_interpolate_values(benchmark, stations_xy, values, target_xy):
+    weights = agm.get_idw_weights(stations_xy, target_xy)
+    interpolated = benchmark(agm.interpolate_values, weights, values)
+    assert interpolated.shape == (len(target_xy), values.shape[1])
+
+
+def test_interpolate_values_per_timestamp(benchmark, stations_xy, values, target_xy):
+    # recompute and apply the weights for each timestamp
+    def _interpolate():
+        return np.column_stack(
+            [
+                agm.interpolate_values(
+                    agm.get_idw_weights(stations_xy, target_xy), values[:, [i]]
+                )
+                for i in range(values.shape[1])
+            ]
+        )
+
+    benchmark.pedantic(_interpolate, rounds=1)
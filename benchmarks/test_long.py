@@ -0,0 +1,33 @@
+"""Benchmarks of the wide to long transformation."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import agrometeo as agm
+
+
+@pytest.fixture(scope="module")
+def ts_df():
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2022-01-01", "2022-12-31 23:50", freq="10min", name="time")
+    return pd.DataFrame(
+        rng.normal(10, 5, (len(index), 100)),
+        index=index,
+        columns=pd.Index([f"STATION-{i}" for i in range(100)], name="name"),
+    )
+
+
+def test_long_ts_df(benchmark, ts_df):
+    long_ts_df = benchmark(agm.base._long_ts_df, ts_df, "station_id", "time", "value")
+    assert len(long_ts_df) == ts_df.size
+
+
+def test_long_ts_df_melt(benchmark, ts_df):
+    benchmark(
+        lambda: pd.melt(
+            ts_df.reset_index(),
+            id_vars="time",
+            var_name="station_id",
+            value_name="value",
+        )
+    )
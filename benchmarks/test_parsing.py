@@ -0,0 +1,37 @@
+"""Benchmarks of the parsing of the API responses."""
+import json
+
+import pandas as pd
+
+import agrometeo as agm
+
+
+def _parse_data_rowwise(content, variable_code, measurement, time_name):
+    # reference implementation normalizing the records and converting them row-wise
+    ts_df = pd.json_normalize(json.loads(content)["data"]).set_index("date")
+    ts_df.index = pd.to_datetime(ts_df.index)
+    ts_df.index.name = time_name
+    ts_df.columns = ts_df.columns.str.replace(f"_{variable_code}_{measurement}", "")
+    return ts_df.apply(pd.to_numeric, axis=1)
+
+
+def test_parse_data(benchmark, data_content, stations_ids):
+    ts_df = benchmark(
+        agm.core._parse_data,
+        data_content,
+        [(1, "avg")],
+        stations_ids,
+        "time",
+        "float64",
+    )
+    pd.testing.assert_frame_equal(
+        agm.core._get_sensor_ts_df(ts_df, (1, "avg")),
+        _parse_data_rowwise(data_content, 1, "avg", "time"),
+        check_names=False,
+    )
+
+
+def test_parse_data_rowwise(benchmark, data_content):
+    benchmark.pedantic(
+        _parse_data_rowwise, args=(data_content, 1, "avg", "time"), rounds=3
+    )
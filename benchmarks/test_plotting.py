@@ -0,0 +1,53 @@
+"""Benchmarks of the plotting of station measurements."""
+import geopandas as gpd
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pytest
+
+import agrometeo as agm
+
+NUM_FRAMES = 24
+NUM_PLOT_STATIONS = 1000
+
+
+@pytest.fixture(scope="module")
+def ts_gdf(stations_data):
+    stations_gdf = agm.core._get_stations_gdf(
+        stations_data[:NUM_PLOT_STATIONS], agm.core.LONLAT_CRS
+    )
+    columns = pd.date_range("2022-01-01", periods=NUM_FRAMES, freq="h", name="time")
+    return gpd.GeoDataFrame(
+        np.random.default_rng(0).normal(10, 5, (len(stations_gdf), NUM_FRAMES)),
+        columns=columns,
+        geometry=stations_gdf.geometry,
+    )
+
+
+def test_plot_temperature_map(benchmark, ts_gdf):
+    def plot_temperature_map():
+        ax = agm.plot_temperature_map(ts_gdf, add_basemap=False)
+        plt.close(ax.figure)
+
+    benchmark(plot_temperature_map)
+
+
+def test_save_temperature_maps(benchmark, ts_gdf, tmp_path):
+    dst_filepaths = benchmark.pedantic(
+        agm.save_temperature_maps,
+        args=(ts_gdf, tmp_path / "frame.png"),
+        kwargs={"max_workers": 1, "add_basemap": False},
+        rounds=3,
+    )
+    assert len(dst_filepaths) == NUM_FRAMES
+
+
+def test_save_temperature_maps_redraw(benchmark, ts_gdf, tmp_path):
+    # reference implementation drawing each frame from scratch
+    def save_temperature_maps():
+        for i, dt in enumerate(ts_gdf.columns.drop("geometry")):
+            ax = agm.plot_temperature_map(ts_gdf, dt=dt, add_basemap=False)
+            ax.figure.savefig(tmp_path / f"frame{i}.png")
+            plt.close(ax.figure)
+
+    benchmark.pedantic(save_temperature_maps, rounds=3)
@@ -0,0 +1,53 @@
+"""Benchmarks of the read-back of stored time series."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import agrometeo as agm
+
+NUM_STATIONS = 200
+
+
+@pytest.fixture(scope="module")
+def ts_df():
+    # one year of 10-minute data, as yielded by `iter_ts_df` with a list-like variable
+    index = pd.date_range("2022-01-01", "2022-12-31 23:50", freq="10min", name="time")
+    return pd.DataFrame(
+        np.random.default_rng(0).normal(10, 5, (len(index), NUM_STATIONS)),
+        index=index,
+        columns=pd.MultiIndex.from_product(
+            [[f"STATION-{i}" for i in range(NUM_STATIONS)], ["temperature"], ["avg"]],
+            names=["name", "variable", "measurement"],
+        ),
+    )
+
+
+@pytest.fixture(scope="module")
+def memmap_store(ts_df, tmp_path_factory):
+    store = agm.MemmapTSStore(tmp_path_factory.mktemp("memmap"))
+    store.write(ts_df)
+    return store
+
+
+@pytest.fixture(scope="module")
+def parquet_store(ts_df, tmp_path_factory):
+    store = agm.ParquetTSStore(tmp_path_factory.mktemp("parquet"))
+    store.write(ts_df)
+    return store
+
+
+def test_memmap_read(benchmark, memmap_store, ts_df):
+    stored_ts_df = benchmark(memmap_store.read, "temperature", "avg")
+    assert stored_ts_df.shape == (len(ts_df.index), NUM_STATIONS)
+
+
+def test_memmap_read_timestamp(benchmark, memmap_store):
+    # e.g., the values plotted by `plot_temperature_map`
+    benchmark(
+        lambda: memmap_store.read("temperature", "avg").loc["2022-06-01 12:00"].mean()
+    )
+
+
+def test_parquet_read(benchmark, parquet_store, ts_df):
+    long_ts_df = benchmark(parquet_store.read, "temperature", "avg")
+    assert len(long_ts_df) == ts_df.size
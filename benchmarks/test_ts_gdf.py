@@ -0,0 +1,66 @@
+"""Benchmarks of the construction of time series geo-data frames."""
+import tracemalloc
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from shapely import geometry
+
+import agrometeo as agm
+
+
+def _get_ts_gdf_transpose(agm_ds, ts_df):
+    # reference implementation transposing the data frame with the stations' geometry,
+    # then sorting the timestamp columns
+    stations_index = ts_df.columns.get_level_values(0)
+    ts_gdf = gpd.GeoDataFrame(
+        ts_df.T,
+        geometry=agm_ds.stations_gdf.set_index(stations_index.name)
+        .loc[stations_index, "geometry"]
+        .values,
+        crs=agm_ds.stations_gdf.crs,
+    )
+    ts_columns = ts_gdf.columns.drop("geometry")
+    return ts_gdf[sorted(ts_columns) + ["geometry"]]
+
+
+@pytest.fixture
+def agm_ds(mock_api):
+    return agm.AgrometeoDataset(
+        region=gpd.GeoDataFrame(
+            geometry=[geometry.box(5.9, 45.8, 10.5, 47.9)], crs=agm.core.LONLAT_CRS
+        )
+    )
+
+
+@pytest.fixture
+def ts_df(agm_ds):
+    # one year of 10-minute data
+    index = pd.date_range("2022-01-01", "2022-12-31 23:50", freq="10min", name="time")
+    stations = agm_ds.stations_gdf[agm.settings.DEFAULT_STATIONS_ID_COL]
+    return pd.DataFrame(
+        np.random.default_rng(0).normal(10, 5, (len(index), len(stations))),
+        index=index,
+        columns=pd.Index(stations, name=stations.name),
+    )
+
+
+def _benchmark_memory(benchmark, func, *args):
+    # record the peak memory allocated by a call (in MB)
+    tracemalloc.start()
+    func(*args)
+    benchmark.extra_info["peak_memory_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return benchmark(func, *args)
+
+
+def test_get_ts_gdf(benchmark, agm_ds, ts_df):
+    ts_gdf = _benchmark_memory(benchmark, agm_ds._get_ts_gdf, ts_df)
+    pd.testing.assert_frame_equal(
+        ts_gdf, _get_ts_gdf_transpose(agm_ds, ts_df), check_column_type=False
+    )
+
+
+def test_get_ts_gdf_transpose(benchmark, agm_ds, ts_df):
+    _benchmark_memory(benchmark, _get_ts_gdf_transpose, agm_ds, ts_df)
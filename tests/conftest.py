@@ -0,0 +1,34 @@
+"""Fixtures for the `agrometeo` tests."""
+import pytest
+
+from benchmarks.mock_server import MockAPIServer
+
+NUM_STATIONS = 3
+VARIABLES_DATA = [
+    {"id": 1, "name": {"en": "Temperature 2m above ground "}},
+    {"id": 6, "name": {"en": "Precipitation"}},
+]
+
+
+def make_stations_data(num_stations):
+    """Generate a `stations` payload with stations along a diagonal near Lausanne."""
+    return [
+        {
+            "id": station_id,
+            "name": f"STATION-{station_id}",
+            "long_dec": str(6.6 + 0.01 * station_id),
+            "lat_dec": str(46.5 + 0.01 * station_id),
+            "lon_ch": str(540000 + 1000 * station_id),
+            "lat_ch": str(150000 + 1000 * station_id),
+        }
+        for station_id in range(1, num_stations + 1)
+    ]
+
+
+@pytest.fixture
+def mock_api(monkeypatch):
+    with MockAPIServer(
+        stations_data=make_stations_data(NUM_STATIONS), variables_data=VARIABLES_DATA
+    ) as mock_api:
+        mock_api.patch(monkeypatch)
+        yield mock_api
@@ -1,10 +1,25 @@
 #!/usr/bin/env python
 """Tests for `agrometeo` package."""
 # pylint: disable=redefined-outer-name
+import asyncio
+import json
+import logging
+import os
+import threading
+import types
+from urllib import parse
+
+import geopandas as gpd
 import numpy as np
+import pandas as pd
+import pytest
+import requests
+from shapely import geometry
 
 import agrometeo as agm
 
+from .conftest import NUM_STATIONS, make_stations_data
+
 
 def test_agrometeo():
     # test core functions
@@ -52,3 +67,1356 @@ def test_agrometeo():
     # test other args
     agm.plot_temperature_map(ts_gdf, add_basemap=False, plot_kws={"cmap": "Spectral"})
     agm.plot_temperature_map(ts_gdf, add_basemap=False, append_axes_kws={"pad": 0.4})
+
+
+@pytest.fixture
+def region():
+    return gpd.GeoDataFrame(geometry=[geometry.box(6, 46, 7, 47)], crs="epsg:4326")
+
+
+def test_chunked_fetch(mock_api, region):
+    agm_ds = agm.AgrometeoDataset(region=region)
+    start_date = "2022-03-01"
+    end_date = "2022-03-09"
+    ts_df = agm_ds.get_ts_df("temperature", start_date, end_date, chunk_freq="3D")
+    # the period is split into windows which are then stitched together
+    assert len(mock_api.data_requests) == 3
+    assert ts_df.index.is_unique and ts_df.index.is_monotonic_increasing
+    assert ts_df.index[0] == pd.Timestamp(start_date)
+    # the end date is inclusive, i.e., its whole day is returned
+    assert ts_df.index[-1] == pd.Timestamp("2022-03-09 23:50")
+    assert len(ts_df.columns) == NUM_STATIONS
+    # the result does not depend on the window length nor the number of workers
+    pd.testing.assert_frame_equal(
+        ts_df,
+        agm_ds.get_ts_df(
+            "temperature", start_date, end_date, chunk_freq="30D", max_workers=1
+        ),
+    )
+    # windows shorter than a day are rounded to whole days, without overlaps, and
+    # windows longer than the requested period result in a single request
+    for chunk_freq, expected_windows in [
+        (
+            "18h",
+            [("2022-03-01", "2022-03-01"), ("2022-03-02", "2022-03-03")],
+        ),
+        ("30D", [("2022-03-01", "2022-03-03")]),
+    ]:
+        assert (
+            agm.core._get_date_windows("2022-03-01", "2022-03-03", chunk_freq)
+            == expected_windows
+        )
+    mock_api.requests.clear()
+    pd.testing.assert_frame_equal(
+        ts_df, agm_ds.get_ts_df("temperature", start_date, end_date, chunk_freq="6h")
+    )
+    assert len(mock_api.data_requests) == 9
+    # failed windows are retried individually
+    mock_api.requests.clear()
+    mock_api.num_failures = 2
+    pd.testing.assert_frame_equal(
+        ts_df,
+        agm_ds.get_ts_df("temperature", start_date, end_date, chunk_freq="3D"),
+    )
+    assert len(mock_api.data_requests) == 5
+    # ...until the maximum number of retries is exhausted
+    mock_api.num_failures = 10
+    with pytest.raises(requests.HTTPError):
+        agm_ds.get_ts_df(
+            "temperature", start_date, end_date, chunk_freq="3D", num_retries=1
+        )
+
+
+def test_stations_batches(mock_api, region, monkeypatch):
+    # batches are limited both by the number of stations and the url length
+    stations_ids = [str(i) for i in range(1, 12)]
+    for max_stations, max_url_length, expected_lens in [
+        (4, 1000, [4, 4, 3]),
+        (100, 19, [3, 3, 3, 2]),
+    ]:
+        stations_batches = agm.core._get_stations_batches(
+            stations_ids, max_stations, max_url_length, 10
+        )
+        assert [len(batch) for batch in stations_batches] == expected_lens
+        assert sum(stations_batches, []) == stations_ids
+
+    # the batches are merged column-wise into the same data frame
+    agm_ds = agm.AgrometeoDataset(region=region)
+    start_date = "2022-03-01"
+    end_date = "2022-03-03"
+    ts_df = agm_ds.get_ts_df("temperature", start_date, end_date)
+    monkeypatch.setattr(agm.settings, "MAX_STATIONS_PER_REQUEST", 2)
+    mock_api.requests.clear()
+    pd.testing.assert_frame_equal(
+        ts_df, agm_ds.get_ts_df("temperature", start_date, end_date)
+    )
+    assert len(mock_api.data_requests) == 2
+
+
+def test_ts_cache(mock_api, region, tmp_path, monkeypatch):
+    agm_ds = agm.AgrometeoDataset(region=region, ts_cache=tmp_path)
+    start_date = "2022-03-01"
+    end_date = "2022-03-04"
+    ts_df = agm_ds.get_ts_df("temperature", start_date, end_date)
+    assert (
+        ts_df.index.normalize()
+        .unique()
+        .equals(pd.date_range(start_date, end_date, freq="D", name=ts_df.index.name))
+    )
+    # the cache does not change the returned period, nor the requested one
+    mock_api.requests.clear()
+    pd.testing.assert_frame_equal(
+        ts_df,
+        agm.AgrometeoDataset(region=region).get_ts_df(
+            "temperature", start_date, end_date
+        ),
+    )
+    assert f"to={end_date}" in mock_api.data_requests[0]
+    # repeated queries are served from the cache
+    mock_api.requests.clear()
+    pd.testing.assert_frame_equal(
+        ts_df, agm_ds.get_ts_df("temperature", start_date, end_date)
+    )
+    assert len(mock_api.data_requests) == 0
+    # partially overlapping queries only fetch the missing days
+    ts_df = agm_ds.get_ts_df("temperature", start_date, "2022-03-06")
+    assert len(mock_api.data_requests) == 1
+    assert "from=2022-03-05" in mock_api.data_requests[0]
+    assert "to=2022-03-06" in mock_api.data_requests[0]
+    assert ts_df.index.normalize().nunique() == 6
+    # recent days (here, the last two) are always re-fetched
+    mock_api.requests.clear()
+    agm_ds.ts_cache.recent_timedelta = pd.Timestamp.now() - pd.Timestamp("2022-03-03")
+    agm_ds.get_ts_df("temperature", start_date, end_date)
+    assert len(mock_api.data_requests) == 1
+    assert "from=2022-03-03" in mock_api.data_requests[0]
+    # size-based eviction
+    cache_size = agm_ds.ts_cache.size
+    assert cache_size > 0
+    agm_ds.ts_cache.evict(cache_size / 2)
+    assert 0 < agm_ds.ts_cache.size <= cache_size / 2
+    agm_ds.ts_cache.clear()
+    assert agm_ds.ts_cache.size == 0
+
+    # with `max_size`, the cache files are only scanned on the first write and when
+    # the size is exceeded, in which case the cache is evicted below the maximum
+    day_ts_df = ts_df[ts_df.index.normalize() == start_date]
+    days = pd.date_range(start_date, periods=30, freq="D")
+    ts_cache = agm.TSCache(tmp_path / "bounded")
+    ts_cache.put_ts_df(day_ts_df, 1, "avg", "none", days[:1], day_ts_df.columns)
+    day_size = ts_cache.size
+    ts_cache = agm.TSCache(tmp_path / "bounded", max_size=10 * day_size)
+    scans = []
+    get_filepaths = ts_cache._get_filepaths
+    monkeypatch.setattr(
+        ts_cache, "_get_filepaths", lambda: scans.append(None) or get_filepaths()
+    )
+    for day in days:
+        ts_cache.put_ts_df(
+            day_ts_df.set_axis(day_ts_df.index - day_ts_df.index[0] + day),
+            1,
+            "avg",
+            "none",
+            [day],
+            day_ts_df.columns,
+        )
+        assert ts_cache._size <= 10 * day_size
+    assert len(scans) < len(days) / 2
+    assert ts_cache.size <= 10 * day_size
+
+
+def test_catalogue_cache(mock_api, region, tmp_path):
+    # the catalogues are shared across datasets
+    for _ in range(3):
+        agm_ds = agm.AgrometeoDataset(region=region)
+        agm_ds.stations_gdf
+        agm_ds.variables_df
+    assert len(mock_api.catalogue_requests) == 2
+    # the catalogues can also be shared through disk (e.g., across processes), and
+    # expired catalogues are revalidated with conditional requests
+    mock_api.requests.clear()
+    recorder = agm.EventRecorder()
+    with agm.hooks(recorder):
+        for ttl in ["1D", "1D", "0s"]:
+            catalogue_cache = agm.CatalogueCache(cache_dir=tmp_path, ttl=ttl)
+            agm_ds = agm.AgrometeoDataset(
+                region=region, catalogue_cache=catalogue_cache
+            )
+            assert len(agm_ds.stations_gdf) == NUM_STATIONS
+    assert len(mock_api.catalogue_requests) == 2
+    spans_df = recorder.get_spans_df()
+    assert spans_df.loc[spans_df["name"] == "http", "status_code"].tolist() == [
+        200,
+        304,
+    ]
+    # the server honors both validators
+    response = requests.get(agm.core.STATIONS_API_ENDPOINT)
+    for headers in [
+        {"If-None-Match": response.headers["ETag"]},
+        {"If-Modified-Since": response.headers["Last-Modified"]},
+    ]:
+        assert (
+            requests.get(agm.core.STATIONS_API_ENDPOINT, headers=headers).status_code
+            == 304
+        )
+    assert (
+        requests.get(
+            agm.core.STATIONS_API_ENDPOINT, headers={"If-None-Match": '"other"'}
+        ).status_code
+        == 200
+    )
+    catalogue_cache.clear()
+    assert len(list(tmp_path.iterdir())) == 0
+
+
+def test_parse_data():
+    # values can be numeric strings, numbers or missing, and unexpected keys are split
+    # into station id, variable code and measurement
+    content = json.dumps(
+        {
+            "data": [
+                {"date": "2022-03-22 00:10:00", "1_1_avg": "3.2", "12_1_avg": 4},
+                {"date": "2022-03-22 00:00:00", "1_1_avg": None, "12_1_avg": "-"},
+            ]
+        }
+    ).encode()
+    ts_df = agm.core._parse_data(content, [(1, "avg")], ["1"], "time", "float64")
+    assert list(ts_df.columns) == [("1", 1, "avg"), ("12", 1, "avg")]
+    assert ts_df.index.name == "time"
+    assert ts_df.dtypes.eq(np.float64).all()
+    assert ts_df.isna().sum().sum() == 2
+    assert ts_df.iloc[0].tolist() == [3.2, 4.0]
+
+
+def test_multi_sensor(mock_api, region, tmp_path):
+    start_date = "2022-03-01"
+    end_date = "2022-03-03"
+    variables = ["temperature", "Precipitation"]
+    measurements = ["min", "max"]
+    for ts_cache in [None, tmp_path]:
+        agm_ds = agm.AgrometeoDataset(region=region, ts_cache=ts_cache)
+        mock_api.requests.clear()
+        ts_df = agm_ds.get_ts_df(
+            variables, start_date, end_date, scale="hour", measurement=measurements
+        )
+        # all the variables and measurements are requested at once
+        assert len(mock_api.data_requests) == 1
+        assert ts_df.columns.names == [
+            agm.settings.DEFAULT_STATIONS_ID_COL,
+            agm.settings.VARIABLE_NAME,
+            agm.settings.MEASUREMENT_NAME,
+        ]
+        assert len(ts_df.columns) == NUM_STATIONS * 4
+        assert set(ts_df.columns.get_level_values(1)) == set(variables)
+        # the multi-sensor data matches the single-sensor data
+        pd.testing.assert_frame_equal(
+            ts_df.xs(("temperature", "max"), level=[1, 2], axis=1),
+            agm_ds.get_ts_df(
+                "temperature", start_date, end_date, scale="hour", measurement="max"
+            ),
+        )
+        ts_gdf = agm_ds.get_ts_gdf(variables, start_date, end_date, scale="hour")
+        assert len(ts_gdf) == NUM_STATIONS * 2
+        assert ts_gdf["geometry"].isna().sum() == 0
+
+
+def test_iter_ts_df(mock_api, region):
+    agm_ds = agm.AgrometeoDataset(region=region)
+    start_date = "2022-03-01"
+    end_date = "2022-03-09"
+    ts_dfs = list(
+        agm_ds.iter_ts_df("temperature", start_date, end_date, chunk_freq="3D")
+    )
+    # a data frame is yielded for each window, without overlapping timestamps
+    assert len(ts_dfs) == 3
+    for prev_ts_df, ts_df in zip(ts_dfs[:-1], ts_dfs[1:]):
+        assert prev_ts_df.index[-1] < ts_df.index[0]
+    pd.testing.assert_frame_equal(
+        pd.concat(ts_dfs),
+        agm_ds.get_ts_df("temperature", start_date, end_date, chunk_freq="3D"),
+    )
+
+
+def test_long_format(mock_api, region):
+    agm_ds = agm.AgrometeoDataset(region=region)
+    start_date = "2022-03-01"
+    end_date = "2022-03-10"
+    for variable, measurement in [("temperature", None), (["temperature"], ["avg"])]:
+        ts_df = agm_ds.get_ts_df(
+            variable, start_date, end_date, measurement=measurement, chunk_freq="3D"
+        )
+        long_ts_df = agm_ds.get_ts_df(
+            variable,
+            start_date,
+            end_date,
+            measurement=measurement,
+            chunk_freq="3D",
+            long_format=True,
+        )
+        assert len(long_ts_df) == ts_df.size
+        assert long_ts_df[agm_ds.stations_id_name].dtype == "category"
+        # the long data frame matches the (melted) wide data frame
+        if ts_df.columns.nlevels == 1:
+            long_index = [agm_ds.time_name, agm_ds.stations_id_name]
+        else:
+            long_index = [
+                agm_ds.time_name,
+                agm_ds.stations_id_name,
+                agm.settings.VARIABLE_NAME,
+                agm.settings.MEASUREMENT_NAME,
+            ]
+        pd.testing.assert_series_equal(
+            long_ts_df.astype({level: object for level in long_index[1:]})
+            .set_index(long_index)[agm.settings.VALUE_NAME]
+            .sort_index(),
+            ts_df.rename_axis(index=long_index[0], columns=long_index[1:])
+            .melt(ignore_index=False, value_name=agm.settings.VALUE_NAME)
+            .reset_index()
+            .set_index(long_index)[agm.settings.VALUE_NAME]
+            .sort_index(),
+            check_names=False,
+            check_index_type=False,
+        )
+
+
+def test_dtype(mock_api, region, tmp_path):
+    agm_ds = agm.AgrometeoDataset(region=region)
+    start_date = "2022-03-01"
+    end_date = "2022-03-03"
+    ts_df = agm_ds.get_ts_df("temperature", start_date, end_date)
+    assert (ts_df.dtypes == "float64").all()
+    for dtype in ["float32", "Float32"]:
+        _ts_df = agm_ds.get_ts_df("temperature", start_date, end_date, dtype=dtype)
+        assert (_ts_df.dtypes == dtype).all()
+        pd.testing.assert_frame_equal(_ts_df.astype("float64"), ts_df)
+        long_ts_df = agm_ds.get_ts_df(
+            "temperature", start_date, end_date, long_format=True, dtype=dtype
+        )
+        assert long_ts_df[agm.settings.VALUE_NAME].dtype == dtype
+        ts_gdf = agm_ds.get_ts_gdf("temperature", start_date, end_date, dtype=dtype)
+        assert (ts_gdf.drop(columns="geometry").dtypes == dtype).all()
+    # the cache stores the data at full precision regardless of the dtype
+    agm_ds = agm.AgrometeoDataset(region=region, ts_cache=tmp_path)
+    _ts_df = agm_ds.get_ts_df("temperature", start_date, end_date, dtype="float32")
+    assert (_ts_df.dtypes == "float32").all()
+    cached_ts_df = agm_ds.get_ts_df("temperature", start_date, end_date)
+    assert (cached_ts_df.dtypes == "float64").all()
+    pd.testing.assert_frame_equal(cached_ts_df.loc[ts_df.index], ts_df)
+
+    # missing values in long format
+    ts_df = ts_df.iloc[:3].astype("Float32")
+    ts_df.iloc[0, 0] = pd.NA
+    for dropna, num_rows in [(False, ts_df.size), (True, ts_df.size - 1)]:
+        long_ts_df = agm.base._long_ts_df(
+            ts_df,
+            agm_ds.stations_id_name,
+            agm_ds.time_name,
+            agm.settings.VALUE_NAME,
+            dropna=dropna,
+        )
+        assert len(long_ts_df) == num_rows
+        assert long_ts_df[agm.settings.VALUE_NAME].dtype == "Float32"
+        assert long_ts_df[agm.settings.VALUE_NAME].isna().sum() == (not dropna)
+
+
+def test_client(mock_api, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(agm.core.time, "sleep", sleeps.append)
+    url = agm.core.STATIONS_API_ENDPOINT
+    client = agm.core.get_client()
+    assert agm.core.get_client() is client
+
+    # retry with exponential backoff on transient failures
+    data_url = agm.core._get_request_url(
+        [(1, "avg")], "2022-03-01", "2022-03-01", "none", ["1"]
+    )
+    monkeypatch.setattr(agm.core, "RETRY_BACKOFF_FACTOR", 1)
+    mock_api.num_failures = 2
+    assert client.get(data_url).status_code == 200
+    assert sleeps == [1, 2]
+    # the last response is returned when the retries are exhausted
+    mock_api.num_failures = 2
+    assert client.get(data_url, num_retries=1).status_code == 503
+    # other client errors are not retried
+    sleeps.clear()
+    mock_api.error_rate = 1
+    mock_api.error_status_code = 404
+    assert client.get(url).status_code == 404
+    assert sleeps == []
+    mock_api.error_rate = 0
+
+    # honor the "Retry-After" header
+    def _get_response(status_code, headers):
+        return agm.core._get_response(url, status_code, None, headers, b"{}")
+
+    responses = [_get_response(429, {"Retry-After": "7"}), _get_response(200, {})]
+    with monkeypatch.context() as m:
+        m.setattr(
+            agm.core.requests.Session,
+            "get",
+            lambda session, url, **kwargs: responses.pop(0),
+        )
+        assert client.get(url).status_code == 200
+    assert sleeps == [7]
+
+    # connection errors are retried too
+    def _raise(session, url, **kwargs):
+        raise requests.ConnectionError
+
+    sleeps.clear()
+    with monkeypatch.context() as m:
+        m.setattr(agm.core.requests.Session, "get", _raise)
+        with pytest.raises(requests.ConnectionError):
+            client.get(url, num_retries=2)
+    assert len(sleeps) == 2
+
+    # rate limiting: after the initial burst, requests are spaced by 1 / rate
+    sleeps.clear()
+    client = agm.core.APIClient(rate_limit=10, rate_limit_burst=2)
+    for _ in range(4):
+        client.get(url)
+    assert len(sleeps) == 2
+    assert all(0 < sleep <= 0.2 for sleep in sleeps)
+
+
+def test_async(mock_api, region, tmp_path, monkeypatch):
+    start_date = "2022-03-01"
+    end_date = "2022-03-09"
+    for ts_cache in [None, tmp_path]:
+        agm_ds = agm.AgrometeoDataset(region=region, ts_cache=ts_cache)
+        ts_df = agm_ds.get_ts_df("temperature", start_date, end_date, chunk_freq="3D")
+        ts_gdf = agm_ds.get_ts_gdf("temperature", start_date, end_date)
+        long_ts_df = agm_ds.get_ts_df(
+            ["temperature"], start_date, end_date, long_format=True
+        )
+
+        async def _main():
+            async with agm.AsyncAPIClient() as async_client:
+                agm_ds = agm.AgrometeoDataset(
+                    region=region, ts_cache=ts_cache, async_client=async_client
+                )
+                # concurrent queries on the same dataset
+                return await asyncio.gather(
+                    agm_ds.aget_ts_df(
+                        "temperature", start_date, end_date, chunk_freq="3D"
+                    ),
+                    agm_ds.aget_ts_df(
+                        ["temperature"], start_date, end_date, long_format=True
+                    ),
+                    agm_ds.aget_ts_gdf("temperature", start_date, end_date),
+                )
+
+        mock_api.requests.clear()
+        async_ts_df, async_long_ts_df, async_ts_gdf = asyncio.run(_main())
+        pd.testing.assert_frame_equal(async_ts_df, ts_df)
+        assert len(async_long_ts_df) == ts_df.size
+        # the long data frames have the same categorical dtypes
+        pd.testing.assert_series_equal(async_long_ts_df.dtypes, long_ts_df.dtypes)
+        pd.testing.assert_frame_equal(async_long_ts_df, long_ts_df)
+        pd.testing.assert_frame_equal(async_ts_gdf, ts_gdf)
+        if ts_cache is None:
+            # 3 windows plus one for each of the other two queries
+            assert len(mock_api.data_requests) == 5
+        else:
+            # all the data is cached
+            assert len(mock_api.data_requests) == 0
+
+    # retries
+    async def _get_ts_df(num_failures, num_retries):
+        mock_api.num_failures = num_failures
+        agm_ds = agm.AgrometeoDataset(region=region)
+        return await agm_ds.aget_ts_df(
+            "temperature", start_date, end_date, num_retries=num_retries
+        )
+
+    pd.testing.assert_frame_equal(
+        asyncio.run(_get_ts_df(2, 2)),
+        agm.AgrometeoDataset(region=region).get_ts_df(
+            "temperature", start_date, end_date
+        ),
+    )
+    with pytest.raises(requests.HTTPError):
+        asyncio.run(_get_ts_df(2, 1))
+
+    # without its own async client, a dataset uses a new client for each call, which
+    # is closed at its end, so that it can be used across event loops
+    request = agm.AsyncAPIClient._request
+    close = agm.AsyncAPIClient.close
+    request_clients = []
+    closed_clients = []
+
+    async def _request(client, url, headers):
+        request_clients.append(client)
+        return await request(client, url, headers)
+
+    async def _close(client):
+        closed_clients.append(client)
+        await close(client)
+
+    monkeypatch.setattr(agm.AsyncAPIClient, "_request", _request)
+    monkeypatch.setattr(agm.AsyncAPIClient, "close", _close)
+    agm_ds = agm.AgrometeoDataset(region=region)
+    for _ in range(2):
+        asyncio.run(agm_ds.aget_ts_df("temperature", start_date, end_date))
+    call_clients = list(dict.fromkeys(request_clients))
+    assert len(call_clients) == 2
+    assert closed_clients == call_clients
+    assert agm_ds.async_client is None
+
+
+def test_regions(mock_api):
+    # two overlapping regions that share a station and a region without stations
+    regions = gpd.GeoDataFrame(
+        {"name": ["a", "b", "c"]},
+        geometry=[
+            geometry.box(6.605, 46.505, 6.625, 46.525),
+            geometry.box(6.615, 46.515, 6.635, 46.535),
+            geometry.box(7, 47, 7.1, 47.1),
+        ],
+        crs="epsg:4326",
+    )
+    agm_ds = agm.AgrometeoDataset(region=regions)
+    # the region columns do not clash with the stations' ones
+    assert "name" in agm_ds.stations_gdf
+    assert len(agm_ds.stations_gdf) == 4
+    start_date = "2022-03-01"
+    end_date = "2022-03-03"
+    regions_ts_dfs = agm_ds.get_regions_ts_df(
+        "temperature", start_date, end_date, regions_id_col="name"
+    )
+    # each station is fetched once
+    assert len(mock_api.data_requests) == 1
+    assert parse.parse_qs(parse.urlparse(mock_api.data_requests[0]).query)[
+        "stations"
+    ] == ["1,2,3"]
+    assert list(regions_ts_dfs) == ["a", "b", "c"]
+    assert list(regions_ts_dfs["a"].columns) == ["STATION-1", "STATION-2"]
+    assert list(regions_ts_dfs["b"].columns) == ["STATION-2", "STATION-3"]
+    assert regions_ts_dfs["c"].shape[1] == 0
+    ts_df = agm_ds.get_ts_df("temperature", start_date, end_date)
+    pd.testing.assert_frame_equal(regions_ts_dfs["a"], ts_df.iloc[:, :2])
+    # the geometry of shared stations is not duplicated
+    assert len(agm_ds.get_ts_gdf("temperature", start_date, end_date)) == 3
+
+    # long format, identifying the regions by the index
+    regions_ts_dfs = agm_ds.get_regions_ts_df(
+        "temperature", start_date, end_date, long_format=True
+    )
+    assert list(regions_ts_dfs) == [0, 1, 2]
+    assert set(regions_ts_dfs[1][agm_ds.stations_id_name]) == {
+        "STATION-2",
+        "STATION-3",
+    }
+    assert len(regions_ts_dfs[1]) == 2 * len(ts_df)
+    assert len(regions_ts_dfs[2]) == 0
+
+
+def test_station_queries(mock_api, region):
+    mock_api.stations_data = make_stations_data(10)
+    # the stations are selected with the spatial index of the catalogue, which is
+    # shared by datasets with the same CRS
+    regions = gpd.GeoDataFrame(
+        geometry=[
+            geometry.box(6.605, 46.505, 6.645, 46.545),
+            geometry.box(6.625, 46.525, 6.665, 46.565),
+        ],
+        crs="epsg:4326",
+    )
+    for sjoin_kws in [{}, {"predicate": "intersects"}, {"rsuffix": "region"}]:
+        agm_ds = agm.AgrometeoDataset(region=regions, sjoin_kws=sjoin_kws)
+        catalogue_gdf = agm.core._get_catalogue_stations_gdf(
+            agm_ds.catalogue_cache.get_data(
+                agm.core.STATIONS_API_ENDPOINT, get_func=agm_ds.client.get
+            ),
+            agm_ds.crs,
+        )
+        pd.testing.assert_frame_equal(
+            agm_ds.stations_gdf,
+            catalogue_gdf.sjoin(regions, **sjoin_kws),
+        )
+    assert (
+        agm.core._get_catalogue_stations_gdf(
+            agm_ds.catalogue_cache.get_data(
+                agm.core.STATIONS_API_ENDPOINT, get_func=agm_ds.client.get
+            ),
+            agm_ds.crs,
+        )
+        is catalogue_gdf
+    )
+
+    # nearest and within distance queries (in meters)
+    agm_ds = agm.AgrometeoDataset(region=region, crs=agm.core.LV03_CRS)
+    geoms = gpd.GeoSeries(
+        [geometry.Point(541100, 151000), geometry.Point(549000, 159000)],
+        index=["a", "b"],
+        crs=agm.core.LV03_CRS,
+    )
+    nearest_gdf = agm_ds.get_nearest_stations(geoms)
+    assert list(nearest_gdf.index) == ["a", "b"]
+    assert list(nearest_gdf["name"]) == ["STATION-1", "STATION-9"]
+    assert list(nearest_gdf[agm.settings.DISTANCE_NAME]) == [100, 0]
+    nearest_gdf = agm_ds.get_nearest_stations(geoms, k=3)
+    assert list(nearest_gdf.index) == ["a"] * 3 + ["b"] * 3
+    assert list(nearest_gdf.loc["a", "name"]) == [
+        "STATION-1",
+        "STATION-2",
+        "STATION-3",
+    ]
+    assert nearest_gdf.loc["b", agm.settings.DISTANCE_NAME].is_monotonic_increasing
+    pd.testing.assert_frame_equal(
+        agm_ds.get_nearest_stations(geoms, k=3, max_distance=1500),
+        nearest_gdf[nearest_gdf[agm.settings.DISTANCE_NAME] <= 1500],
+    )
+    within_gdf = agm_ds.get_stations_within_distance(geoms, 1500)
+    pd.testing.assert_frame_equal(
+        within_gdf, agm_ds.get_nearest_stations(geoms, k=10, max_distance=1500)
+    )
+    assert list(within_gdf.index) == ["a", "a", "b", "b", "b"]
+    # geometries without CRS are assumed to be in the CRS of the dataset
+    pd.testing.assert_frame_equal(
+        agm_ds.get_stations_within_distance(list(geoms), 1500),
+        within_gdf.rename(index={"a": 0, "b": 1}),
+    )
+
+
+def test_region_cache(mock_api, region, tmp_path, monkeypatch):
+    # geocoded regions
+    geocode_queries = []
+
+    def geocode_to_gdf(query, **kwargs):
+        geocode_queries.append(query)
+        return region
+
+    monkeypatch.setattr(agm.base.ox, "geocode_to_gdf", geocode_to_gdf)
+    cache_dir = tmp_path / "regions"
+    region_cache = agm.RegionCache(cache_dir=cache_dir)
+    for _ in range(2):
+        agm_ds = agm.AgrometeoDataset(region="Pully", region_cache=region_cache)
+        assert agm_ds.region.geom_equals(region.geometry).all()
+    agm.AgrometeoDataset(
+        region="Pully",
+        geocode_to_gdf_kws={"by_osmid": False},
+        region_cache=region_cache,
+    )
+    assert geocode_queries == ["Pully", "Pully"]
+    # the cached regions are persisted across processes (i.e., cache instances)
+    agm.AgrometeoDataset(
+        region="Pully", region_cache=agm.RegionCache(cache_dir=cache_dir)
+    )
+    assert len(geocode_queries) == 2
+    # the regions are stored as GeoParquet (rather than pickles)
+    for filepath in cache_dir.iterdir():
+        assert filepath.suffix == agm.cache.REGION_FILE_EXT
+        assert gpd.read_parquet(filepath).geom_equals(region.geometry).all()
+    # modifying the cached region does not affect the cache
+    agm_ds.region["geometry"] = None
+    assert region_cache.get_region(("query", "Pully", "{}"), None).notna().all().all()
+
+    # region files are cached by path and modification time
+    read_filepaths = []
+    read_file = gpd.read_file
+
+    def _read_file(filepath, *args, **kwargs):
+        read_filepaths.append(filepath)
+        return read_file(filepath, *args, **kwargs)
+
+    monkeypatch.setattr(agm.base.gpd, "read_file", _read_file)
+    region_filepath = tmp_path / "region.gpkg"
+    region.to_file(region_filepath)
+    for _ in range(2):
+        agm.AgrometeoDataset(region=region_filepath, region_cache=region_cache)
+    assert len(read_filepaths) == 1
+    region.to_file(region_filepath)
+    os.utime(region_filepath, ns=(0, 0))
+    agm_ds = agm.AgrometeoDataset(
+        region=str(region_filepath), region_cache=region_cache
+    )
+    assert len(read_filepaths) == 2
+    assert agm_ds.region.geom_equals(region.geometry).all()
+    assert len(geocode_queries) == 2
+
+    region_cache.clear()
+    assert len(list(cache_dir.iterdir())) == 0
+
+    # without a cache directory, the regions are kept in memory
+    region_cache = agm.RegionCache()
+    for _ in range(2):
+        agm.AgrometeoDataset(region="Lausanne", region_cache=region_cache)
+    assert geocode_queries.count("Lausanne") == 1
+    # regions read from disk are also kept in memory
+    region_cache = agm.RegionCache(cache_dir=cache_dir)
+    agm.AgrometeoDataset(region="Lausanne", region_cache=region_cache)
+    read_filepaths = []
+    read_parquet = gpd.read_parquet
+
+    def _read_parquet(filepath, *args, **kwargs):
+        read_filepaths.append(filepath)
+        return read_parquet(filepath, *args, **kwargs)
+
+    monkeypatch.setattr(agm.cache.gpd, "read_parquet", _read_parquet)
+    region_cache = agm.RegionCache(cache_dir=cache_dir)
+    for _ in range(2):
+        agm.AgrometeoDataset(region="Lausanne", region_cache=region_cache)
+    assert len(read_filepaths) == 1
+    assert geocode_queries.count("Lausanne") == 2
+
+
+def test_aggregation():
+    index = pd.date_range("2022-03-01", "2022-03-03 23:50", freq="10min", name="time")
+    ts_df = pd.DataFrame(
+        {
+            "STATION-1": index.hour + index.minute / 60,
+            "STATION-2": np.full(len(index), 12.0),
+        },
+        index=index,
+    )
+    # equivalent to the "day" scale and "avg" measurement of the API
+    agg_ts_df = agm.resample_ts_df(ts_df, "day")
+    assert len(agg_ts_df) == 3
+    assert (agg_ts_df["STATION-2"] == 12).all()
+    pd.testing.assert_frame_equal(agg_ts_df, ts_df.resample("D").mean())
+    # any frequency and statistic, including several of them
+    agg_ts_df = agm.resample_ts_df(ts_df, "3h", stat=["min", "avg", "sum"])
+    assert len(agg_ts_df) == 24
+    assert agg_ts_df.columns.names == [None, agm.settings.STATISTIC_NAME]
+    assert list(agg_ts_df.columns.get_level_values(1).unique()) == [
+        "min",
+        "avg",
+        "sum",
+    ]
+    assert (agg_ts_df[("STATION-2", "sum")] == 12 * 18).all()
+    # windows with too few measurements are missing
+    _ts_df = ts_df.copy()
+    _ts_df.iloc[:3, 0] = np.nan
+    for stat in ["max", ["max", "min"]]:
+        agg_ts_df = agm.resample_ts_df(_ts_df, "hour", stat=stat, min_count=4)
+        assert agg_ts_df.iloc[0].isna().tolist() == [True] * (
+            len(agg_ts_df.columns) // 2
+        ) + [False] * (len(agg_ts_df.columns) // 2)
+        assert agg_ts_df.columns.get_level_values(0)[0] == "STATION-1"
+        assert agg_ts_df.iloc[1:].notna().all().all()
+
+    # degree days
+    degree_days_df = agm.get_degree_days(ts_df, 10)
+    # (0 + 23.83) / 2 - 10 for the first station
+    np.testing.assert_allclose(degree_days_df["STATION-1"], (23 + 5 / 6) / 2 - 10)
+    np.testing.assert_allclose(degree_days_df["STATION-2"], 2)
+    degree_days_df = agm.get_degree_days(
+        ts_df, 10, upper_temperature=11, method="integral", cumulative=True
+    )
+    np.testing.assert_allclose(degree_days_df["STATION-2"], [1, 2, 3])
+    with pytest.raises(ValueError):
+        agm.get_degree_days(ts_df, 10, method="foo")
+
+
+def test_interpolation(mock_api, region, monkeypatch, caplog):
+    agm_ds = agm.AgrometeoDataset(region=region, crs=agm.core.LV03_CRS)
+    ts_gdf = agm_ds.get_ts_gdf("temperature", "2022-03-01", "2022-03-02")
+    ts_gdf.iloc[0, 1] = np.nan
+    num_times = len(ts_gdf.columns) - 1
+    xs, ys = agm.get_grid_coords(ts_gdf.total_bounds, 500)
+    assert len(xs) == len(ys) == 4
+    assert ys[0] > ys[-1]
+    for method in ["idw", "kriging"]:
+        interpolated = agm.interpolate_ts_gdf(ts_gdf, (xs, ys), method=method)
+        assert interpolated.shape == (num_times, len(ys), len(xs))
+        assert not np.isnan(interpolated).any()
+        # the interpolated values are within the range of the station values
+        values = ts_gdf.drop(columns="geometry").to_numpy()
+        assert (interpolated.min(axis=(1, 2)) >= np.nanmin(values, axis=0) - 1e-9).all()
+        # the values at the station locations are preserved
+        at_stations = agm.interpolate_ts_gdf(
+            ts_gdf, ts_gdf.geometry, method=method, as_xarray=True
+        )
+        assert at_stations.dims == ("time", "name")
+        # (the missing value is interpolated from the other stations)
+        valid = ~np.isnan(values)
+        np.testing.assert_allclose(at_stations.values.T[valid], values[valid])
+        assert not np.isnan(at_stations.values.T[~valid]).any()
+        # float32
+        interpolated_32 = agm.interpolate_ts_gdf(
+            ts_gdf, (xs, ys), method=method, dtype="float32"
+        )
+        assert interpolated_32.dtype == "float32"
+        np.testing.assert_allclose(interpolated_32, interpolated, rtol=1e-5)
+
+    # the weights are normalized by the stations with values
+    weights = agm.get_idw_weights(
+        np.array([[0, 0], [2, 0], [4, 0]]), np.array([[1, 0], [3, 0]]), k=2
+    )
+    np.testing.assert_allclose(weights, [[1, 1, 0], [0, 1, 1]])
+    np.testing.assert_allclose(
+        agm.interpolate_values(weights, np.array([[1, np.nan], [3, 3], [5, np.nan]])),
+        [[2, 3], [4, 3]],
+    )
+    # with `k` or `max_distance`, only the weights of the nearest stations are kept
+    # (computed by blocks of target locations), with the same result
+    stations_xy = np.array([[0, 0], [2, 0], [4, 0], [0, 3]])
+    values = np.array([[1, np.nan], [3, 3], [5, 5], [7, np.nan]])
+    stations_gdf = gpd.GeoDataFrame(values, geometry=gpd.points_from_xy(*stations_xy.T))
+    target_xy = np.array([[1, 0], [3, 0], [0, 2], [10, 10]])
+    target = gpd.GeoSeries(gpd.points_from_xy(*target_xy.T))
+    monkeypatch.setattr(agm.interpolation, "NEAREST_BLOCK_SIZE", 8)
+    for weights_kws in [{"k": 2}, {"max_distance": 2.5}, {"k": 1, "max_distance": 3}]:
+        np.testing.assert_allclose(
+            agm.interpolate_ts_gdf(stations_gdf, target, weights_kws=weights_kws),
+            agm.interpolate_values(
+                agm.get_idw_weights(stations_xy, target_xy, **weights_kws), values
+            ).T,
+        )
+    # target locations at a station without value fall back to the other stations
+    interpolated = agm.interpolate_ts_gdf(
+        stations_gdf, gpd.GeoSeries(gpd.points_from_xy([0, 2], [0, 0]))
+    )
+    np.testing.assert_allclose(interpolated[0], [1, 3])
+    np.testing.assert_allclose(
+        interpolated[1, 0],
+        agm.interpolate_values(
+            agm.get_idw_weights(stations_xy[1:], np.array([[0, 0]])), values[1:, 1:]
+        ).item(),
+    )
+    for weights_kws in [{}, {"k": 2}]:
+        np.testing.assert_allclose(
+            agm.interpolate_ts_gdf(
+                stations_gdf,
+                gpd.GeoSeries(gpd.points_from_xy([0], [0])),
+                weights_kws=weights_kws,
+            )[1],
+            3 if weights_kws else interpolated[1, 0],
+        )
+    # distances in a geographic CRS are warned about
+    with caplog.at_level(logging.WARNING):
+        agm.interpolate_ts_gdf(stations_gdf.set_crs("epsg:4326"), target)
+    assert "geographic" in caplog.text
+
+    weights = agm.get_kriging_weights(
+        np.array([[0, 0], [2, 0], [4, 0]]), np.array([[2, 0], [3, 0]])
+    )
+    np.testing.assert_allclose(weights.sum(axis=1), 1)
+    np.testing.assert_allclose(weights[0], [0, 1, 0], atol=1e-12)
+    # kriging weights can be negative, so they are not normalized over the stations
+    # with a value. Instead, the kriging system is solved for such stations
+    stations_xy = np.array([[0, 0], [1, 0], [2, 0], [0, 1]])
+    target_xy = np.array([[0.5, 0.2]])
+    weights = agm.get_kriging_weights(
+        stations_xy, target_xy, variogram_model="gaussian", variogram_range=1
+    )
+    assert weights[0, 2] < 0
+    values = np.array([[1, 1], [2, 2], [3, np.nan], [4, 4]])
+    interpolated = agm.interpolate_values(weights, values)
+    np.testing.assert_allclose(interpolated[:, 0], weights @ values[:, 0])
+    assert np.isnan(interpolated[:, 1]).all()
+    stations_gdf = gpd.GeoDataFrame(values, geometry=gpd.points_from_xy(*stations_xy.T))
+    weights_kws = {"variogram_model": "gaussian", "variogram_range": 1}
+    interpolated = agm.interpolate_ts_gdf(
+        stations_gdf,
+        gpd.GeoSeries(gpd.points_from_xy(*target_xy.T)),
+        method="kriging",
+        weights_kws=weights_kws,
+    )
+    np.testing.assert_allclose(interpolated[0], weights @ values[:, 0])
+    np.testing.assert_allclose(
+        interpolated[1],
+        agm.get_kriging_weights(stations_xy[[0, 1, 3]], target_xy, **weights_kws)
+        @ values[[0, 1, 3], 1],
+    )
+    with pytest.raises(ValueError):
+        agm.interpolate_ts_gdf(ts_gdf, (xs, ys), method="foo")
+    xarr = agm.interpolate_ts_gdf(ts_gdf, (xs, ys), as_xarray=True)
+    assert xarr.dims == ("time", "y", "x")
+    np.testing.assert_array_equal(xarr["x"], xs)
+
+
+def test_save_temperature_maps(mock_api, region, tmp_path):
+    agm_ds = agm.AgrometeoDataset(region=region)
+    ts_gdf = agm_ds.get_ts_gdf("temperature", "2022-03-01", "2022-03-02")
+    ts_gdf.iloc[0, 1] = np.nan
+    dts = ts_gdf.columns.drop("geometry")[:3]
+    for max_workers in [1, 2]:
+        dst_filepaths = agm.save_temperature_maps(
+            ts_gdf,
+            tmp_path / f"frames-{max_workers}-.png",
+            dts=dts,
+            max_workers=max_workers,
+            add_basemap=False,
+        )
+        assert len(dst_filepaths) == len(dts)
+        assert dst_filepaths[0].endswith("-0.png")
+        for dst_filepath in dst_filepaths:
+            assert os.path.exists(dst_filepath)
+    # the same frames are rendered by the workers
+    with open(tmp_path / "frames-1-1.png", "rb") as src1, open(
+        tmp_path / "frames-2-1.png", "rb"
+    ) as src2:
+        assert src1.read() == src2.read()
+    # animation
+    dst_filepaths = agm.save_temperature_maps(
+        ts_gdf, tmp_path / "frames.gif", dts=dts, add_basemap=False, fps=2
+    )
+    assert dst_filepaths == [str(tmp_path / "frames.gif")]
+    assert os.path.getsize(dst_filepaths[0]) > 0
+
+
+def test_basemap_cache(mock_api, region, tmp_path, tmp_path_factory, monkeypatch):
+    tiles_requests = []
+    pid = os.getpid()
+
+    def bounds2img(west, south, east, north, *, zoom, source):
+        # the tiles are never fetched in the workers of `save_temperature_maps`
+        assert os.getpid() == pid
+        tiles_requests.append((west, south, east, north))
+        # snap to a coarse "tile" grid, as contextily does
+        extent = (
+            np.floor(west / 1e4) * 1e4,
+            np.ceil(east / 1e4) * 1e4,
+            np.floor(south / 1e4) * 1e4,
+            np.ceil(north / 1e4) * 1e4,
+        )
+        return np.zeros((4, 4, 3), dtype="uint8"), extent
+
+    def warp_tiles(img, extent, t_crs):
+        west, east, south, north = extent
+        west, south, east, north = (
+            gpd.GeoSeries([geometry.box(west, south, east, north)], crs="epsg:3857")
+            .to_crs(t_crs)
+            .total_bounds
+        )
+        return img, (west, east, south, north)
+
+    local_basemaps = []
+
+    def add_basemap(ax, *, source, **kwargs):
+        local_basemaps.append(source)
+        ax.imshow(np.zeros((4, 4, 3), dtype="uint8"), extent=ax.axis())
+
+    fake_cx = types.SimpleNamespace(
+        providers=types.SimpleNamespace(
+            OpenStreetMap=types.SimpleNamespace(
+                HOT={"url": "https://tiles/{z}/{x}/{y}.png", "attribution": "(C) OSM"}
+            )
+        ),
+        bounds2img=bounds2img,
+        warp_tiles=warp_tiles,
+        add_basemap=add_basemap,
+    )
+    monkeypatch.setattr(agm.plotting, "cx", fake_cx)
+
+    agm_ds = agm.AgrometeoDataset(region=region)
+    ts_gdf = agm_ds.get_ts_gdf("temperature", "2022-03-01", "2022-03-02")
+    basemap_cache = agm.BasemapCache(cache_dir=tmp_path)
+    agm.warm_basemap_cache(agm_ds.region, basemap_cache=basemap_cache)
+    assert len(tiles_requests) == 1
+    # the plots of the stations in the region are served from the cache
+    for attribution in [False, True]:
+        ax = agm.plot_temperature_map(
+            ts_gdf,
+            attribution=attribution,
+            basemap_cache=basemap_cache,
+            add_basemap_kws={"zorder": 0},
+        )
+        assert len(ax.images) == 1
+        assert len(ax.texts) == int(attribution)
+    assert len(tiles_requests) == 1
+    # a different zoom is fetched
+    agm.plot_temperature_map(
+        ts_gdf, basemap_cache=basemap_cache, add_basemap_kws={"zoom": 12}
+    )
+    assert len(tiles_requests) == 2
+    # local raster files are read by contextily
+    local_filepath = tmp_path_factory.mktemp("local") / "basemap.tif"
+    local_filepath.touch()
+    ax = agm.plot_temperature_map(
+        ts_gdf,
+        basemap_cache=basemap_cache,
+        add_basemap_kws={"source": str(local_filepath)},
+    )
+    assert len(ax.images) == 1
+    assert local_basemaps == [str(local_filepath)]
+    assert len(tiles_requests) == 2
+    # the frames rendered by the workers use the basemap fetched in the main process
+    dts = ts_gdf.columns.drop("geometry")[:3]
+    frames_dir = tmp_path_factory.mktemp("frames")
+    for max_workers in [1, 2]:
+        agm.save_temperature_maps(
+            ts_gdf,
+            frames_dir / f"frames-{max_workers}-.png",
+            dts=dts,
+            max_workers=max_workers,
+            basemap_cache=agm.BasemapCache(),
+        )
+    assert len(tiles_requests) == 4
+    with open(frames_dir / "frames-1-1.png", "rb") as src1, open(
+        frames_dir / "frames-2-1.png", "rb"
+    ) as src2:
+        assert src1.read() == src2.read()
+    # the basemaps are persisted, so that they can be used without contextily
+    monkeypatch.setattr(agm.plotting, "cx", None)
+    ax = agm.plot_temperature_map(
+        ts_gdf, basemap_cache=agm.BasemapCache(cache_dir=tmp_path)
+    )
+    assert len(ax.images) == 1
+    # without contextily nor cache, the basemap is not added
+    ax = agm.plot_temperature_map(ts_gdf, basemap_cache=agm.BasemapCache())
+    assert len(ax.images) == 0
+    basemap_cache.clear()
+    assert not os.listdir(tmp_path)
+
+
+def test_storage(mock_api, region, tmp_path, caplog):
+    agm_ds = agm.AgrometeoDataset(region=region)
+    start_date, end_date = "2022-03-01", "2022-03-03"
+    ts_df = agm_ds.get_ts_df("temperature", start_date, end_date)
+
+    # partitioned parquet
+    store = agm.ParquetTSStore(tmp_path / "parquet")
+    # the windows are split into daily partitions
+    agm_ds.export_ts(store, "temperature", start_date, end_date, chunk_freq="18h")
+    filepaths = sorted(
+        os.path.join(dir_path, filename)
+        for dir_path, _, filenames in os.walk(tmp_path / "parquet")
+        for filename in filenames
+    )
+    assert [
+        os.path.relpath(filepath, tmp_path / "parquet") for filepath in filepaths
+    ] == [
+        os.path.join(
+            "variable=temperature",
+            "measurement=avg",
+            f"date=2022-03-0{day}",
+            "part-0.parquet",
+        )
+        for day in range(1, 4)
+    ]
+    long_ts_df = store.read("temperature", "avg")
+    pd.testing.assert_frame_equal(
+        long_ts_df[["time", "station_id", "value"]]
+        .set_index(["time", "station_id"])
+        .sort_index(),
+        ts_df.rename_axis(index="time", columns="station_id")
+        .melt(ignore_index=False)
+        .dropna()
+        .reset_index()
+        .set_index(["time", "station_id"])
+        .sort_index(),
+        check_index_type=False,
+    )
+    assert len(store.read("temperature", "avg", start_date="2022-03-02")) < len(
+        long_ts_df
+    )
+    # writing the same data is idempotent
+    contents = [open(filepath, "rb").read() for filepath in filepaths]
+    agm_ds.export_ts(store, "temperature", start_date, "2022-03-02")
+    assert [open(filepath, "rb").read() for filepath in filepaths] == contents
+    # multiple variables and measurements are partitioned
+    agm_ds.export_ts(
+        store,
+        ["temperature", "precipitation"],
+        start_date,
+        start_date,
+        scale="hour",
+        measurement=["avg", "max"],
+    )
+    assert sorted(os.listdir(tmp_path / "parquet")) == [
+        "variable=precipitation",
+        "variable=temperature",
+    ]
+    assert len(store.read("precipitation", "max")) > 0
+    # the whole store can be read as a single (hive-partitioned) dataset
+    assert set(pd.read_parquet(tmp_path / "parquet")["measurement"]) == {"avg", "max"}
+    with pytest.raises(ValueError):
+        agm_ds.export_ts(store, "temperature", start_date, end_date, long_format=True)
+    with pytest.raises(ValueError):
+        store.write(ts_df)
+
+    # datasets that do not override `iter_ts_df` export the whole data frame at once
+    class WholeTSDataset(agm.base.MeteoStationDataset):
+        CRS = agm_ds.CRS
+        stations_gdf = agm_ds.stations_gdf
+
+        def get_ts_df(self, variable, start_date, end_date, **kwargs):
+            return agm_ds.get_ts_df(variable, start_date, end_date, **kwargs)
+
+        def get_ts_gdf(self, *args, **kwargs):
+            pass
+
+    written_ts_dfs = []
+    WholeTSDataset(region=region).export_ts(
+        types.SimpleNamespace(write=written_ts_dfs.append),
+        "temperature",
+        start_date,
+        end_date,
+    )
+    assert len(written_ts_dfs) == 1
+    assert written_ts_dfs[0].shape == ts_df.shape
+
+    # geoparquet
+    agm_ds.export_stations(tmp_path / "stations.parquet")
+    stations_gdf = gpd.read_parquet(tmp_path / "stations.parquet")
+    assert stations_gdf.geom_equals(agm_ds.stations_gdf.geometry).all()
+    assert stations_gdf.crs == agm_ds.stations_gdf.crs
+
+    # zarr
+    xr = pytest.importorskip("xarray")
+    pytest.importorskip("zarr")
+    store = agm.ZarrTSStore(tmp_path / "ts.zarr")
+    agm_ds.export_ts(store, "temperature", start_date, end_date, chunk_freq="1D")
+    agm_ds.export_ts(store, "temperature", start_date, end_date)
+    ds = xr.open_zarr(tmp_path / "ts.zarr", group="temperature")
+    np.testing.assert_array_equal(ds["avg"].values, ts_df.to_numpy())
+    # measurements that are not stored cannot be appended
+    with pytest.raises(ValueError):
+        agm_ds.export_ts(
+            store, "temperature", "2022-03-04", "2022-03-04", measurement=["max"]
+        )
+    # stations that are not stored are dropped with a warning
+    new_ts_df = agm_ds.get_ts_df(["temperature"], "2022-03-04", "2022-03-04").rename(
+        columns={"STATION-1": "STATION-99"}, level=0
+    )
+    with caplog.at_level(logging.WARNING):
+        store.write(new_ts_df)
+    assert "STATION-99" in caplog.text
+    ds = xr.open_zarr(tmp_path / "ts.zarr", group="temperature")
+    assert list(ds[store.stations_id_name].values) == list(ts_df.columns)
+    assert (
+        ds["avg"]
+        .sel({store.stations_id_name: "STATION-1"})
+        .isnull()
+        .values[-len(new_ts_df) :]
+        .all()
+    )
+
+
+def _is_memmap_view(arr):
+    while arr is not None and not isinstance(arr, np.memmap):
+        arr = arr.base
+    return arr is not None
+
+
+def test_memmap_store(mock_api, region, tmp_path):
+    agm_ds = agm.AgrometeoDataset(region=region)
+    start_date, end_date = "2022-03-01", "2022-03-03"
+    ts_df = agm_ds.get_ts_df("temperature", start_date, end_date)
+
+    store = agm.MemmapTSStore(tmp_path, dtype="float32")
+    agm_ds.export_ts(store, "temperature", start_date, "2022-03-02", chunk_freq="1D")
+    # only the new times are appended
+    agm_ds.export_ts(store, "temperature", start_date, end_date)
+    stored_ts_df = store.read("temperature", "avg")
+    assert stored_ts_df.dtypes.eq("float32").all()
+    pd.testing.assert_frame_equal(
+        stored_ts_df, ts_df.astype("float32"), check_names=False
+    )
+    # the values are a view of the memory map
+    assert _is_memmap_view(stored_ts_df.to_numpy())
+    assert not stored_ts_df.to_numpy().flags.writeable
+    stored_ts_df = store.read(
+        "temperature", "avg", start_date="2022-03-02", end_date="2022-03-02 12:00"
+    )
+    assert stored_ts_df.index[0] == pd.Timestamp("2022-03-02")
+    assert stored_ts_df.index[-1] == pd.Timestamp("2022-03-02 12:00")
+    with pytest.raises(KeyError):
+        store.read("temperature", "max")
+
+    # geo-data frame, which can be plotted
+    ts_gdf = store.read_ts_gdf("temperature", "avg", agm_ds.stations_gdf)
+    expected_ts_gdf = agm_ds.get_ts_gdf("temperature", start_date, end_date)
+    assert ts_gdf.crs == expected_ts_gdf.crs
+    assert ts_gdf.geom_equals(expected_ts_gdf.geometry).all()
+    np.testing.assert_allclose(
+        ts_gdf.drop(columns="geometry").to_numpy(dtype="float64"),
+        expected_ts_gdf.drop(columns="geometry").to_numpy(dtype="float64"),
+        rtol=1e-6,
+    )
+    assert _is_memmap_view(ts_gdf[ts_gdf.columns[0]].to_numpy())
+    agm.plot_temperature_map(ts_gdf, add_basemap=False)
+
+    # an empty first write leaves a readable (empty) store
+    store = agm.MemmapTSStore(tmp_path / "empty")
+    multi_ts_df = agm_ds.get_ts_df(["temperature"], start_date, end_date)
+    store.write(multi_ts_df.iloc[:0])
+    stored_ts_df = store.read("temperature", "avg")
+    assert stored_ts_df.empty
+    assert len(stored_ts_df.columns) == len(multi_ts_df.columns)
+    store.write(multi_ts_df)
+    pd.testing.assert_frame_equal(
+        store.read("temperature", "avg"),
+        multi_ts_df.droplevel([1, 2], axis=1),
+        check_names=False,
+    )
+
+
+def test_ts_sync(mock_api, region, tmp_path):
+    agm_ds = agm.AgrometeoDataset(region=region)
+    state_filepath = tmp_path / "sync.json"
+    ts_sync = agm_ds.get_ts_sync(
+        "temperature", buffer_size=12, state_filepath=state_filepath
+    )
+    # the first poll requests the lookback period
+    ts_df = ts_sync.poll(end_date="2022-03-01 10:00")
+    assert len(mock_api.data_requests) == 1
+    assert ts_df.index[0] == pd.Timestamp("2022-02-28 10:00")
+    assert ts_df.index[-1] == pd.Timestamp("2022-03-01 10:00")
+    pd.testing.assert_frame_equal(
+        ts_df,
+        agm_ds.get_ts_df("temperature", "2022-02-28", "2022-03-02").loc[ts_df.index],
+        check_freq=False,
+    )
+    # the buffer keeps the latest timestamps only
+    pd.testing.assert_frame_equal(ts_sync.buffer, ts_df.iloc[-12:])
+    assert (ts_sync.last_timestamps == pd.Timestamp("2022-03-01 10:00")).all()
+    # the following polls only return the measurements since the last poll
+    mock_api.requests.clear()
+    ts_df = ts_sync.poll(end_date="2022-03-01 11:00")
+    assert len(mock_api.data_requests) == 1
+    assert "from=2022-03-01" in mock_api.data_requests[0]
+    assert len(ts_df) == 6
+    assert ts_df.index[0] == pd.Timestamp("2022-03-01 10:10")
+    pd.testing.assert_frame_equal(ts_sync.buffer.iloc[-6:], ts_df)
+    assert len(ts_sync.buffer) == 12
+    assert ts_sync.buffer.index.is_monotonic_increasing
+    buffer = ts_sync.buffer
+    assert ts_sync.poll(end_date="2022-03-01 11:00").empty
+    pd.testing.assert_frame_equal(ts_sync.buffer, buffer)
+    # the last timestamps are persisted so that the sync can be resumed
+    ts_sync = agm_ds.get_ts_sync("temperature", state_filepath=state_filepath)
+    assert (ts_sync.last_timestamps == pd.Timestamp("2022-03-01 11:00")).all()
+    assert len(ts_sync.poll(end_date="2022-03-01 11:30")) == 3
+    # without end date, the latest measurements are not bounded by the local time,
+    # which can be behind the API's (here, the fake API returns future measurements)
+    ts_sync = agm_ds.get_ts_sync("temperature")
+    mock_api.requests.clear()
+    ts_df = ts_sync.poll()
+    tomorrow = pd.Timestamp.now().normalize() + pd.Timedelta(days=1)
+    assert f"to={tomorrow.strftime('%Y-%m-%d')}" in mock_api.data_requests[0]
+    assert ts_df.index[-1] > pd.Timestamp.now()
+    # multiple sensors are synchronized together
+    ts_sync = agm_ds.get_ts_sync(
+        ["temperature", "precipitation"], state_filepath=state_filepath
+    )
+    ts_df = ts_sync.poll(end_date="2022-03-01 11:30")
+    assert ts_df.columns.nlevels == 3
+    assert ts_df.index[0] == pd.Timestamp("2022-02-28 11:30")
+
+
+def test_instrumentation(mock_api, region, tmp_path, caplog):
+    recorder = agm.EventRecorder()
+    with agm.hooks(recorder):
+        agm_ds = agm.AgrometeoDataset(region=region, ts_cache=tmp_path)
+        ts_df = agm_ds.get_ts_df("temperature", "2022-03-01", "2022-03-02")
+    spans_df = recorder.get_spans_df()
+    # each stage is timed
+    for stage in [
+        "region",
+        "catalogue",
+        "sjoin",
+        "ts_cache",
+        "fetch",
+        "http",
+        "parse",
+        "remap",
+        "get_ts_df",
+    ]:
+        assert stage in spans_df["name"].values
+    assert (spans_df["duration"] >= 0).all()
+    timings_df = recorder.get_timings()
+    assert timings_df.loc["http", "count"] == len(mock_api.data_requests) + 2
+    # the stages are nested within the `get_ts_df` span, including those run in the
+    # threads of the fetching pool
+    parents = {
+        event["span_id"]: event["parent_id"]
+        for event in recorder.events
+        if event["type"] == "span"
+    }
+    get_ts_df_id = spans_df.loc[spans_df["name"] == "get_ts_df", "span_id"].item()
+    for span_id in spans_df.loc[spans_df["name"] == "parse", "span_id"]:
+        while parents[span_id] is not None:
+            span_id = parents[span_id]
+        assert span_id == get_ts_df_id
+    # bytes and row/column counts
+    http_df = spans_df[spans_df["name"] == "http"]
+    assert (http_df["bytes"] > 0).all()
+    assert (http_df["status_code"] == 200).all()
+    get_ts_df_ser = spans_df[spans_df["name"] == "get_ts_df"].iloc[0]
+    assert get_ts_df_ser["num_rows"] == len(ts_df)
+    assert get_ts_df_ser["num_columns"] == len(ts_df.columns)
+    # cache hit/miss counters
+    counters = recorder.get_counters()
+    assert counters["ts_cache.miss"] == 2
+    assert counters["catalogue_cache.miss"] == 2
+    recorder.clear()
+    with agm.hooks(recorder):
+        agm_ds = agm.AgrometeoDataset(region=region, ts_cache=tmp_path)
+        agm_ds.get_ts_df("temperature", "2022-03-01", "2022-03-02")
+    counters = recorder.get_counters()
+    assert counters["ts_cache.hit"] == 2
+    assert counters["catalogue_cache.hit"] == 2
+    assert "fetch" not in recorder.get_timings().index
+    # the cache reads and writes of the asynchronous methods, which are run in the
+    # default executor, are also nested within their span
+    recorder.clear()
+    with agm.hooks(recorder):
+        asyncio.run(
+            agm.AgrometeoDataset(region=region, ts_cache=tmp_path).aget_ts_df(
+                "temperature", "2022-03-01", "2022-03-03"
+            )
+        )
+    spans_df = recorder.get_spans_df()
+    assert {"ts_cache", "ts_cache.put"} <= set(spans_df["name"])
+    assert (
+        spans_df.loc[~spans_df["name"].isin(["region", "aget_ts_df"]), "parent_id"]
+        .notna()
+        .all()
+    )
+    # long-format calls are also timed as a whole
+    recorder.clear()
+    with agm.hooks(recorder):
+        long_ts_df = agm_ds.get_ts_df(
+            "temperature", "2022-03-01", "2022-03-02", long_format=True
+        )
+    spans_df = recorder.get_spans_df()
+    get_ts_df_ser = spans_df[spans_df["name"] == "get_ts_df"].iloc[0]
+    assert get_ts_df_ser["num_rows"] == len(long_ts_df)
+    # the events can be logged as structured (JSON) logs
+    with agm.hooks(agm.log_event), caplog.at_level(
+        logging.DEBUG, logger=agm.instrumentation.LOGGER_NAME
+    ):
+        agm_ds.get_ts_df("temperature", "2022-03-01", "2022-03-02")
+    events = [json.loads(record.getMessage()) for record in caplog.records]
+    assert {"get_ts_df", "ts_cache.hit"} <= {event["name"] for event in events}
+    # no events are emitted once the hooks are removed
+    recorder.clear()
+    agm_ds.get_ts_df("temperature", "2022-03-01", "2022-03-02")
+    assert recorder.events == []
+
+    # exceptions raised by hooks are logged, without changing the control flow
+    def raising_hook(event):
+        raise RuntimeError("hook error")
+
+    caplog.clear()
+    with agm.hooks(raising_hook), caplog.at_level(
+        logging.ERROR, logger=agm.instrumentation.LOGGER_NAME
+    ):
+        with agm.span("ok"):
+            pass
+        agm.count("ok")
+        with pytest.raises(KeyError):
+            with agm.span("error"):
+                raise KeyError
+    assert [record.exc_info[0] for record in caplog.records] == [RuntimeError] * 3
+
+    # functions run in other threads can be bound to the current span
+    def inner():
+        with agm.span("inner"):
+            pass
+
+    with agm.hooks(recorder), agm.span("outer"):
+        for func in [inner, agm.bind_span(inner)]:
+            thread = threading.Thread(target=func)
+            thread.start()
+            thread.join()
+    (outer_id,) = [
+        event["span_id"] for event in recorder.events if event["name"] == "outer"
+    ]
+    assert [
+        event["parent_id"] for event in recorder.events if event["name"] == "inner"
+    ] == [None, outer_id]